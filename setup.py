@@ -8,6 +8,14 @@ TEST_REQUIRES = [
     'coverage'
 ]
 
+SNAPSHOTS_REQUIRES = [
+    'msgpack>=0.5.2',
+]
+
+NUMPY_REQUIRES = [
+    'numpy>=1.9',
+]
+
 INSTALL_REQUIRES = [
     'requests>=1.0.0',
     'pycrypto>=2.5',
@@ -26,6 +34,8 @@ setup(
     zip_safe=False,
     extras_require={
         'tests': TEST_REQUIRES,
+        'snapshots': SNAPSHOTS_REQUIRES,
+        'numpy': NUMPY_REQUIRES,
     },
     license='MIT',
     tests_require=TEST_REQUIRES,
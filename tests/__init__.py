@@ -1,3 +1,4 @@
+import json
 from flexmock import flexmock
 
 
@@ -20,4 +21,110 @@ class DictPartialMatcher(object):
         return True
 
 def mocked_response(content=None, status_code=200, headers=None):
-    return flexmock(ok=status_code < 400, status_code=status_code, json=lambda: content, raw=content, text=content, headers=headers)
+    return flexmock(ok=status_code < 400, status_code=status_code, json=lambda: content, raw=content, text=content,
+                    content=json.dumps(content), encoding=None, headers=headers)
+
+
+def vehicle_view_payload(vehicle_view_id, description='UberX', multiplier=None):
+    payload = {
+        'id': vehicle_view_id,
+        'description': description,
+        'capacity': 4,
+        'maxFareSplits': 4,
+        'mapImages': [{'url': 'http://d1a3f4spazzrp4.cloudfront.net/car-types/map/map-black.png', 'width': 30, 'height': 70}],
+        'monoImages': [{'url': 'http://d1a3f4spazzrp4.cloudfront.net/car-types/mono/mono-black.png', 'width': 114, 'height': 34}],
+        'pickupButtonString': 'Set pickup location',
+        'confirmPickupButtonString': 'Request pickup here',
+        'requestPickupButtonString': 'Request {string}',
+        'setPickupLocationString': 'Set Pickup Location',
+        'pickupEtaString': 'Pickup time is approximately {string}',
+        'noneAvailableString': 'no cars available',
+        'allowFareEstimate': True,
+        'fare': {
+            'id': 33,
+            'base': '$7',
+            'perDistanceUnit': '$4',
+            'distanceUnit': 'mile',
+            'perMinute': '$1.05',
+            'speedThresholdMps': 5,
+            'minimum': '$15',
+            'cancellation': '$10',
+            'type': 'TimeOrDistance',
+        },
+    }
+
+    if multiplier is not None:
+        payload['surge'] = {
+            'fareId': 34,
+            'multiplier': multiplier,
+            'expirationTime': 1384233300000,
+            'base': '$7',
+            'perDistanceUnit': '$4',
+            'distanceUnit': 'mile',
+            'perMinute': '$1.05',
+            'speedThresholdMps': 5,
+            'minimum': '$15',
+            'cancellation': '$10',
+        }
+
+    return payload
+
+
+def vehicle_path_payload(epoch, latitude, longitude, points=3):
+    return [{'epoch': epoch + i * 1000, 'latitude': latitude + i * 0.0001, 'longitude': longitude, 'course': 90}
+            for i in range(points)]
+
+
+def app_state_payload(vehicles=None, multiplier=None, status='Looking', trip=None):
+    """
+    a PingClient response. vehicles is a dict of vehicle view id -> {vehicle id -> vehicle path}
+    """
+    if vehicles is None:
+        vehicles = {
+            8: {
+                'a1': vehicle_path_payload(1384233249575, 37.76062, -122.40647),
+                'a2': vehicle_path_payload(1384233249575, 37.77062, -122.41647),
+            },
+        }
+
+    payload = {
+        'messageType': 'OK',
+        'city': {
+            'cityName': 'San Francisco',
+            'currencyCode': 'USD',
+            'defaultVehicleViewId': 8,
+            'vehicleViewsOrder': [8, 1],
+            'vehicleViews': {
+                '8': vehicle_view_payload(8, 'UberX', multiplier),
+                '1': vehicle_view_payload(1, 'Black Car'),
+            },
+        },
+        'nearbyVehicles': dict(
+            (str(view_id), {
+                'etaString': '3 minutes',
+                'etaStringShort': '3 mins',
+                'minEta': 3,
+                'vehiclePaths': paths,
+            }) for view_id, paths in vehicles.items()
+        ),
+        'client': {
+            'id': 123456,
+            'rating': 5,
+            'firstName': 'John',
+            'lastName': 'Doe',
+            'email': 'test@test.org',
+            'status': status,
+            'paymentProfiles': [{
+                'id': 11223344,
+                'cardExpiration': '2016-02-01T00:00:00+00:00',
+                'cardNumber': '1111',
+                'cardType': 'Visa',
+                'useCase': 'personal',
+            }],
+        },
+    }
+
+    if trip is not None:
+        payload['trip'] = trip
+
+    return payload
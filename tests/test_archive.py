@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from flexmock import flexmock
+from tests import app_state_payload
+from uber import AppState, GPSLocation
+from uber.archive import ArchiveWriter, ArchiveReader, ArchivedAppState, index_path
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._path = os.path.join(self._directory, 'pings.arc')
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _write(self, compress=False):
+        payloads = [app_state_payload(multiplier=1.0 + i / 10.0) for i in range(5)]
+        with ArchiveWriter(self._path, compress=compress) as writer:
+            for i, payload in enumerate(payloads):
+                location = GPSLocation(43.0 + i, -79.0) if i != 2 else None
+                writer.append(AppState(payload), epoch=1000 + i, location=location)
+
+        return payloads
+
+    def test_round_trip(self):
+        payloads = self._write()
+        with ArchiveReader(self._path) as reader:
+            self.assertEqual(len(reader), 5)
+            self.assertEqual([x.raw for x in reader], payloads)
+            self.assertEqual(reader[3].city.vehicle_views[8].surge.multiplier, 1.3)
+
+            entry = reader.entry(1)
+            self.assertEqual((entry.epoch, entry.latitude, entry.longitude), (1001, 44.0, -79.0))
+            self.assertFalse(entry.compressed)
+            self.assertIsNone(reader.entry(2).latitude)
+
+    def test_compressed(self):
+        payloads = self._write(compress=True)
+        with ArchiveReader(self._path) as reader:
+            self.assertTrue(reader.entry(0).compressed)
+            self.assertEqual(reader.data(4), payloads[4])
+
+        self.assertLess(os.path.getsize(self._path), sum(len(json.dumps(x)) for x in payloads))
+
+    def test_uncompressible_records_are_stored_as_is(self):
+        with ArchiveWriter(self._path, compress=True) as writer:
+            writer.append('{}')
+
+        with ArchiveReader(self._path) as reader:
+            self.assertFalse(reader.entry(0).compressed)
+            self.assertEqual(reader.data(0), {})
+
+    def test_append_to_existing(self):
+        payloads = self._write()
+        with ArchiveWriter(self._path) as writer:
+            writer.append(json.dumps(payloads[0]), epoch=2000)
+
+        with ArchiveReader(self._path) as reader:
+            self.assertEqual(len(reader), 6)
+            self.assertEqual(reader.data(5), payloads[0])
+            self.assertEqual(reader.entry(5).epoch, 2000)
+
+    def test_app_states_are_lazy(self):
+        payloads = self._write()
+        with ArchiveReader(self._path) as reader:
+            app_state = reader[1]
+            self.assertIsInstance(app_state, ArchivedAppState)
+            self.assertIsInstance(app_state, AppState)
+            self.assertEqual(app_state.archive_entry.epoch, 1001)
+
+            flexmock(reader).should_receive('data').with_args(1).and_return(payloads[1]).once()
+            self.assertEqual(app_state.client.status, 'Looking')
+            self.assertEqual(app_state, AppState(payloads[1]))
+
+    def test_payload_is_not_copied(self):
+        self._write()
+        with ArchiveReader(self._path) as reader:
+            self.assertIsInstance(reader.payload(0), buffer)
+
+    def test_select(self):
+        self._write()
+        with ArchiveReader(self._path) as reader:
+            self.assertEqual(reader.select(), [0, 1, 2, 3, 4])
+            self.assertEqual(reader.select(start=1001, end=1003), [1, 2, 3])
+            self.assertEqual(reader.select(bounds=(43.5, -80, 46.5, -78)), [1, 3])
+            self.assertEqual(reader.select(start=1002, bounds=(40, -80, 50, -78)), [3, 4])
+
+    def test_select_binary_search(self):
+        epochs = [1000, 1000, 1001, 1003, 1003, 1003, 1007, 1010]
+        with ArchiveWriter(self._path) as writer:
+            for epoch in epochs:
+                writer.append('{}', epoch=epoch)
+
+        with ArchiveReader(self._path) as reader:
+            self.assertTrue(reader.ordered)
+            for start, end in [(None, None), (1000, 1000), (1003, 1003), (1002, 1008), (999, 1001), (1011, None),
+                               (None, 999), (1004, 1006), (1005, 1001)]:
+                expected = [i for i, epoch in enumerate(epochs)
+                            if (start is None or epoch >= start) and (end is None or epoch <= end)]
+                self.assertEqual(reader.select(start=start, end=end), expected)
+
+    def test_select_unordered(self):
+        self._write()
+        with ArchiveReader(self._path) as reader:
+            self.assertTrue(reader.ordered)
+
+        # a new writer still knows the epoch of the last record
+        with ArchiveWriter(self._path) as writer:
+            writer.append('{}', epoch=500)
+
+        with ArchiveReader(self._path) as reader:
+            self.assertFalse(reader.ordered)
+            self.assertEqual(reader.select(start=400, end=600), [5])
+            self.assertEqual(reader.select(start=1001, end=1003), [1, 2, 3])
+            self.assertEqual(reader.select(end=1000), [0, 5])
+
+    def test_index_errors(self):
+        self._write()
+        with ArchiveReader(self._path) as reader:
+            with self.assertRaises(IndexError):
+                reader[5]
+
+            with self.assertRaises(IndexError):
+                reader.entry(-1)
+
+    def test_not_an_archive(self):
+        with open(self._path, 'wb') as f:
+            f.write('{"messageType": "OK"}')
+        with open(index_path(self._path), 'wb') as f:
+            f.write('')
+
+        with self.assertRaises(ValueError):
+            ArchiveReader(self._path)
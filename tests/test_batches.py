@@ -0,0 +1,86 @@
+import json
+import operator
+import os
+import shutil
+import tempfile
+import unittest
+from tests import app_state_payload
+from uber import GPSLocation
+from uber.archive import ArchiveWriter
+from uber.batches import map_payloads, map_archive
+
+
+def surge(app_state):
+    return app_state.city.vehicle_views[8].surge.multiplier
+
+
+def vehicle_count(app_state):
+    return sum(len(x.vehicle_paths or {}) for x in app_state.nearby_vehicles.itervalues())
+
+
+def count_by_status(counts, status):
+    counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def merge_counts(counts, other):
+    for key, value in other.iteritems():
+        counts[key] = counts.get(key, 0) + value
+    return counts
+
+
+def status(app_state):
+    return app_state.client.status
+
+
+class TestBatches(unittest.TestCase):
+    def setUp(self):
+        self._payloads = [app_state_payload(multiplier=1.0 + i / 100.0, status='Looking' if i % 3 else 'Dispatching')
+                          for i in range(20)]
+        self._json = [json.dumps(x) for x in self._payloads]
+
+    def test_map_in_order(self):
+        expected = [1.0 + i / 100.0 for i in range(20)]
+        for processes in (1, 2):
+            self.assertEqual(map_payloads(self._json, surge, processes=processes, chunk_size=3), expected)
+
+    def test_reduce(self):
+        for processes in (1, 2):
+            self.assertEqual(map_payloads(self._json, vehicle_count, reducer=operator.add, initial=0,
+                                          processes=processes, chunk_size=3), 40)
+
+    def test_combine(self):
+        for processes in (1, 2):
+            counts = map_payloads(self._json, status, reducer=count_by_status, initial={'Looking': 100},
+                                  combine=merge_counts, processes=processes, chunk_size=4, empty={})
+            self.assertEqual(counts, {'Looking': 113, 'Dispatching': 7})
+
+    def test_initial_is_accounted_once(self):
+        for processes in (1, 2):
+            for chunk_size in (1, 3, 100):
+                self.assertEqual(map_payloads(self._json, vehicle_count, reducer=operator.add, initial=100,
+                                              processes=processes, chunk_size=chunk_size), 140)
+
+    def test_empty(self):
+        self.assertEqual(map_payloads([], surge, processes=2), [])
+        self.assertEqual(map_payloads([], surge, reducer=operator.add, initial=0, processes=2), 0)
+
+
+class TestArchiveBatches(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._path = os.path.join(self._directory, 'pings.arc')
+        with ArchiveWriter(self._path, compress=True) as writer:
+            for i in range(30):
+                writer.append(app_state_payload(multiplier=1.0 + i / 100.0), epoch=i, location=GPSLocation(43, -79))
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def test_map_archive(self):
+        for processes in (1, 2):
+            self.assertEqual(map_archive(self._path, vehicle_count, reducer=operator.add, initial=0,
+                                         processes=processes, chunk_size=7), 60)
+
+    def test_map_selected_records(self):
+        self.assertEqual(map_archive(self._path, surge, indexes=[3, 10], processes=2), [1.03, 1.1])
@@ -0,0 +1,141 @@
+import unittest
+import requests
+from flexmock import flexmock
+from tests import mocked_response
+from uber import UberClient, UberException, geolocate, GeolocationExcetion
+from uber.circuit import CircuitBreaker, CircuitOpen, CircuitState
+from uber.geolocation import GEOCODE_URL
+from uber.metrics import InMemoryMetrics
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self._now = [0.0]
+        self._metrics = InMemoryMetrics()
+        self._breaker = CircuitBreaker(failure_rate=0.5, window=10, min_requests=4, reset_timeout=5,
+                                       metrics=self._metrics, clock=lambda: self._now[0])
+
+    def _fail(self, endpoint='x', error=None):
+        def func():
+            raise error or IOError('timeout')
+
+        with self.assertRaises(Exception):
+            self._breaker.call(endpoint, func)
+
+    def _open(self, endpoint='x'):
+        for _ in range(4):
+            self._fail(endpoint)
+
+    def test_opens_on_failure_rate(self):
+        self._breaker.call('x', lambda: 1)
+        self._breaker.call('x', lambda: 1)
+        self._fail()
+        self.assertEqual(self._breaker.state('x'), CircuitState.CLOSED)
+
+        self._fail()
+        self.assertEqual(self._breaker.state('x'), CircuitState.OPEN)
+        self.assertEqual(self._breaker.state('y'), CircuitState.CLOSED)
+        self.assertEqual(self._metrics.gauge_value('circuit.state', endpoint='x'), 2)
+
+        with self.assertRaises(CircuitOpen) as expected_exception:
+            self._breaker.call('x', lambda: 1)
+
+        self.assertIsInstance(expected_exception.exception, UberException)
+        self.assertEqual(self._metrics.counter('circuit.rejected', endpoint='x'), 1)
+
+    def test_window(self):
+        self._fail()
+        self._fail()
+        self._now[0] = 11
+        self._breaker.call('x', lambda: 1)
+        self._breaker.call('x', lambda: 1)
+        self._fail()
+        self.assertEqual(self._breaker.state('x'), CircuitState.CLOSED)
+
+    def test_client_errors_are_not_failures(self):
+        for _ in range(4):
+            self._fail(error=UberException('not found', 404))
+
+        self.assertEqual(self._breaker.state('x'), CircuitState.CLOSED)
+
+    def test_overload_errors_are_failures(self):
+        for code in (429, 408):
+            for _ in range(4):
+                self._fail(code, error=UberException('slow down', code))
+
+            self.assertEqual(self._breaker.state(code), CircuitState.OPEN)
+
+    def test_half_open(self):
+        self._open()
+        self._now[0] = 5
+        self.assertEqual(self._breaker.state('x'), CircuitState.HALF_OPEN)
+
+        # a failed probe opens the circuit again
+        self._fail()
+        self.assertEqual(self._breaker.state('x'), CircuitState.OPEN)
+
+        self._now[0] = 10
+        self.assertEqual(self._breaker.call('x', lambda: 1), 1)
+        self.assertEqual(self._breaker.state('x'), CircuitState.CLOSED)
+        self.assertEqual(self._metrics.gauge_value('circuit.state', endpoint='x'), 0)
+
+    def test_client(self):
+        client = UberClient('test@test.org', '12345', circuit_breaker=self._breaker)
+        (flexmock(client._session)
+         .should_receive('post')
+         .and_return(mocked_response('error!', 503))
+         .times(4)
+        )
+
+        for _ in range(4):
+            with self.assertRaises(UberException):
+                client._post(UberClient.ENDPOINT, {})
+
+        with self.assertRaises(CircuitOpen):
+            client._post(UberClient.ENDPOINT, {})
+
+    def test_geolocate(self):
+        (flexmock(requests)
+         .should_receive('get')
+         .and_return(mocked_response({'say': 'what'}, status_code=500))
+         .times(4)
+        )
+
+        for _ in range(4):
+            with self.assertRaises(GeolocationExcetion):
+                geolocate('my magic address', circuit_breaker=self._breaker)
+
+        with self.assertRaises(CircuitOpen):
+            geolocate('my magic address', circuit_breaker=self._breaker)
+
+    def test_invalid_addresses_are_not_failures(self):
+        (flexmock(requests)
+         .should_receive('get')
+         .and_return(mocked_response({'status': 'INVALID_REQUEST'}))
+         .times(6)
+        )
+
+        for _ in range(6):
+            with self.assertRaises(GeolocationExcetion):
+                geolocate('', circuit_breaker=self._breaker)
+
+        self.assertEqual(self._breaker.state(GEOCODE_URL), CircuitState.CLOSED)
+
+    def test_client_geolocate(self):
+        client = UberClient('test@test.org', '12345', circuit_breaker=self._breaker)
+        (flexmock(requests)
+         .should_receive('get')
+         .and_return(mocked_response({'say': 'what'}, status_code=500))
+         .times(4)
+        )
+
+        for _ in range(4):
+            with self.assertRaises(GeolocationExcetion):
+                client.request_pickup(pickup_address='my magic address')
+
+        with self.assertRaises(CircuitOpen):
+            client.request_pickup(pickup_address='my magic address')
+
+
+if __name__ == '__main__':
+    unittest.main()
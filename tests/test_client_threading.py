@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+import unittest
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from uber import UberClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    answers every message with the query it was sent, after a small delay
+    """
+    protocol_version = 'HTTP/1.1'
+    delay = 0.005
+
+    # buffer the response, so headers and body go out in one packet
+    wbufsize = -1
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.condition:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.condition.notify_all()
+
+            # hold the request until enough requests are in flight at once (or give up)
+            deadline = time.time() + 2
+            while server.active < server.gate and time.time() < deadline:
+                server.condition.wait(deadline - time.time())
+
+        time.sleep(self.delay)
+        with server.condition:
+            server.active -= 1
+
+        body = json.dumps({'messageType': 'OK', 'query': data['query'], 'email': data['email']})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args):
+        HTTPServer.__init__(self, *args)
+        self.condition = threading.Condition()
+        self.active = 0
+        self.max_active = 0
+        # requests wait until this many are in flight
+        self.gate = 0
+
+
+class TestClientThreading(unittest.TestCase):
+    def setUp(self):
+        self._server = StubServer(('127.0.0.1', 0), StubHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+        self._client = UberClient('test@test.org', '12345', pool_size=16)
+        self._client.ENDPOINT = 'http://127.0.0.1:{}'.format(self._server.server_address[1])
+
+    def tearDown(self):
+        self._client._adapter.close()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _run(self, threads, requests_per_thread):
+        errors = []
+
+        def worker(index):
+            try:
+                for i in range(requests_per_thread):
+                    query = '{}-{}'.format(index, i)
+                    response = self._client._send_message('LocationSearch', params={'query': query})
+                    if response['query'] != query or response['email'] != 'test@test.org':
+                        errors.append((query, response))
+            except Exception as e:
+                errors.append(e)
+
+        workers = [threading.Thread(target=worker, args=(x,)) for x in range(threads)]
+        start = time.time()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        return time.time() - start, errors
+
+    def test_shared_client(self):
+        elapsed, errors = self._run(threads=16, requests_per_thread=20)
+        self.assertEqual(errors, [])
+        self.assertEqual(self._client.requests_sent.value, 320)
+        self.assertEqual(self._client.requests_failed.value, 0)
+
+    def test_requests_are_concurrent(self):
+        # the server holds every request until 8 are in flight: a client that serializes them would never get there
+        self._server.gate = 8
+        elapsed, errors = self._run(threads=8, requests_per_thread=1)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self._server.max_active, 8)
+
+    def test_sessions_share_the_connection_pool(self):
+        sessions = []
+
+        def worker():
+            sessions.append(self._client._session)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(sessions[0], self._client._session)
+        self.assertIs(sessions[0].get_adapter('http://x'), self._client._session.get_adapter('http://x'))
+
+
+if __name__ == '__main__':
+    unittest.main()
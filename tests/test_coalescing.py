@@ -0,0 +1,201 @@
+import copy
+import threading
+import unittest
+from flexmock import flexmock
+from tests import app_state_payload, mocked_response
+from uber import UberClient
+from uber.client import MessageTypes
+from uber.coalescing import SingleFlight
+from uber.interning import Interner
+from uber.models import GPSLocation
+
+
+class Stop(BaseException):
+    pass
+
+
+class CoalescedCounter(object):
+    """
+    stands for SingleFlight.coalesced, and tells when enough callers are waiting
+    """
+    def __init__(self, count):
+        self._count = count
+        self._lock = threading.Lock()
+        self.reached = threading.Event()
+
+    def increment(self):
+        with self._lock:
+            self._count -= 1
+            if self._count <= 0:
+                self.reached.set()
+
+
+class TestSingleFlight(unittest.TestCase):
+    def _concurrently(self, count, target):
+        results = [None] * count
+        threads = []
+
+        def run(index):
+            try:
+                results[index] = target()
+            except BaseException as e:
+                results[index] = e
+
+        for i in range(count):
+            threads.append(threading.Thread(target=run, args=(i,)))
+            threads[-1].start()
+
+        return threads, results
+
+    def test_concurrent_calls_share_the_leader_result(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'result'
+
+        leader, results = self._concurrently(1, lambda: single_flight.do('key', slow))
+        started.wait()
+        single_flight.coalesced = CoalescedCounter(4)
+        followers, follower_results = self._concurrently(4, lambda: single_flight.do('key', slow))
+        self.assertTrue(single_flight.coalesced.reached.wait(5))
+
+        release.set()
+        for thread in leader + followers:
+            thread.join()
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual(['result'] * 5, results + follower_results)
+        self.assertEqual(0, single_flight.in_flight())
+
+    def _coalesce(self, func, followers=2, share=None):
+        """
+        runs func in a leader thread, and in followers that wait for it
+
+        Returns:
+            - the results of the leader and of the followers (or their exceptions)
+        """
+        single_flight = SingleFlight(share)
+        started = threading.Event()
+        release = threading.Event()
+
+        def call():
+            started.set()
+            release.wait()
+            return func()
+
+        leader, results = self._concurrently(1, lambda: single_flight.do('key', call))
+        started.wait()
+        single_flight.coalesced = CoalescedCounter(followers)
+        follower_threads, follower_results = self._concurrently(followers, lambda: single_flight.do('key', call))
+        self.assertTrue(single_flight.coalesced.reached.wait(5))
+
+        release.set()
+        for thread in leader + follower_threads:
+            thread.join()
+
+        return results[0], follower_results
+
+    def test_exception_is_shared(self):
+        def failing():
+            raise ValueError('boom')
+
+        result, follower_results = self._coalesce(failing)
+        for result in [result] + follower_results:
+            self.assertIsInstance(result, ValueError)
+
+    def test_base_exception_is_shared(self):
+        def stopping():
+            raise Stop()
+
+        result, follower_results = self._coalesce(stopping)
+        for result in [result] + follower_results:
+            self.assertIsInstance(result, Stop)
+
+    def test_followers_get_the_result(self):
+        result, follower_results = self._coalesce(lambda: {'vehicles': {'a1': [1, 2]}})
+        for follower_result in follower_results:
+            self.assertIs(follower_result, result)
+
+    def test_followers_get_shared_copies(self):
+        result, follower_results = self._coalesce(lambda: {'vehicles': {'a1': [1, 2]}}, share=copy.deepcopy)
+        result['vehicles']['a1'].append(3)
+        follower_results[0]['vehicles']['a2'] = []
+
+        self.assertEqual(follower_results[0], {'vehicles': {'a1': [1, 2], 'a2': []}})
+        self.assertEqual(follower_results[1], {'vehicles': {'a1': [1, 2]}})
+
+    def test_sequential_calls_are_not_coalesced(self):
+        single_flight = SingleFlight()
+        self.assertEqual(1, single_flight.do('key', lambda: 1))
+        self.assertEqual(2, single_flight.do('key', lambda: 2))
+        self.assertEqual(0, single_flight.coalesced.value)
+
+
+class TestClientCoalescing(unittest.TestCase):
+    def setUp(self):
+        self._client = UberClient('test@test.org', '12345')
+
+    def _key_of(self, client, message_type, params, location):
+        keys = []
+        flexmock(client._single_flight).should_receive('do').replace_with(
+            lambda key, func, *args: keys.append(key))
+        flexmock(client).should_receive('_decode_message')
+        client._send_message(message_type, params, location)
+        return keys
+
+    def _coalesced_pings(self, client):
+        """
+        two pings, the second one served by the first one's request as if they had been in flight together
+        """
+        results = []
+
+        def do(key, func, *args):
+            if not results:
+                results.append(func(*args))
+
+            return results[0]
+
+        flexmock(client._single_flight).should_receive('do').replace_with(do)
+        (flexmock(client._session)
+            .should_receive('post')
+            .and_return(mocked_response(app_state_payload()))
+            .once())
+
+        return client.ping(GPSLocation(1, 2)), client.ping(GPSLocation(1, 2))
+
+    def test_callers_decode_their_own_copy(self):
+        first, second = self._coalesced_pings(self._client)
+
+        self.assertIsNot(first.raw, second.raw)
+        self.assertEqual(first.raw, second.raw)
+        first.raw['city']['vehicleViewsOrder'].append(99)
+        self.assertEqual(second.city.vehicle_views_order, [8, 1])
+
+    def test_interned_responses_are_shared(self):
+        first, second = self._coalesced_pings(UberClient('test@test.org', '12345', interner=Interner()))
+        self.assertIs(first.raw, second.raw)
+
+    def test_ping_is_coalesced_by_location(self):
+        first = self._key_of(self._client, MessageTypes.PING_CLIENT, None, GPSLocation(1, 2))
+        same = self._key_of(self._client, MessageTypes.PING_CLIENT, None, GPSLocation(1, 2))
+        other = self._key_of(self._client, MessageTypes.PING_CLIENT, None, GPSLocation(1, 3))
+
+        self.assertEqual(1, len(first))
+        self.assertEqual(first, same)
+        self.assertNotEqual(first, other)
+
+    def test_other_messages_are_not_coalesced(self):
+        flexmock(self._client._single_flight).should_receive('do').never()
+        flexmock(self._client).should_receive('_send_message_now').once()
+        self._client._send_message(MessageTypes.API_COMMAND, {'method': 'GET'}, GPSLocation(1, 2))
+
+    def test_coalescing_can_be_disabled(self):
+        client = UberClient('test@test.org', '12345', coalesce=False)
+        flexmock(client).should_receive('_send_message_now').once()
+        client._send_message(MessageTypes.PING_CLIENT, None, GPSLocation(1, 2))
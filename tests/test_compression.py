@@ -0,0 +1,133 @@
+import gzip
+import json
+import threading
+import unittest
+import zlib
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from StringIO import StringIO
+from tests import app_state_payload, vehicle_path_payload
+from uber import UberClient
+from uber.client import gzip_compress
+
+
+def large_ping_payload():
+    """
+    a PingClient response of a busy area: 40 vehicles with 10 points paths
+    """
+    vehicles = {
+        8: dict(('a{}'.format(i), vehicle_path_payload(1384233249575 + i, 37.76 + i * 0.001, -122.4, points=10))
+                for i in range(20)),
+        1: dict(('b{}'.format(i), vehicle_path_payload(1384233249575 + i, 37.77 + i * 0.001, -122.41, points=10))
+                for i in range(20)),
+    }
+    return app_state_payload(vehicles=vehicles, multiplier=1.5)
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    """
+    answers with the payload of the server, compressed if the client accepts it. Records the byte counts
+    """
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((self.headers.get('Content-Encoding'), len(body)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.GzipFile(fileobj=StringIO(body)).read()
+
+        self.server.requests.append(json.loads(body))
+
+        response = json.dumps(self.server.payload)
+        self.server.uncompressed_sent.append(len(response))
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            response = gzip_compress(response)
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+        self.server.sent.append(len(response))
+
+    def log_message(self, *args):
+        pass
+
+
+class RecordingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self._server = RecordingServer(('127.0.0.1', 0), RecordingHandler)
+        self._server.payload = large_ping_payload()
+        self._server.requests = []
+        self._server.received = []
+        self._server.sent = []
+        self._server.uncompressed_sent = []
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        self._clients = []
+
+    def tearDown(self):
+        for client in self._clients:
+            client._adapter.close()
+
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _client(self, **kwargs):
+        client = UberClient('test@test.org', '12345', **kwargs)
+        client.ENDPOINT = 'http://127.0.0.1:{}'.format(self._server.server_address[1])
+        self._clients.append(client)
+        return client
+
+    def test_gzip_compress(self):
+        data = json.dumps(large_ping_payload())
+        self.assertEqual(zlib.decompress(gzip_compress(data), 16 + zlib.MAX_WBITS), data)
+        self.assertEqual(gzip.GzipFile(fileobj=StringIO(gzip_compress(data))).read(), data)
+
+    def test_compressed_responses(self):
+        client = self._client()
+        self.assertEqual(client._send_message('PingClient'), self._server.payload)
+
+        # recorded ping responses compress well
+        self.assertLess(self._server.sent[0] * 4, self._server.uncompressed_sent[0])
+
+    def test_request_compression(self):
+        client = self._client(compress_requests=True, compression_min_size=100)
+        params = {'query': 'x' * 1000, 'searchTypes': ['places']}
+
+        self.assertEqual(client._send_message('LocationSearch', params=params), self._server.payload)
+        self.assertEqual(self._server.requests[0]['query'], 'x' * 1000)
+
+        encoding, size = self._server.received[0]
+        self.assertEqual(encoding, 'gzip')
+        self.assertLess(size, 400)
+
+    def test_small_requests_are_not_compressed(self):
+        client = self._client(compress_requests=True)
+        client._send_message('PingClient')
+
+        self.assertEqual(self._server.received[0][0], None)
+
+    def test_byte_counts(self):
+        """
+        bytes on the wire for a recorded ping, with and without compression
+        """
+        payload = large_ping_payload()
+        raw = json.dumps(payload)
+        compressed = gzip_compress(raw)
+        fast = gzip_compress(raw, level=1)
+
+        print '\nping response: {} bytes, gzip: {} bytes ({:.0%}), gzip level 1: {} bytes ({:.0%})'.format(
+            len(raw), len(compressed), len(compressed) / float(len(raw)), len(fast), len(fast) / float(len(raw)))
+
+        self.assertLess(len(compressed), len(raw) / 4)
+        self.assertLessEqual(len(compressed), len(fast))
@@ -0,0 +1,51 @@
+import pickle
+import unittest
+from tests import app_state_payload
+from uber import AppState, VehicleView, VehicleLocation, TripState
+from uber.decoding import decode_eager, get_decoder
+
+
+class TestDecoding(unittest.TestCase):
+    def test_matches_lazy_models(self):
+        payload = app_state_payload(multiplier=1.5, trip={'eta': 5, 'driver': {'id': 1, 'name': 'bob'}})
+        lazy = AppState(payload)
+        eager = decode_eager(AppState, payload)
+
+        self.assertIsInstance(eager, AppState)
+        self.assertEqual(eager.raw, payload)
+        self.assertEqual(eager.to_dict(), lazy.to_dict())
+        self.assertEqual(str(eager), str(lazy))
+
+        self.assertEqual(eager.city.vehicle_views[8].surge.multiplier, 1.5)
+        self.assertEqual(eager.client.payment_profiles[0].card_expiration, lazy.client.payment_profiles[0].card_expiration)
+        self.assertEqual(eager.trip.state, TripState.DRIVING_TO_PICKUP)
+        self.assertEqual(eager.trip.driver.name, 'bob')
+
+        path = eager.nearby_vehicles[8].vehicle_paths['a1']
+        self.assertIsInstance(path[0], VehicleLocation)
+        self.assertEqual(path[0].epoch, lazy.nearby_vehicles[8].vehicle_paths['a1'][0].epoch)
+
+    def test_values_are_decoded_once(self):
+        eager = decode_eager(AppState, app_state_payload())
+        self.assertIs(eager.city, eager.city)
+        self.assertIs(eager.city.vehicle_views, eager.city.vehicle_views)
+
+    def test_missing_fields(self):
+        eager = decode_eager(VehicleView, {'id': 1})
+        self.assertEqual(eager.id, 1)
+        self.assertIsNone(eager.fare)
+        self.assertIsNone(eager.description)
+        self.assertEqual(eager.map_images, [])
+
+    def test_decoder_is_cached(self):
+        self.assertIs(get_decoder(AppState), get_decoder(AppState))
+
+    def test_pickle(self):
+        eager = decode_eager(AppState, app_state_payload())
+        unpickled = pickle.loads(pickle.dumps(eager))
+        self.assertEqual(unpickled.raw, eager.raw)
+        self.assertEqual(unpickled.city.name, 'San Francisco')
+
+
+if __name__ == '__main__':
+    unittest.main()
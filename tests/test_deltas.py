@@ -0,0 +1,106 @@
+import copy
+import time
+import unittest
+from tests import app_state_payload, vehicle_path_payload
+from uber import AppState, ClientStatus, TripState
+from uber.decoding import decode_eager
+from uber.deltas import AppStateTracker, diff_app_states
+
+
+def busy_payload(multiplier=None, moved=0):
+    """
+    a ping response with 10 vehicles of each of 2 vehicle views, the first `moved` UberX vehicles moved north
+    """
+    vehicles = {8: {}, 1: {}}
+    for i in range(10):
+        latitude = 37.76 + i * 0.001 + (0.01 if i < moved else 0)
+        vehicles[8]['a{}'.format(i)] = vehicle_path_payload(1384233249575, latitude, -122.4, points=10)
+        vehicles[1]['b{}'.format(i)] = vehicle_path_payload(1384233249575, 37.77 + i * 0.001, -122.41, points=10)
+
+    return app_state_payload(vehicles=vehicles, multiplier=multiplier)
+
+
+class TestDeltas(unittest.TestCase):
+    def test_first_update(self):
+        delta = AppStateTracker().update(app_state_payload())
+        self.assertIn('city', delta.changed)
+        self.assertEqual(sorted(delta.vehicles_appeared), [(8, 'a1'), (8, 'a2')])
+        self.assertEqual(delta.client_status, (None, ClientStatus.LOOKING))
+        self.assertIsNone(delta.trip_state)
+
+    def test_unchanged(self):
+        tracker = AppStateTracker()
+        first = tracker.update(AppState(app_state_payload()))
+        delta = tracker.update(AppState(app_state_payload()))
+
+        self.assertFalse(delta.has_changes)
+        self.assertIs(delta.app_state.city, first.app_state.city)
+        self.assertIs(delta.app_state.client, first.app_state.client)
+        self.assertEqual(delta.vehicles_moved, [])
+
+    def test_vehicles(self):
+        previous = app_state_payload()
+        current = copy.deepcopy(previous)
+        paths = current['nearbyVehicles']['8']['vehiclePaths']
+        del paths['a2']
+        paths['a1'] = vehicle_path_payload(1384233259575, 37.8, -122.4)
+        paths['a3'] = vehicle_path_payload(1384233259575, 37.9, -122.4)
+
+        delta = diff_app_states(previous, current)
+        self.assertEqual(delta.changed, {'nearby_vehicles'})
+        self.assertEqual(delta.vehicles_appeared, [(8, 'a3')])
+        self.assertEqual(delta.vehicles_disappeared, [(8, 'a2')])
+        self.assertEqual(len(delta.vehicles_moved), 1)
+
+        move = delta.vehicles_moved[0]
+        self.assertEqual((move.vehicle_view_id, move.vehicle_id), (8, 'a1'))
+        self.assertEqual(move.current, (37.8002, -122.4, 1384233261575))
+
+    def test_surge_client_and_trip(self):
+        previous = app_state_payload()
+        current = app_state_payload(multiplier=2.0, status=ClientStatus.DISPATCHING, trip={'dispatchPercent': 0.1})
+
+        delta = diff_app_states(previous, current)
+        self.assertEqual(delta.changed, {'city', 'client', 'trip'})
+        self.assertEqual(delta.surge_changes, {8: (None, 2.0)})
+        self.assertEqual(delta.client_status, (ClientStatus.LOOKING, ClientStatus.DISPATCHING))
+        self.assertEqual(delta.trip_state, (None, TripState.DISPATCHING))
+        self.assertEqual(delta.app_state.city.vehicle_views[8].surge.multiplier, 2.0)
+
+    def test_reuses_unchanged_items(self):
+        tracker = AppStateTracker()
+        first = tracker.update(busy_payload()).app_state
+        delta = tracker.update(busy_payload(multiplier=2.0, moved=3))
+        second = delta.app_state
+
+        self.assertEqual(delta.changed, {'city', 'nearby_vehicles'})
+        self.assertIsNot(second.city, first.city)
+        self.assertIsNot(second.city.vehicle_views[8], first.city.vehicle_views[8])
+        self.assertIs(second.city.vehicle_views[1], first.city.vehicle_views[1])
+        self.assertIs(second.city.vehicle_views_order, first.city.vehicle_views_order)
+        self.assertIsNot(second.nearby_vehicles[8], first.nearby_vehicles[8])
+        self.assertIs(second.nearby_vehicles[1], first.nearby_vehicles[1])
+        self.assertEqual(second.city.vehicle_views[8].surge.multiplier, 2.0)
+        self.assertEqual(len(delta.vehicles_moved), 3)
+
+    def test_faster_than_decoding(self):
+        """
+        an update after a surge change and a few moves costs less than decoding the whole response
+        """
+        payloads = [busy_payload(multiplier=1 + i % 2, moved=i % 5) for i in range(200)]
+
+        def best_time(update):
+            times = []
+            for _ in range(3):
+                started = time.time()
+                for payload in payloads:
+                    update(payload)
+                times.append(time.time() - started)
+
+            return min(times)
+
+        self.assertLess(best_time(AppStateTracker().update), best_time(lambda payload: decode_eager(AppState, payload)))
+
+
+if __name__ == '__main__':
+    unittest.main()
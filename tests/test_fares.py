@@ -0,0 +1,62 @@
+import unittest
+from tests import vehicle_view_payload
+from uber import VehicleView
+from uber.fares import FareEstimator, parse_amount
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestFares(unittest.TestCase):
+    def test_parse_amount(self):
+        self.assertEqual(parse_amount('$7'), 7.0)
+        self.assertEqual(parse_amount('$1.05'), 1.05)
+        self.assertEqual(parse_amount('$1,250.50'), 1250.5)
+        self.assertEqual(parse_amount('3,50 EUR'), 3.5)
+        self.assertEqual(parse_amount('3,5 EUR'), 3.5)
+        self.assertEqual(parse_amount('$1,250'), 1250.0)
+        self.assertEqual(parse_amount('$1,250,000'), 1250000.0)
+        self.assertEqual(parse_amount('1.250,50 EUR'), 1250.5)
+        self.assertEqual(parse_amount(4), 4.0)
+        self.assertIsNone(parse_amount(None))
+
+        with self.assertRaises(ValueError):
+            parse_amount('free')
+
+    def test_estimate(self):
+        estimator = FareEstimator.from_vehicle_view(VehicleView(vehicle_view_payload(8)))
+
+        # 5 m/s is 321.8688 seconds per mile. 2 miles in 643.7376 seconds is all distance
+        self.assertAlmostEqual(estimator.estimate(2, 643.7376), 7 + 2 * 4)
+
+        # 10 more minutes stuck in traffic
+        self.assertAlmostEqual(estimator.estimate(2, 643.7376 + 600), 7 + 2 * 4 + 10 * 1.05)
+
+        # minimum fare
+        self.assertAlmostEqual(estimator.estimate(0.5, 60), 15)
+
+    def test_surge(self):
+        vehicle_view = vehicle_view_payload(8, multiplier=2.0)
+        self.assertAlmostEqual(FareEstimator.from_vehicle_view(vehicle_view).estimate(2, 643.7376), 30)
+        self.assertAlmostEqual(FareEstimator.from_vehicle_view(vehicle_view, surge=False).estimate(2, 643.7376), 15)
+
+    def test_unknown_distance_unit(self):
+        with self.assertRaises(ValueError):
+            FareEstimator(1, 1, 1, distance_unit='furlong')
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_estimate_many(self):
+        estimator = FareEstimator.from_vehicle_view(vehicle_view_payload(8, multiplier=1.5))
+        distances = [2, 2, 0.5, 10]
+        durations = [643.7376, 1243.7376, 60, 1800]
+
+        fares = estimator.estimate_many(distances, durations)
+        self.assertEqual(fares.shape, (4,))
+        for fare, distance, duration in zip(fares, distances, durations):
+            self.assertAlmostEqual(fare, estimator.estimate(distance, duration))
+
+
+if __name__ == '__main__':
+    unittest.main()
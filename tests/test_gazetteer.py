@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from flexmock import flexmock
+from uber import UberClient, geolocation
+from uber.gazetteer import Gazetteer, GazetteerException, normalize_address
+
+CSV = '''address,latitude,longitude,source
+"353 King Street West, Toronto",43.6455,-79.3925,osm
+"10 Bloor Street East, Toronto",43.6702,-79.3857,osm
+"1 Yonge Street, Toronto",43.6420,-79.3748,osm
+"1 Yonge Street, Toronto",43.6421,-79.3749,osm
+"Caf\xc3\xa9 Crema, 1 Queen Street, Toronto",43.6524,-79.3815,osm
+"100 Queen Street West, Toronto",43.6534,-79.3841,osm
+'''
+
+
+class TestGazetteer(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        csv_path = os.path.join(self._directory, 'toronto.csv')
+        with open(csv_path, 'wb') as f:
+            f.write(CSV)
+
+        self._path = os.path.join(self._directory, 'toronto.gaz')
+        Gazetteer.build(csv_path, self._path)
+        self._gazetteer = Gazetteer(self._path)
+
+    def tearDown(self):
+        self._gazetteer.close()
+        shutil.rmtree(self._directory)
+
+    def test_normalize_address(self):
+        self.assertEqual(normalize_address('353 King Street West, Toronto'), u'353 king st w toronto')
+        self.assertEqual(normalize_address(u'Caf\xe9  CREMA'), u'cafe crema')
+
+    def test_geolocate(self):
+        results = self._gazetteer.geolocate('353 king st. w., TORONTO')
+        self.assertEqual(results, [{
+            'formatted_address': u'353 King Street West, Toronto',
+            'geometry': {'location': {'lat': 43.6455, 'lng': -79.3925}},
+            'latitude': 43.6455,
+            'longitude': -79.3925,
+        }])
+
+        self.assertEqual(len(self._gazetteer.geolocate('1 yonge st toronto')), 2)
+        self.assertEqual(self._gazetteer.geolocate('Cafe Crema, 1 Queen St, Toronto')[0]['formatted_address'],
+                         u'Caf\xe9 Crema, 1 Queen Street, Toronto')
+        self.assertEqual(self._gazetteer.geolocate('2 yonge st toronto'), [])
+        self.assertEqual(self._gazetteer.geolocate('zzz'), [])
+
+    def test_reverse_geocode(self):
+        self.assertEqual(self._gazetteer.reverse_geocode(43.6456, -79.3920)['formatted_address'],
+                         u'353 King Street West, Toronto')
+        self.assertEqual(self._gazetteer.reverse_geocode(43.6533, -79.3842)['formatted_address'],
+                         u'100 Queen Street West, Toronto')
+
+        # far from everything, the closest one still wins
+        self.assertEqual(self._gazetteer.reverse_geocode(44.0, -79.38)['formatted_address'],
+                         u'10 Bloor Street East, Toronto')
+        self.assertEqual(self._gazetteer.reverse_geocode(43.0, -79.38)['formatted_address'],
+                         u'1 Yonge Street, Toronto')
+
+    def test_reverse_geocode_matches_brute_force(self):
+        entries = [self._gazetteer._entry(i) for i in range(len(self._gazetteer))]
+        for latitude in (43.64, 43.645, 43.65, 43.66, 43.67):
+            for longitude in (-79.39, -79.385, -79.38, -79.375):
+                closest = min(entries, key=lambda x: (x[4] - latitude) ** 2 + ((x[5] - longitude) * 0.72) ** 2)
+                self.assertEqual(self._gazetteer.reverse_geocode(latitude, longitude)['latitude'], closest[4])
+
+    def test_empty(self):
+        csv_path = os.path.join(self._directory, 'empty.csv')
+        with open(csv_path, 'wb') as f:
+            f.write('address,latitude,longitude\n')
+
+        path = os.path.join(self._directory, 'empty.gaz')
+        Gazetteer.build(csv_path, path)
+        with Gazetteer(path) as gazetteer:
+            self.assertEqual(len(gazetteer), 0)
+            self.assertEqual(gazetteer.geolocate('1 yonge st'), [])
+            self.assertIsNone(gazetteer.reverse_geocode(43.0, -79.0))
+
+    def test_not_an_index(self):
+        path = os.path.join(self._directory, 'bad.gaz')
+        with open(path, 'wb') as f:
+            f.write('address,latitude')
+
+        with self.assertRaises(GazetteerException):
+            Gazetteer(path)
+
+    def test_client_geocoder(self):
+        flexmock(geolocation).should_receive('geolocate').never()
+        (flexmock(UberClient)
+            .should_receive('_send_message')
+            .with_args('Pickup',
+                       params={'vehicleViewId': 1, 'useCredits': True,
+                               'pickupLocation': self._gazetteer.geolocate('353 King Street West, Toronto')[0]},
+                       location=None)
+            .and_return({})
+            .once()
+        )
+
+        client = UberClient('test@test.org', '12345', geocoder=self._gazetteer)
+        client.request_pickup('353 king st w toronto', vehicle_type=1)
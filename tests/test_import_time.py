@@ -0,0 +1,33 @@
+import subprocess
+import sys
+import unittest
+
+# modules that are expensive to import, and are only needed by some of the functionality
+HEAVY_MODULES = ['requests', 'dateutil', 'Crypto', 'numpy', 'msgpack']
+
+# cumulative import time budget of the uber package, in microseconds
+IMPORT_TIME_BUDGET = 50000
+
+
+def run_python(*args):
+    return subprocess.check_output([sys.executable] + list(args), stderr=subprocess.STDOUT).decode('utf8')
+
+
+class TestImportTime(unittest.TestCase):
+    def test_heavy_modules_are_not_imported(self):
+        output = run_python('-c', 'import sys, uber; print(",".join(sorted(sys.modules)))')
+        loaded = set(output.strip().split(','))
+
+        for name in HEAVY_MODULES:
+            self.assertNotIn(name, loaded)
+
+    def test_import_time(self):
+        # measured in a fresh interpreter, without its own startup. The best of a few runs, so that a loaded machine
+        # doesn't fail the test
+        script = 'import time; started = time.time(); import uber; print(int((time.time() - started) * 1e6))'
+        import_time = min(int(run_python('-c', script)) for _ in range(3))
+
+        self.assertLess(import_time, IMPORT_TIME_BUDGET)
+
+if __name__ == '__main__':
+    unittest.main()
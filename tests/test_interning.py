@@ -0,0 +1,178 @@
+import copy
+import json
+import pickle
+import sys
+import unittest
+from flexmock import flexmock
+from tests import app_state_payload, mocked_response, vehicle_path_payload
+from uber import UberClient, GPSLocation
+from uber.interning import Interner, FrozenDict
+from uber.models import AppState
+from uber.streaming import StreamingDecoder
+
+
+def recorded_pings(count):
+    """
+    a corpus of PingClient responses, as they come in while polling: the vehicles move and the surge changes, the
+    rest stays the same
+    """
+    pings = []
+    for i in range(count):
+        vehicles = {
+            8: dict(('a{}'.format(j), vehicle_path_payload(1384233249575 + i * 1000, 37.76 + (i + j) * 0.0001, -122.4))
+                    for j in range(i % 5 + 1)),
+            1: {'b1': vehicle_path_payload(1384233249575, 37.77, -122.41)},
+        }
+        pings.append(json.dumps(app_state_payload(vehicles=vehicles, multiplier=1 + i % 3 * 0.25)))
+
+    return pings
+
+
+def thawed(value):
+    """
+    interned data as json.loads would decode it: arrays as lists
+    """
+    return json.loads(json.dumps(value))
+
+
+def deep_size(values):
+    """
+    bytes used by values and everything they reference, shared objects counted once
+    """
+    seen = set()
+    size = 0
+    stack = list(values)
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            stack.extend(value.iterkeys())
+            stack.extend(value.itervalues())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+    return size
+
+
+class TestFrozenDict(unittest.TestCase):
+    def test_immutable(self):
+        value = FrozenDict({'a': 1})
+        for modify in (lambda: value.__setitem__('a', 2), lambda: value.__delitem__('a'), lambda: value.update(b=2),
+                       value.clear, value.popitem, lambda: value.pop('a'), lambda: value.setdefault('b', 2)):
+            self.assertRaises(TypeError, modify)
+
+        self.assertEqual(value, {'a': 1})
+
+    def test_copies(self):
+        value = FrozenDict({'a': [1]})
+        self.assertIs(copy.copy(value), value)
+        self.assertIs(copy.deepcopy(value), value)
+        self.assertEqual(pickle.loads(pickle.dumps(value)), value)
+        self.assertIsInstance(pickle.loads(pickle.dumps(value)), FrozenDict)
+
+
+class TestInterner(unittest.TestCase):
+    def test_loads_like_json(self):
+        payload = json.dumps(app_state_payload(multiplier=1.5))
+        self.assertEqual(thawed(Interner().loads(payload)), json.loads(payload))
+
+    def test_shares_across_documents(self):
+        interner = Interner()
+        first = interner.loads(json.dumps(app_state_payload()))
+        second = interner.loads(json.dumps(app_state_payload(multiplier=2)))
+
+        self.assertIs(first['client'], second['client'])
+        self.assertIs(first['city']['vehicleViews']['1'], second['city']['vehicleViews']['1'])
+        self.assertIsNot(first['city']['vehicleViews']['8'], second['city']['vehicleViews']['8'])
+        self.assertIs(first['city']['vehicleViews']['8']['mapImages'][0],
+                      second['city']['vehicleViews']['8']['mapImages'][0])
+        self.assertIs(first['city']['cityName'], second['city']['cityName'])
+        self.assertIs(first['nearbyVehicles']['8']['vehiclePaths'], second['nearbyVehicles']['8']['vehiclePaths'])
+        self.assertGreater(interner.hits, 0)
+
+    def test_json_types_are_not_merged(self):
+        interner = Interner()
+        values = [interner.loads(x) for x in ('{"a": 1}', '{"a": true}', '{"a": 1.0}', '{"a": "1"}')]
+
+        self.assertEqual([type(x['a']) for x in values], [int, bool, float, unicode])
+        self.assertIs(interner.loads('{"a": 1}'), values[0])
+
+    def test_responses_are_immutable(self):
+        interner = Interner()
+        payload = json.dumps(app_state_payload())
+        first, second = AppState(interner.loads(payload)), AppState(interner.loads(payload))
+
+        self.assertIsInstance(first.city.vehicle_views_order, tuple)
+        self.assertRaises(AttributeError, lambda: first.city.vehicle_views_order.append(99))
+        self.assertRaises(TypeError, lambda: first.raw['city'].__setitem__('cityName', 'Oakland'))
+        self.assertEqual(second.city.vehicle_views_order, first.city.vehicle_views_order)
+        self.assertEqual(thawed(second.raw), json.loads(payload))
+
+    def test_nested_arrays(self):
+        interner = Interner()
+        first = interner.loads('{"a": [[1, "x"], [2]], "b": [{"c": 1}]}')
+        second = interner.loads('{"d": [[1, "x"]]}')
+
+        self.assertEqual(first, {'a': ((1, 'x'), (2,)), 'b': ({'c': 1},)})
+        self.assertIsInstance(first['a'][0], tuple)
+        self.assertIs(first['a'][0], second['d'][0])
+
+    def test_max_entries(self):
+        interner = Interner(max_entries=10)
+        first = interner.loads('{"a": {"b": 1}}')
+        for i in range(20):
+            interner.loads('{"x": %d}' % i)
+
+        self.assertLessEqual(len(interner), 10)
+        self.assertEqual(interner.loads('{"a": {"b": 1}}'), first)
+
+    def test_models(self):
+        app_state = AppState(Interner().loads(json.dumps(app_state_payload(multiplier=1.5))))
+
+        self.assertEqual(app_state.city.vehicle_views[8].surge.multiplier, 1.5)
+        self.assertEqual(app_state.nearby_vehicles[8].min_eta, 3)
+        self.assertEqual(app_state.client.first_name, 'John')
+
+    def test_streaming(self):
+        interner = Interner()
+        payload = json.dumps(app_state_payload())
+        first = interner.loads(payload)
+        second = StreamingDecoder(['city.vehicleViews'], interner.object_pairs_hook).decode([payload])
+
+        self.assertIs(second['client'], first['client'])
+        self.assertIsInstance(second, FrozenDict)
+        self.assertNotIn('vehicleViews', second['city'])
+
+    def test_client(self):
+        interner = Interner()
+        client = UberClient('test@test.org', '12345', interner=interner)
+        (flexmock(client._session)
+            .should_receive('post')
+            .and_return(mocked_response(app_state_payload())))
+
+        first = client.ping(GPSLocation(1, 2))
+        second = client.ping(GPSLocation(1, 2))
+
+        self.assertIsInstance(first.raw, FrozenDict)
+        self.assertIs(first.raw, second.raw)
+        self.assertEqual(first.client.status, 'Looking')
+
+
+class TestMemory(unittest.TestCase):
+    def test_memory(self):
+        pings = recorded_pings(200)
+
+        decoded = [json.loads(x) for x in pings]
+        interner = Interner()
+        interned = [interner.loads(x) for x in pings]
+
+        size, interned_size = deep_size(decoded), deep_size(interned)
+        sys.stdout.write('\n{} pings: {} bytes decoded, {} bytes interned ({:.0%})\n'.format(
+            len(pings), size, interned_size, float(interned_size) / size))
+
+        self.assertEqual([thawed(x) for x in interned], decoded)
+        self.assertLess(interned_size, size / 3)
@@ -1,4 +1,7 @@
+import pickle
 import unittest
+from datetime import datetime
+from StringIO import StringIO
 from uber.model_base import *
 
 class DummySubModel(Model):
@@ -92,6 +95,120 @@ class TestModelBase(unittest.TestCase):
         model.id = 2
         self.assertEqual(model.id, 2)
 
+    def test_printer_inherited_fields(self):
+        class ChildModel(DummySubModel):
+            name = StringField('name')
+
+        printed = str(ChildModel({'id': 1, 'name': 'child'}))
+        self.assertIn('id: 1', printed)
+        self.assertIn("name: 'child'", printed)
+        self.assertEqual(printed.index('id:') < printed.index('name:'), True)
+
+    def test_printer_stream(self):
+        model = DummyModel({'someNumber': 1, 'someArray': [{'id': x} for x in range(10)]})
+        stream = StringIO()
+        model.dump(stream)
+        self.assertEqual(stream.getvalue(), str(model))
+
+        chunks = list(ModelPrinter().iter_chunks(model))
+        self.assertEqual(''.join(chunks), str(model))
+        self.assertTrue(len(chunks) > 10)
+
+    def test_printer_limits(self):
+        model = DummyModel({'someArray': [{'id': x} for x in range(10)], 'someModel': {'id': 5}})
+
+        printed = ModelPrinter(max_items=2).pprint(model)
+        self.assertIn('id: 1', printed)
+        self.assertNotIn('id: 2', printed)
+        self.assertIn('...', printed)
+
+        printed = ModelPrinter(max_depth=1).pprint(model)
+        self.assertNotIn('id: 5', printed)
+        self.assertIn('{...}', printed)
+
+    def test_field_registry(self):
+        class ChildModel(DummySubModel):
+            name = StringField('name')
+
+        self.assertEqual(ChildModel._fields.keys(), ['id', 'name'])
+        self.assertEqual(ChildModel._json_fields, {'id': 'id', 'name': 'name'})
+        self.assertEqual(DummyModel._json_fields['someNumber'], 'some_number')
+
+    def test_to_dict(self):
+        model = DummyModel({
+            'someNumber': 1,
+            'someArray': [{'id': 3}],
+            'someModel': {'id': 5},
+            'someDict': {'a': {'id': 6}},
+            'undeclared': 'x',
+        })
+
+        self.assertEqual(model.to_dict(), {
+            'some_number': 1,
+            'some_boolean': None,
+            'some_array': [{'id': 3}],
+            'some_model': {'id': 5},
+            'some_dict': {'a': {'id': 6}},
+        })
+
+    def test_validate(self):
+        DummyModelOptional({}).validate()
+
+        with self.assertRaises(ValidationError) as expected_exception:
+            DummyModel({
+                'someNumber': 1,
+                'someBoolean': False,
+                'someArray': [{'id': 3}, {}],
+                'someDict': {'a': {}},
+            }).validate()
+
+        self.assertEqual(sorted(expected_exception.exception.errors),
+                         ['someArray.1.id', 'someDict.a.id', 'someModel'])
+
+    def test_eq_declared_fields(self):
+        self.assertEqual(DummySubModel({'id': 1, 'other': 1}), DummySubModel({'id': 1, 'other': 2}))
+        self.assertNotEqual(DummySubModel({'id': 1}), DummySubModel({'id': 2}))
+        self.assertFalse(DummySubModel({'id': 1}) == 1)
+
+    def test_epoch_field(self):
+        class EpochModel(Model):
+            epoch = EpochField('epoch')
+            epoch_millis = EpochField('epoch', as_millis=True)
+
+        model = EpochModel({'epoch': 1384233249575})
+        self.assertEqual(model.epoch, datetime(2013, 11, 12, 5, 14, 9, 575000))
+        self.assertEqual(model.epoch_millis, 1384233249575)
+
+    def test_epochs_to_datetimes(self):
+        epochs = [1384233249575, 1384233250575]
+        expected = [datetime(2013, 11, 12, 5, 14, 9, 575000), datetime(2013, 11, 12, 5, 14, 10, 575000)]
+        self.assertEqual(epochs_to_datetimes(epochs), expected)
+
+        try:
+            import numpy
+        except ImportError:
+            return
+
+        self.assertEqual(epochs_to_datetimes(epochs, as_numpy=True).tolist(), expected)
+
+    def test_parse_datetime(self):
+        from dateutil.parser import DEFAULTPARSER
+
+        for value in ['2016-02-01T00:00:00+00:00',
+                      '2016-02-01T10:11:12.5Z',
+                      '2016-02-01 10:11:12.123456-05:30',
+                      '2016-02-01T10:11:12+0200',
+                      '2016-02-01T10:11',
+                      '2016-02-01',
+                      'Feb 1 2016']:
+            parsed = parse_datetime(value)
+            expected = DEFAULTPARSER.parse(value)
+            self.assertEqual(parsed, expected)
+            self.assertEqual(parsed.utcoffset(), expected.utcoffset())
+
+        parsed = parse_datetime('2016-02-01T10:11:12+02:00')
+        self.assertEqual(pickle.loads(pickle.dumps(parsed)), parsed)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import unittest
+from flexmock import flexmock
+from uber import UberClient, GPSLocation, Place
+from uber.metrics import InMemoryMetrics
+from uber.places import PlaceIndex, CachedPlaceSearch, tokenize
+
+
+def place(id, nickname, address, latitude=43.65, longitude=-79.38):
+    return Place({
+        'id': id,
+        'type': 'foursquare',
+        'nickname': nickname,
+        'formatted_address': address,
+        'latitude': latitude,
+        'longitude': longitude,
+    })
+
+
+HERE = GPSLocation(43.65, -79.38)
+ELSEWHERE = GPSLocation(40.71, -74.0)
+
+
+class TestPlaceIndex(unittest.TestCase):
+    def setUp(self):
+        self._index = PlaceIndex()
+        self._index.add([
+            place(1, 'Gym at 353 King St', '353 King St W, Toronto', 43.646, -79.39),
+            place(2, 'Kingsway Gym', '10 Bloor St, Toronto', 43.651, -79.38),
+            place(3, u'Caf\xe9 Crema', '1 Queen St, Toronto', 43.652, -79.381),
+        ], HERE)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('Gym at 353 King-St'), ['gym', 'at', '353', 'king', 'st'])
+        self.assertEqual(tokenize('Caf\xc3\xa9'), [u'caf\xe9'])
+        self.assertEqual(tokenize(None), [])
+
+    def test_prefix_search(self):
+        self.assertEqual([x.id for x in self._index.search('gym', HERE)], [2, 1])
+        self.assertEqual([x.id for x in self._index.search('gym ki', HERE)], [2, 1])
+        self.assertEqual([x.id for x in self._index.search('KING ST W', HERE)], [1])
+        self.assertEqual([x.id for x in self._index.search(u'caf\xe9', HERE)], [3])
+        self.assertEqual([x.id for x in self._index.search('gym', HERE, limit=1)], [2])
+
+    def test_no_match(self):
+        self.assertEqual(self._index.search('pool', HERE), [])
+        self.assertEqual(self._index.search('', HERE), [])
+        self.assertEqual(self._index.search('gym', ELSEWHERE), [])
+
+    def test_long_words(self):
+        index = PlaceIndex(max_prefix_length=4)
+        index.add([place(1, 'Supercalifragilistic', ''), place(2, 'Superb', '')], HERE)
+
+        self.assertEqual([x.id for x in index.search('superca', HERE)], [1])
+        self.assertEqual(len(index.search('supe', HERE)), 2)
+
+    def test_re_adding_replaces(self):
+        self._index.add([place(2, 'Kingsway Pool', '10 Bloor St, Toronto')], HERE)
+
+        self.assertEqual(len(self._index), 3)
+        self.assertEqual([x.id for x in self._index.search('gym', HERE)], [1])
+        self.assertEqual([x.id for x in self._index.search('pool', HERE)], [2])
+
+    def test_lru_eviction(self):
+        index = PlaceIndex(max_places=2)
+        index.add([place(1, 'Gym', ''), place(2, 'Pool', '')], HERE)
+
+        # touching 1 makes 2 the least recently used
+        index.search('gym', HERE)
+        index.add([place(3, 'Park', '')], HERE)
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.search('pool', HERE), [])
+        self.assertEqual([x.id for x in index.search('p', HERE)], [3])
+
+        # evicted places are gone from the prefixes too
+        self.assertNotIn('pool', index._cells[index.cell(HERE)].prefixes)
+
+    def test_partial_places(self):
+        index = PlaceIndex()
+        index.add([
+            Place({'nickname': 'Gym', 'latitude': 43.65, 'longitude': -79.38}),
+            Place({'id': 2, 'formatted_address': '1 Gym St'}),
+        ], HERE)
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual([x.raw.get('id') for x in index.search('gym', HERE)], [None, 2])
+
+
+class TestCachedPlaceSearch(unittest.TestCase):
+    def setUp(self):
+        self._client = UberClient('test@test.org', '12345')
+        self._metrics = InMemoryMetrics()
+        self._search = CachedPlaceSearch(self._client, metrics=self._metrics)
+
+    def test_miss_then_hit(self):
+        places = [place(1, 'Gym at 353 King St', ''), place(2, 'Kingsway Gym', '', 43.66)]
+        flexmock(self._client).should_receive('nearby_places').with_args('gy', HERE).and_return(places).once()
+
+        self.assertEqual(self._search.nearby_places('gy', HERE), places)
+        self.assertEqual(len(self._search.nearby_places('gym', HERE)), 2)
+        self.assertEqual([x.id for x in self._search.nearby_places('gym ki', HERE)], [1, 2])
+
+        self.assertEqual(self._metrics.counter('places.miss'), 1)
+        self.assertEqual(self._metrics.counter('places.hit'), 2)
+        self.assertAlmostEqual(self._search.hit_rate, 2 / 3.0)
+
+    def test_other_cell_is_a_miss(self):
+        flexmock(self._client).should_receive('nearby_places').and_return([place(1, 'Gym', '')]).twice()
+
+        self._search.nearby_places('gym', HERE)
+        self._search.nearby_places('gym', ELSEWHERE)
+
+        self.assertEqual(self._metrics.counter('places.miss'), 2)
+
+    def test_partial_places(self):
+        places = [Place({'id': 1, 'nickname': 'Gym'})]
+        flexmock(self._client).should_receive('nearby_places').and_return(places).once()
+
+        self.assertEqual(self._search.nearby_places('gym', HERE), places)
+        self.assertEqual(self._search.nearby_places('gym', HERE), places)
@@ -0,0 +1,108 @@
+import unittest
+from flexmock import flexmock
+from tests import app_state_payload, vehicle_path_payload
+from uber import UberClient, GPSLocation
+from uber.deltas import AppStateTracker
+from uber.polling import AdaptivePoller
+from uber.scheduler import Scheduler
+
+# 2013-11-12 05:14:09 UTC, the epoch of the fixture vehicle paths
+NOW = 1384233249.575
+
+
+class TestAdaptivePoller(unittest.TestCase):
+    def setUp(self):
+        self._client = UberClient('test@test.org', '12345')
+        self._scheduler = Scheduler(workers=0, clock=lambda: NOW)
+        self._location = GPSLocation(37.76, -122.4)
+        self._deltas = []
+        self._poller = AdaptivePoller(self._client, self._location, self._deltas.append, self._scheduler,
+                                      clock=lambda: NOW)
+
+    def _ping_returns(self, *payloads):
+        flexmock(self._client).should_receive('ping').with_args(self._location).and_return(*payloads).one_by_one()
+
+    def test_slows_down_when_nothing_changes(self):
+        self._ping_returns(app_state_payload(), app_state_payload(), app_state_payload())
+
+        intervals = [self._poller.poll() for _ in range(3)]
+        self.assertEqual(intervals, [2.5, 3.75, 5.625])
+        self.assertEqual(len(self._deltas), 3)
+
+    def test_speeds_up_when_vehicles_move(self):
+        moved = {8: {'a1': vehicle_path_payload(1384233259575, 37.761, -122.406),
+                     'a2': vehicle_path_payload(1384233249575, 37.77062, -122.41647)}}
+        self._ping_returns(app_state_payload(), app_state_payload(), app_state_payload(vehicles=moved))
+
+        intervals = [self._poller.poll() for _ in range(3)]
+        self.assertEqual(intervals, [2.5, 3.75, 1.875])
+        self.assertEqual(len(self._deltas[2].vehicles_moved), 1)
+
+    def test_bounds(self):
+        poller = AdaptivePoller(self._client, self._location, lambda x: None, self._scheduler, min_interval=2,
+                                max_interval=4, initial_interval=3, clock=lambda: NOW)
+        self.assertEqual(poller.next_interval(AppStateTracker().update(app_state_payload()), NOW), 2)
+
+        poller.interval = 4
+        tracker = AppStateTracker()
+        tracker.update(app_state_payload())
+        self.assertEqual(poller.next_interval(tracker.update(app_state_payload()), NOW), 4)
+
+    def test_surge_expiration(self):
+        # the fixture surges expire at 1384233300, 50 seconds after NOW
+        tracker = AppStateTracker()
+        tracker.update(app_state_payload(multiplier=2.0))
+        self._poller.interval = 60
+        self.assertAlmostEqual(self._poller.next_interval(tracker.update(app_state_payload(multiplier=2.0)), NOW),
+                               30)
+
+        self._poller.interval = 40
+        self.assertAlmostEqual(self._poller.next_interval(tracker.update(app_state_payload(multiplier=2.0)), NOW),
+                               30)
+
+        poller = AdaptivePoller(self._client, self._location, lambda x: None, self._scheduler, max_interval=120,
+                                initial_interval=60, clock=lambda: NOW)
+        self.assertAlmostEqual(poller.next_interval(tracker.update(app_state_payload(multiplier=2.0)), NOW),
+                               1384233300 - NOW + 1)
+
+    def test_trip(self):
+        tracker = AppStateTracker()
+        self._poller.interval = 20
+        dispatching = app_state_payload(status='Dispatching', trip={'dispatchPercent': 0.4})
+        self.assertEqual(self._poller.next_interval(tracker.update(dispatching), NOW), 1)
+
+        self._poller.interval = 20
+        waiting = app_state_payload(status='WaitingForPickup', trip={'dispatchPercent': 1, 'eta': 2})
+        self.assertEqual(self._poller.next_interval(tracker.update(waiting), NOW), 10)
+
+    def test_errors_back_off(self):
+        flexmock(self._client).should_receive('ping').and_raise(ValueError('boom'))
+
+        self.assertEqual(self._poller.poll(), 7.5)
+        self.assertEqual(self._poller.errors, 1)
+        self.assertEqual(self._deltas, [])
+
+    def test_callback_errors(self):
+        self._ping_returns(app_state_payload(), app_state_payload())
+        error = ValueError('boom')
+
+        def callback(delta):
+            self._deltas.append(delta)
+            raise error
+
+        poller = AdaptivePoller(self._client, self._location, callback, self._scheduler, clock=lambda: NOW)
+        self.assertEqual(poller.poll(), 2.5)
+        self.assertEqual(poller.poll(), 3.75)
+        self.assertEqual(poller.errors, 2)
+        self.assertIs(poller.last_error, error)
+        self.assertEqual(len(self._deltas), 2)
+
+    def test_runs_on_the_scheduler(self):
+        self._ping_returns(app_state_payload(), app_state_payload())
+
+        task = self._poller.start()
+        self._scheduler.run_pending()
+        self._poller.stop()
+
+        self.assertEqual(task.runs, 1)
+        self.assertIsNone(self._scheduler.run_pending())
@@ -0,0 +1,94 @@
+import json
+import unittest
+from flexmock import flexmock
+from tests import app_state_payload
+from uber import UberClient, AppState, GPSLocation
+from uber.models import Client, Surge, VehicleLocation
+from uber.projection import Projection, get_projection
+from uber.streaming import StreamingDecoder
+
+
+FIELDS = ['client.status', 'trip.eta', 'nearby_vehicles.*.min_eta']
+
+
+class TestProjection(unittest.TestCase):
+    def setUp(self):
+        self._payload = app_state_payload(multiplier=1.5, trip={'eta': 4, 'dispatchPercent': 1})
+
+    def test_extract(self):
+        record = get_projection(AppState, FIELDS).extract(self._payload)
+        self.assertEqual(record, {'client.status': 'Looking', 'trip.eta': 4, 'nearby_vehicles.*.min_eta': {8: 3}})
+
+    def test_extract_from_model(self):
+        record = get_projection(AppState, FIELDS).extract(AppState(self._payload))
+        self.assertEqual(record['trip.eta'], 4)
+
+    def test_values_are_converted_by_their_field(self):
+        record = Projection(AppState, ['client', 'city.vehicle_views.8.surge', 'city.vehicle_views.*.surge.multiplier',
+                                       'nearby_vehicles.*.vehicle_paths.a1.0', 'client.payment_profiles.0.id',
+                                       'client.payment_profiles.5.id']).extract(self._payload)
+
+        self.assertIsInstance(record['client'], Client)
+        self.assertIsInstance(record['city.vehicle_views.8.surge'], Surge)
+        self.assertEqual(record['city.vehicle_views.*.surge.multiplier'], {8: 1.5, 1: None})
+        self.assertIsInstance(record['nearby_vehicles.*.vehicle_paths.a1.0'][8], VehicleLocation)
+        self.assertEqual(record['client.payment_profiles.0.id'], 11223344)
+        self.assertIsNone(record['client.payment_profiles.5.id'])
+
+    def test_missing_values(self):
+        payload = app_state_payload()
+        del payload['nearbyVehicles']
+
+        record = get_projection(AppState, FIELDS).extract(payload)
+        self.assertEqual(record, {'client.status': 'Looking', 'trip.eta': None, 'nearby_vehicles.*.min_eta': None})
+
+    def test_invalid_paths(self):
+        for path in ['client.nope', 'client.status.length', 'nearby_vehicles.*.min_eta.x', 'client.payment_profiles.x',
+                     '']:
+            with self.assertRaises(ValueError):
+                Projection(AppState, [path])
+
+    def test_cached(self):
+        self.assertIs(get_projection(AppState, FIELDS), get_projection(AppState, list(FIELDS)))
+
+    def test_skip(self):
+        skip = get_projection(AppState, FIELDS).skip
+        self.assertIn('city', skip)
+        self.assertIn('client.paymentProfiles', skip)
+        self.assertIn('nearbyVehicles.*.vehiclePaths', skip)
+        self.assertIn('trip.driver', skip)
+        self.assertNotIn('client.status', skip)
+        self.assertNotIn('nearbyVehicles.*.minEta', skip)
+
+        # a value read whole isn't skipped into
+        skip = Projection(AppState, ['client.status', 'client']).skip
+        self.assertFalse([x for x in skip if x.startswith('client')])
+
+        # neither are lists
+        skip = Projection(AppState, ['client.payment_profiles.*.id']).skip
+        self.assertFalse([x for x in skip if x.startswith('client.paymentProfiles')])
+
+    def test_skip_keeps_the_projected_values(self):
+        for fields in (FIELDS, ['city.vehicle_views.*.surge.multiplier', 'city.name'],
+                       ['nearby_vehicles.8.vehicle_paths', 'client.payment_profiles.0.card_type']):
+            projection = Projection(AppState, fields)
+            streamed = StreamingDecoder(projection.skip).decode([json.dumps(self._payload)])
+
+            self.assertEqual(projection.extract(streamed), projection.extract(self._payload))
+            self.assertLess(len(json.dumps(streamed)), len(json.dumps(self._payload)))
+
+
+class TestProjectedPing(unittest.TestCase):
+    def test_ping_fields(self):
+        client = UberClient('test@test.org', '12345')
+        location = GPSLocation(1, 2)
+        projection = get_projection(AppState, FIELDS)
+
+        (flexmock(client)
+            .should_receive('_send_message')
+            .with_args('PingClient', location=location, skip=projection.skip)
+            .and_return(app_state_payload())
+            .once())
+
+        self.assertEqual(client.ping(location, fields=FIELDS),
+                         {'client.status': 'Looking', 'trip.eta': None, 'nearby_vehicles.*.min_eta': {8: 3}})
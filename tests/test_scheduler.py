@@ -0,0 +1,90 @@
+import threading
+import unittest
+from uber.scheduler import Scheduler
+from uber.throttling import RateLimiter
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self._now = [0.0]
+        self._clock = lambda: self._now[0]
+
+    def test_jobs_run_in_due_order(self):
+        scheduler = Scheduler(workers=0, clock=self._clock)
+        runs = []
+
+        def job(name, interval, count):
+            def run():
+                runs.append((name, self._now[0]))
+                return interval if len([x for x in runs if x[0] == name]) < count else None
+            return run
+
+        scheduler.schedule(job('a', 3, 3), delay=1)
+        scheduler.schedule(job('b', 2, 3))
+
+        while True:
+            wait = scheduler.run_pending()
+            if wait is None:
+                break
+            self._now[0] += wait
+
+        self.assertEqual(runs, [('b', 0), ('a', 1), ('b', 2), ('a', 4), ('b', 4), ('a', 7)])
+        self.assertEqual(len(scheduler), 0)
+
+    def test_cancel(self):
+        scheduler = Scheduler(workers=0, clock=self._clock)
+        task = scheduler.schedule(lambda: 1)
+
+        scheduler.run_pending()
+        task.cancel()
+        self._now[0] += 1
+        scheduler.run_pending()
+
+        self.assertEqual(task.runs, 1)
+        self.assertTrue(task.done.is_set())
+        self.assertIsNone(scheduler.run_pending())
+
+    def test_errors_end_the_job(self):
+        scheduler = Scheduler(workers=0, clock=self._clock)
+        error = ValueError('boom')
+
+        def job():
+            raise error
+
+        task = scheduler.schedule(job)
+        self.assertIsNone(scheduler.run_pending())
+        self.assertIs(task.error, error)
+        self.assertTrue(task.done.is_set())
+
+    def test_budget_defers_jobs(self):
+        limiter = RateLimiter(1, burst=1, clock=self._clock)
+        scheduler = Scheduler(workers=0, rate_limiter=limiter, clock=self._clock)
+        first = scheduler.schedule(lambda: None)
+        second = scheduler.schedule(lambda: None)
+
+        self.assertEqual(scheduler.run_pending(), 1.0)
+        self.assertEqual((first.runs, second.runs), (1, 0))
+        self.assertEqual(scheduler.deferred.value, 1)
+
+        self._now[0] += 1
+        self.assertIsNone(scheduler.run_pending())
+        self.assertEqual(second.runs, 1)
+
+    def test_worker_threads(self):
+        scheduler = Scheduler(workers=3)
+        counts = [0] * 20
+        lock = threading.Lock()
+
+        def job(index):
+            def run():
+                with lock:
+                    counts[index] += 1
+                    return 0.001 if counts[index] < 5 else None
+            return run
+
+        tasks = [scheduler.schedule(job(i)) for i in range(20)]
+        for task in tasks:
+            self.assertTrue(task.done.wait(5))
+
+        scheduler.close()
+        self.assertEqual(counts, [5] * 20)
@@ -0,0 +1,92 @@
+import json
+import pickle
+import unittest
+from flexmock import flexmock
+from tests import app_state_payload
+from uber import AppState, City, VehicleLocation
+from uber.archive import ArchivedAppState
+from uber.decoding import decode_eager
+from uber.snapshots import snapshot, snapshot_type, from_json, from_data, pack, unpack
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self):
+        self._payload = app_state_payload(multiplier=1.5)
+
+    def test_snapshot_type(self):
+        city_type = snapshot_type(City)
+        self.assertEqual(city_type.__name__, 'CitySnapshot')
+        self.assertEqual(city_type._fields, tuple(City._fields))
+        self.assertIs(snapshot_type(City), city_type)
+
+    def test_model_subclasses(self):
+        expected = snapshot(AppState(self._payload))
+        archived = ArchivedAppState(flexmock(data=lambda index: self._payload), 0)
+
+        for model in (decode_eager(AppState, self._payload), archived):
+            state = snapshot(model)
+            self.assertIs(type(state), snapshot_type(AppState))
+            self.assertIs(type(state.city), snapshot_type(City))
+            self.assertEqual(state, expected)
+
+    def test_from_json(self):
+        state = from_json(AppState, json.dumps(self._payload))
+        self.assertEqual(state, snapshot(AppState(self._payload)))
+
+        self.assertIsInstance(state, snapshot_type(AppState))
+        self.assertEqual(state.city.name, 'San Francisco')
+        self.assertEqual(state.city.vehicle_views[8].surge.multiplier, 1.5)
+        self.assertEqual(state.city.vehicle_views[8].map_images[0].width, 30)
+        self.assertEqual(state.client.payment_profiles[0].card_expiration, '2016-02-01T00:00:00+00:00')
+        self.assertIsNone(state.trip)
+
+        path = state.nearby_vehicles[8].vehicle_paths['a1']
+        self.assertIsInstance(path, tuple)
+        self.assertIsInstance(path[0], snapshot_type(VehicleLocation))
+        self.assertEqual(path[0].epoch, 1384233249575)
+
+        with self.assertRaises(AttributeError):
+            state.city.name = 'Oakland'
+
+    def test_deeply_immutable(self):
+        self._payload['apiResponse'] = {'data': {'x': [1, {'y': 2}]}}
+        state = from_data(AppState, self._payload)
+
+        with self.assertRaises(TypeError):
+            state.city.vehicle_views[1] = None
+        with self.assertRaises(TypeError):
+            del state.nearby_vehicles[8].vehicle_paths['a1']
+
+        # raw values are frozen copies
+        order = state.city.vehicle_views_order
+        self.assertEqual(order, (8, 1))
+        self._payload['city']['vehicleViewsOrder'].append(3)
+        self.assertEqual(order, (8, 1))
+
+        data = state.api_response.data
+        self.assertEqual(data, {'x': (1, {'y': 2})})
+        with self.assertRaises(TypeError):
+            data['x'] = 2
+        with self.assertRaises(TypeError):
+            data['x'][1]['y'] = 3
+
+    def test_pickle(self):
+        state = from_data(AppState, self._payload)
+        self.assertEqual(pickle.loads(pickle.dumps(state, pickle.HIGHEST_PROTOCOL)), state)
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_pack(self):
+        state = from_data(AppState, self._payload)
+        packed = pack(state)
+
+        self.assertEqual(unpack(AppState, packed), state)
+        self.assertTrue(len(packed) < len(json.dumps(self._payload)) / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import unittest
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from tests import app_state_payload, vehicle_path_payload
+from uber import UberClient, GPSLocation
+from uber.streaming import StreamingDecoder, _Reader
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+DOCUMENT = json.dumps({
+    'messageType': 'OK',
+    'quote': 'a "quoted" {string} with [brackets] and \\ backslashes',
+    'unicode': u'caf\xe9 ☃',
+    'numbers': [1, -2.5, 3e10, True, False, None],
+    'nested': {'a': {'b': [{'c': 1}, {'c': 2}], 'd': {}}, 'e': []},
+    'empty': {},
+}, indent=1)
+
+
+class TestStreamingDecoder(unittest.TestCase):
+    def test_decodes_like_json(self):
+        for size in (1, 2, 3, 7, 64, 10000):
+            self.assertEqual(StreamingDecoder().decode(chunked(DOCUMENT, size)), json.loads(DOCUMENT))
+            self.assertEqual(StreamingDecoder(['nested.a.b']).decode(chunked(DOCUMENT, size))['empty'], {})
+
+    def test_scalar_documents(self):
+        self.assertEqual(StreamingDecoder(['a']).decode(['12', '34']), 1234)
+        self.assertEqual(StreamingDecoder(['a']).decode(['"x"']), 'x')
+        self.assertEqual(StreamingDecoder(['a']).decode(['[1, ', '2]']), [1, 2])
+
+    def test_skip(self):
+        expected = json.loads(DOCUMENT)
+        del expected['nested']['a']['b']
+        del expected['quote']
+
+        for size in (1, 5, 10000):
+            self.assertEqual(StreamingDecoder(['nested.a.b', 'quote']).decode(chunked(DOCUMENT, size)), expected)
+
+    def test_skip_wildcard(self):
+        payload = app_state_payload(vehicles={8: {'a1': [], 'a2': []}, 1: {'b1': []}})
+        data = StreamingDecoder(['nearbyVehicles.*.vehiclePaths', 'city.vehicleViews']).decode(
+            chunked(json.dumps(payload), 10))
+
+        self.assertEqual(sorted(data['nearbyVehicles']), ['1', '8'])
+        for nearby in data['nearbyVehicles'].itervalues():
+            self.assertNotIn('vehiclePaths', nearby)
+            self.assertEqual(nearby['minEta'], 3)
+
+        self.assertNotIn('vehicleViews', data['city'])
+        self.assertEqual(data['city']['cityName'], 'San Francisco')
+        self.assertEqual(data['client'], payload['client'])
+
+    def test_skipped_values_are_not_decoded(self):
+        document = '{"skipped": {"not": [json, at all]}, "kept": 1}'
+        self.assertEqual(StreamingDecoder(['skipped']).decode(chunked(document, 3)), {'kept': 1})
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            StreamingDecoder(['a']).decode(['{"a": 1'])
+
+        with self.assertRaises(ValueError):
+            StreamingDecoder(['a']).decode(['{"a": "1'])
+
+        with self.assertRaises(ValueError):
+            StreamingDecoder(['a']).decode(['{"a": 1} {}'])
+
+        with self.assertRaises(ValueError):
+            StreamingDecoder(['a.b']).decode(['{"a": {"b" 1}}'])
+
+        with self.assertRaises(ValueError):
+            StreamingDecoder(['b']).decode(['{"a": [1, ', '2}'])
+
+    def test_values_across_chunks(self):
+        document = '{"a": 1234, "b": "x\\"y", "c": true, "d": {"e": [1, 2]}}'
+        for size in (1, 2, 3, 5):
+            self.assertEqual(StreamingDecoder(['d.e']).decode(chunked(document, size)),
+                             {'a': 1234, 'b': 'x"y', 'c': True, 'd': {}})
+            self.assertEqual(StreamingDecoder(['a', 'b', 'c']).decode(chunked(document, size)),
+                             {'d': {'e': [1, 2]}})
+
+
+def large_payload(count):
+    """
+    a ping response with count vehicles and count vehicle views
+    """
+    payload = app_state_payload(vehicles={
+        8: dict(('a{}'.format(i), vehicle_path_payload(1384233249575 + i, 37.76, -122.4, points=10))
+                for i in range(count)),
+    })
+    payload['city']['vehicleViews'] = dict((str(i), payload['city']['vehicleViews']['8']) for i in range(count))
+    return json.dumps(payload)
+
+
+class CountingDecoder(json.JSONDecoder):
+    def __init__(self):
+        json.JSONDecoder.__init__(self)
+        self.decoded = 0
+
+    def raw_decode(self, text, index=0):
+        self.decoded += len(text) - index
+        return json.JSONDecoder.raw_decode(self, text, index)
+
+
+class TestLargePayloads(unittest.TestCase):
+    def setUp(self):
+        self._document = large_payload(2000)
+        self._chunks = chunked(self._document, 8192)
+
+    def test_skipped_values_are_not_held(self):
+        reader = _Reader(iter(self._chunks))
+        buffer_sizes = []
+
+        def chunks():
+            for chunk in self._chunks:
+                buffer_sizes.append(len(reader._buffer))
+                yield chunk
+
+        reader._chunks = chunks()
+        reader.skip_value()
+
+        self.assertTrue(reader.at_end())
+        self.assertLessEqual(max(buffer_sizes), 8192)
+
+    def test_values_are_decoded_once(self):
+        reader = _Reader(self._chunks)
+        decoder = CountingDecoder()
+
+        self.assertEqual(reader.decode_value(decoder), json.loads(self._document))
+        # once, after a first attempt on the first chunk
+        self.assertLessEqual(decoder.decoded, len(self._document) + 8192)
+
+    def test_decode(self):
+        expected = json.loads(self._document)
+        self.assertEqual(StreamingDecoder().decode(self._chunks), expected)
+
+        del expected['city']['vehicleViews']
+        self.assertEqual(StreamingDecoder(['city.vehicleViews']).decode(self._chunks), expected)
+
+
+class PayloadHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps(self.server.payload)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PayloadServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TestStreamingPing(unittest.TestCase):
+    def setUp(self):
+        self._server = PayloadServer(('127.0.0.1', 0), PayloadHandler)
+        self._server.payload = app_state_payload(multiplier=1.5)
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self._client = UberClient('test@test.org', '12345')
+        self._client.ENDPOINT = 'http://127.0.0.1:{}'.format(self._server.server_address[1])
+        self._client.STREAM_CHUNK_SIZE = 64
+
+    def tearDown(self):
+        self._client._adapter.close()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def test_ping_skip(self):
+        app_state = self._client.ping(GPSLocation(37.76, -122.4), skip=['city.vehicleViews'])
+
+        self.assertNotIn('vehicleViews', app_state.raw['city'])
+        self.assertEqual(app_state.nearby_vehicles[8].min_eta, 3)
+        self.assertEqual(app_state.client.status, 'Looking')
+
+    def test_ping_without_skip(self):
+        app_state = self._client.ping(GPSLocation(37.76, -122.4))
+        self.assertEqual(app_state.raw, self._server.payload)
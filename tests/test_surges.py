@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+from tests import app_state_payload
+from uber import AppState, GPSLocation
+from uber.surges import SurgeCollector, SurgeRecord
+
+
+class TestSurgeCollector(unittest.TestCase):
+    location = GPSLocation(37.775, -122.418)
+    other_location = GPSLocation(37.805, -122.418)
+
+    def setUp(self):
+        self._collector = SurgeCollector(cell_size=0.01)
+        for timestamp, multiplier in [(100, 1.5), (200, 2.0), (300, None)]:
+            self._collector.collect(AppState(app_state_payload(multiplier=multiplier)), self.location, timestamp)
+
+        self._collector.collect(app_state_payload(multiplier=3.0), {'latitude': 37.805, 'longitude': -122.418}, 150)
+
+    def test_query(self):
+        cell = self._collector.cell(self.location)
+        self.assertEqual(self._collector.query(location=self.location, vehicle_view_id=8), [
+            SurgeRecord(100, cell, 8, 1.5, 1384233300000, 34),
+            SurgeRecord(200, cell, 8, 2.0, 1384233300000, 34),
+            SurgeRecord(300, cell, 8, 1.0, None, 33),
+        ])
+
+        self.assertEqual(len(self._collector.query(cell=cell)), 6)
+        self.assertEqual([x.timestamp for x in self._collector.query(vehicle_view_id=8, start=150, end=250)],
+                         [150, 200])
+        other_records = self._collector.query(location=self.other_location)
+        self.assertEqual(sorted((x.vehicle_view_id, x.multiplier) for x in other_records), [(1, 1.0), (8, 3.0)])
+
+    def test_unordered_timestamps(self):
+        self._collector.collect(app_state_payload(multiplier=1.2), self.location, 50)
+        records = self._collector.query(location=self.location, vehicle_view_id=8, start=0, end=150)
+        self.assertEqual(sorted(x.timestamp for x in records), [50, 100])
+
+    def test_flush_and_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'surges.bin')
+            records = self._collector.query()
+            self.assertEqual(self._collector.flush(path), 8)
+            self.assertEqual(self._collector.flush(path), 0)
+
+            # flushed rows are dropped from memory, and queried from the file
+            self.assertEqual(self._collector._series, {})
+            self.assertEqual(len(self._collector), 8)
+            self.assertEqual(sorted(self._collector.query()), sorted(records))
+
+            self._collector.collect(app_state_payload(multiplier=1.2), self.location, 400)
+            records += self._collector.query(start=400)
+            self.assertEqual(self._collector.flush(path), 2)
+
+            loaded = SurgeCollector.load(path)
+            self.assertEqual(len(loaded), 10)
+            self.assertEqual(sorted(loaded.query()), sorted(records))
+            # 2 blocks, of 4 and 2 series
+            self.assertEqual(os.path.getsize(path), 2 * 36 + 6 * 36 + 10 * 40)
+
+            # the loaded rows are not written again, nor dropped
+            loaded.collect(app_state_payload(), self.location, 500)
+            self.assertEqual(loaded.flush(path), 2)
+            self.assertEqual(len(loaded.query()), 12)
+            self.assertEqual(sorted(SurgeCollector.load(path).query()), sorted(loaded.query()))
+
+            other_path = os.path.join(directory, 'other.bin')
+            loaded.collect(app_state_payload(), self.location, 600)
+            self.assertEqual(loaded.flush(other_path), 2)
+            self.assertEqual(len(loaded.query()), 14)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_query_flushed(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'surges.bin')
+            self._collector.collect(app_state_payload(multiplier=1.2), self.location, 50)
+            self._collector.flush(path)
+            self._collector.collect(app_state_payload(multiplier=1.7), self.location, 1000)
+
+            loaded = SurgeCollector.load(path)
+            for collector in (self._collector, loaded):
+                records = collector.query(location=self.location, vehicle_view_id=8, start=60, end=250)
+                self.assertEqual([(x.timestamp, x.multiplier) for x in records], [(100, 1.5), (200, 2.0)])
+                self.assertEqual([x.timestamp for x in collector.query(vehicle_view_id=8, end=120)], [50, 100])
+
+            self.assertEqual([x.multiplier for x in self._collector.query(vehicle_view_id=8, start=500)], [1.7])
+            self.assertEqual(loaded.query(start=500), [])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_query_reads_only_matching_blocks(self):
+        directory = tempfile.mkdtemp()
+        try:
+            old_path, new_path = os.path.join(directory, 'old.bin'), os.path.join(directory, 'new.bin')
+            self._collector.flush(old_path)
+            self._collector.collect(app_state_payload(multiplier=1.7), self.location, 1000)
+            self._collector.flush(new_path)
+
+            os.remove(old_path)
+            self.assertEqual([x.multiplier for x in self._collector.query(vehicle_view_id=8, start=500)], [1.7])
+            self.assertRaises(IOError, self._collector.query, vehicle_view_id=8, start=200)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_load_mixed_cell_sizes(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'surges.bin')
+            self._collector.flush(path)
+
+            other = SurgeCollector(cell_size=0.05)
+            other.collect(app_state_payload(), self.location, 100)
+            other.flush(path)
+
+            self.assertRaises(ValueError, SurgeCollector.load, path)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import threading
+import unittest
+from tests import app_state_payload, vehicle_path_payload
+from uber import AppState
+from uber.sweeps import GridSweep
+from uber.throttling import RateLimiter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class FakeClient(object):
+    """
+    reports a vehicle in the pinged cell, and a vehicle that is seen from every cell
+    """
+    def __init__(self):
+        self.pings = []
+        self._lock = threading.Lock()
+
+    def ping(self, location):
+        with self._lock:
+            self.pings.append((location.latitude, location.longitude))
+
+        vehicles = {8: {
+            'shared': vehicle_path_payload(1384233249575, 37.705, -122.505),
+            'v{:.3f}{:.3f}'.format(location.latitude, location.longitude):
+                vehicle_path_payload(1384233249575, location.latitude, location.longitude, points=1),
+        }}
+        return AppState(app_state_payload(vehicles=vehicles))
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestGridSweep(unittest.TestCase):
+    def setUp(self):
+        self._client = FakeClient()
+        self._sweep = GridSweep(self._client, south=37.70, west=-122.51, north=37.729, east=-122.48, cell_size=0.01,
+                                workers=4, rate_limiter=RateLimiter(1000))
+
+    def test_grid_points(self):
+        points = self._sweep.grid_points()
+        self.assertEqual(self._sweep.shape, (3, 4))
+        self.assertEqual(len(points), 12)
+        self.assertEqual(points[0][0], (0, 0))
+        self.assertAlmostEqual(points[0][1].latitude, 37.705)
+        self.assertAlmostEqual(points[0][1].longitude, -122.505)
+
+    def test_sweep(self):
+        result = self._sweep.sweep()
+        self.assertEqual(len(self._client.pings), 12)
+        self.assertEqual(result.errors, {})
+
+        # one vehicle per cell, plus the shared vehicle (counted once) in the first cell
+        self.assertEqual(len(result.vehicles), 13)
+        self.assertEqual(result.counts.sum(), 13)
+        self.assertEqual(result.counts[0, 0], 2)
+        self.assertEqual(result.counts[2, 3], 1)
+        self.assertTrue((result.min_eta == 3).all())
+
+    def test_resweep(self):
+        self._sweep.sweep()
+        self._client.pings = []
+
+        result = self._sweep.resweep(max_cells=5)
+        self.assertEqual(len(self._client.pings), 5)
+        self.assertEqual(len(result.pinged), 5)
+
+        # cells that weren't pinged keep their previous observations
+        self.assertEqual(result.counts.sum(), 13)
+
+    def test_resweep_changed_cells_first(self):
+        self._sweep.sweep()
+        ping = self._client.ping
+        changed = dict(self._sweep.grid_points())[1, 1]
+
+        def ping_with_new_vehicle(location):
+            app_state = ping(location)
+            if (location.latitude, location.longitude) == (changed.latitude, changed.longitude):
+                app_state.raw['nearbyVehicles']['8']['vehiclePaths']['new'] = vehicle_path_payload(
+                    1384233249575, location.latitude, location.longitude)
+            return app_state
+
+        self._client.ping = ping_with_new_vehicle
+        self._sweep.sweep()
+        self._client.ping = ping
+        self._client.pings = []
+
+        result = self._sweep.resweep(max_cells=1)
+        self.assertEqual(result.pinged, [(1, 1)])
+
+    def test_errors(self):
+        def ping(location):
+            raise ValueError('boom')
+
+        self._client.ping = ping
+        result = self._sweep.sweep()
+        self.assertEqual(len(result.errors), 12)
+        self.assertEqual(result.counts.sum(), 0)
+
+    def test_errors_drop_stale_observations(self):
+        self._sweep.sweep()
+
+        ping = self._client.ping
+
+        def failing_ping(location):
+            if location.latitude < 37.71:
+                return AppState({'nearbyVehicles': 'not a dict'})
+            return ping(location)
+
+        self._client.ping = failing_ping
+        result = self._sweep.sweep()
+
+        # the first row failed while reading the responses: its cells are empty, and swept again first
+        self.assertEqual(sorted(result.errors), [(0, 0), (0, 1), (0, 2), (0, 3)])
+        self.assertTrue(numpy.isnan(result.min_eta[0]).all())
+        # the vehicles of the other rows, and the shared vehicle they also see
+        self.assertEqual(result.counts.sum(), 9)
+
+        self._client.pings = []
+        self._client.ping = ping
+        self._sweep.resweep(max_cells=4)
+        self.assertTrue(all(latitude < 37.71 for latitude, _ in self._client.pings))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import gc
+import threading
+import time
+import unittest
+import weakref
+from flexmock import flexmock
+from uber import UberClient
+from uber.client import Events
+from uber.telemetry import EventEmitter, DropPolicy
+
+
+class RecordingClient(UberClient):
+    def __init__(self):
+        super(RecordingClient, self).__init__('test@test.org', '12345')
+        self.batches = []
+        self.sent = threading.Event()
+        self.fail = False
+
+    def _send_events(self, events):
+        if self.fail:
+            raise IOError('events.uber.com is down')
+
+        self.batches.append([x['eventName'] for x in events])
+        self.sent.set()
+
+
+class TestEventEmitter(unittest.TestCase):
+    def setUp(self):
+        self._client = RecordingClient()
+
+    def test_batch_size(self):
+        emitter = EventEmitter(self._client, batch_size=2, flush_interval=60)
+        emitter.emit(Events.SIGNIN_REQUEST)
+        emitter.emit(Events.NEAREST_CAB_REQUEST, params={'vehicleViewId': 8})
+
+        self.assertTrue(self._client.sent.wait(5))
+        self.assertEqual(self._client.batches, [[Events.SIGNIN_REQUEST, Events.NEAREST_CAB_REQUEST]])
+        emitter.close()
+
+    def test_flush_interval(self):
+        emitter = EventEmitter(self._client, batch_size=100, flush_interval=0.05)
+        emitter.emit(Events.SIGNIN_REQUEST)
+
+        self.assertTrue(self._client.sent.wait(5))
+        self.assertEqual(emitter.sent, 1)
+        emitter.close()
+
+    def test_close_flushes(self):
+        emitter = EventEmitter(self._client, batch_size=100, flush_interval=60)
+        for _ in range(3):
+            emitter.emit(Events.MESSAGE_DISMISS)
+
+        emitter.close()
+        self.assertEqual(sum(len(x) for x in self._client.batches), 3)
+        self.assertFalse(emitter.emit(Events.MESSAGE_DISMISS))
+
+    def test_drop_policies(self):
+        emitter = EventEmitter(self._client, batch_size=100, flush_interval=60, max_queued=2)
+        for name in ['a', 'b', 'c']:
+            emitter.emit(name)
+
+        self.assertEqual(emitter.dropped, 1)
+        emitter.close()
+        self.assertEqual(self._client.batches, [['b', 'c']])
+
+        self._client.batches = []
+        emitter = EventEmitter(self._client, batch_size=100, flush_interval=60, max_queued=2,
+                               drop_policy=DropPolicy.NEWEST)
+        self.assertEqual([emitter.emit(name) for name in ['a', 'b', 'c']], [True, True, False])
+        emitter.close()
+        self.assertEqual(self._client.batches, [['a', 'b']])
+
+    def test_failures_are_counted(self):
+        self._client.fail = True
+        emitter = EventEmitter(self._client, batch_size=100, flush_interval=60)
+        emitter.emit(Events.SIGNIN_REQUEST)
+        emitter.close()
+        self.assertEqual(emitter.failed, 1)
+        self.assertEqual(emitter.sent, 0)
+
+    def test_failures_are_counted_per_event(self):
+        client = UberClient('test@test.org', '12345')
+
+        def post(endpoint, data):
+            if data['eventName'] == 'b':
+                raise IOError('timeout')
+
+        flexmock(client).should_receive('_post').replace_with(post).times(3)
+
+        emitter = EventEmitter(client, batch_size=100, flush_interval=60)
+        for name in ['a', 'b', 'c']:
+            emitter.emit(name)
+        emitter.close()
+
+        self.assertEqual(emitter.sent, 2)
+        self.assertEqual(emitter.failed, 1)
+
+    def test_emitters_are_collected(self):
+        emitter = EventEmitter(self._client, batch_size=100, flush_interval=0.01)
+        thread = emitter._thread
+        reference = weakref.ref(emitter)
+
+        del emitter
+        gc.collect()
+        self.assertIsNone(reference())
+
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+from uber.throttling import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_token_bucket(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        limiter = RateLimiter(2, burst=2, clock=lambda: now[0], sleep=sleep)
+        self.assertTrue(limiter.try_acquire())
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+        self.assertFalse(limiter.acquire(timeout=0.1))
+
+        self.assertTrue(limiter.acquire())
+        self.assertEqual(sleeps, [0.5])
+
+    def test_more_than_burst(self):
+        limiter = RateLimiter(2, burst=2)
+        self.assertRaises(ValueError, limiter.acquire, 3)
+        self.assertRaises(ValueError, limiter.try_acquire, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import math
+import unittest
+from tests import app_state_payload, vehicle_path_payload
+from uber import AppState, NearbyVehicles
+from uber.trajectories import Trajectory, TrajectoryStore
+
+
+class TestTrajectories(unittest.TestCase):
+    def test_ring_buffer(self):
+        trajectory = Trajectory(3)
+        self.assertIsNone(trajectory.latest())
+
+        for i in range(5):
+            trajectory.append(i, 10 + i, 20 + i, None if i == 4 else 90)
+
+        self.assertEqual(len(trajectory), 3)
+        self.assertEqual(trajectory.last_epoch, 4)
+        self.assertEqual([x[:3] for x in trajectory.points()], [(2, 12, 22), (3, 13, 23), (4, 14, 24)])
+        self.assertTrue(math.isnan(trajectory.latest()[3]))
+
+    def test_merge_pings(self):
+        store = TrajectoryStore(capacity=10, ttl=60)
+        store.add(AppState(app_state_payload()), now=0)
+        self.assertEqual(sorted(store.vehicle_ids()), ['a1', 'a2'])
+        self.assertEqual(len(store['a1']), 3)
+
+        # overlaps the previous path by two points
+        nearby = NearbyVehicles({'vehiclePaths': {'a1': vehicle_path_payload(1384233250575, 37.7, -122.4, points=4)}})
+        store.add(nearby, now=30)
+
+        epochs = [x[0] for x in store['a1'].points()]
+        self.assertEqual(epochs, [1384233249575 + i * 1000 for i in range(5)])
+
+    def test_expire(self):
+        store = TrajectoryStore(ttl=60)
+        store.add(AppState(app_state_payload()), now=0)
+
+        nearby = NearbyVehicles({'vehiclePaths': {'a1': vehicle_path_payload(1384233259575, 37.7, -122.4)}})
+        self.assertEqual(store.add(nearby, now=50), [])
+        self.assertEqual(store.add(nearby, now=100), ['a2'])
+        self.assertNotIn('a2', store)
+        self.assertIn('a1', store)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from flexmock import flexmock
+from tests import app_state_payload
+from uber import UberClient
+from uber.scheduler import Scheduler
+from uber.throttling import RateLimiter
+from uber.watchers import TripWatchers, WatchOutcome
+
+
+class TestTripWatchers(unittest.TestCase):
+    def setUp(self):
+        self._now = [0.0]
+        self._clock = lambda: self._now[0]
+        self._scheduler = Scheduler(workers=0, clock=self._clock)
+        self._watchers = TripWatchers(self._scheduler, interval=1.0, clock=self._clock)
+        self._deltas = []
+
+    def _client(self, *statuses):
+        client = UberClient('test@test.org', '12345')
+        (flexmock(client)
+            .should_receive('ping')
+            .and_return(*[app_state_payload(status=x) for x in statuses])
+            .one_by_one())
+        return client
+
+    def _run(self, until=100):
+        while self._now[0] <= until:
+            wait = self._scheduler.run_pending()
+            if wait is None:
+                return
+            self._now[0] += wait
+
+    def _on_delta(self, watcher, delta):
+        self._deltas.append((self._now[0], delta.client_status))
+
+    def test_watches_until_looking(self):
+        client = self._client('Dispatching', 'WaitingForPickup', 'WaitingForPickup', 'Looking')
+        flexmock(client).should_receive('cancel_pickup').never()
+
+        watcher = self._watchers.watch(client, self._on_delta)
+        self.assertEqual(len(self._watchers), 1)
+        self._run()
+
+        self.assertEqual(watcher.outcome, WatchOutcome.ENDED)
+        self.assertTrue(watcher.done.is_set())
+        self.assertEqual(len(self._watchers), 0)
+        self.assertEqual(self._deltas, [(0, (None, 'Dispatching')), (1, ('Dispatching', 'WaitingForPickup')), (2, None),
+                                        (3, ('WaitingForPickup', 'Looking'))])
+
+    def test_deadline_cancels_pending_pickup(self):
+        client = self._client(*['WaitingForPickup'] * 10)
+        flexmock(client).should_receive('cancel_pickup').once()
+
+        watcher = self._watchers.watch(client, self._on_delta, deadline=3)
+        self._run()
+
+        self.assertEqual(watcher.outcome, WatchOutcome.DEADLINE)
+        self.assertEqual(len(self._deltas), 3)
+
+    def test_cancel(self):
+        client = self._client(*['Dispatching'] * 10)
+        flexmock(client).should_receive('cancel_pickup').once()
+
+        watcher = self._watchers.watch(client, self._on_delta)
+        self._scheduler.run_pending()
+        watcher.cancel()
+        watcher.cancel()
+        self._run()
+
+        self.assertEqual(watcher.outcome, WatchOutcome.CANCELLED)
+        self.assertEqual(len(self._deltas), 1)
+        self.assertEqual(len(self._watchers), 0)
+
+    def test_errors(self):
+        client = UberClient('test@test.org', '12345')
+        flexmock(client).should_receive('ping').and_raise(ValueError('boom'))
+
+        watcher = self._watchers.watch(client, self._on_delta)
+        self._run()
+
+        self.assertEqual(watcher.outcome, WatchOutcome.FAILED)
+        self.assertIsInstance(watcher.error, ValueError)
+        # retries after 2, 4 and 8 seconds
+        self.assertEqual(self._now[0], 14)
+
+    def test_callback_errors(self):
+        def callback(watcher, delta):
+            raise ValueError('boom')
+
+        watcher = self._watchers.watch(self._client(*['Dispatching'] * 10), callback)
+        self._run()
+
+        self.assertEqual(watcher.outcome, WatchOutcome.FAILED)
+        self.assertIsInstance(watcher.error, ValueError)
+        self.assertTrue(watcher.done.is_set())
+        self.assertEqual(len(self._watchers), 0)
+
+    def test_deadline_cancel_errors(self):
+        client = self._client(*['WaitingForPickup'] * 10)
+        flexmock(client).should_receive('cancel_pickup').and_raise(ValueError('boom')).once()
+
+        watcher = self._watchers.watch(client, self._on_delta, deadline=3)
+        self._run()
+
+        self.assertEqual(watcher.outcome, WatchOutcome.FAILED)
+        self.assertIsInstance(watcher.error, ValueError)
+        self.assertTrue(watcher.done.is_set())
+        self.assertEqual(len(self._watchers), 0)
+
+    def test_backpressure(self):
+        self._scheduler.rate_limiter = RateLimiter(2, clock=self._clock)
+        for _ in range(6):
+            self._watchers.watch(self._client(*['Dispatching'] * 20), self._on_delta)
+
+        self.assertEqual(self._watchers.interval(), 3)
+        self._run(until=30)
+
+        # 2 requests per second on average, the initial burst aside
+        self.assertLessEqual(len(self._deltas), 2 * 30 + 2 + 6)
+        self.assertGreaterEqual(len(self._deltas), 6 * 30 / 3)
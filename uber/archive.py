@@ -0,0 +1,301 @@
+"""
+Append-only archive of raw AppState payloads.
+
+Records are length-prefixed json payloads, zlib-compressed when it makes them smaller. A sidecar index (path + '.idx')
+has a fixed-size entry per record with its offset, length, flags, epoch and ping location, so records can be found by
+time or location without reading the archive. The index header records whether the epochs of the records are in
+order: select() then binary-searches its time window, instead of scanning the whole index:
+
+    with ArchiveWriter('pings.arc', compress=True) as writer:
+        writer.append(client.ping(location), location=location)
+
+    reader = ArchiveReader('pings.arc')
+    for index in reader.select(start=yesterday, bounds=(south, west, north, east)):
+        app_state = reader[index]
+
+The reader memory-maps both files. AppStates are handed out as lazy views: a record is only sliced out of the map,
+decompressed and parsed when a field of the AppState is first accessed.
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import namedtuple
+from .models import AppState
+
+ArchiveEntry = namedtuple('ArchiveEntry', ['offset', 'length', 'compressed', 'epoch', 'latitude', 'longitude'])
+
+NAN = float('nan')
+
+_MAGIC = 'UARC'
+_INDEX_MAGIC = 'UIDX'
+# magic, flags
+_INDEX_HEADER = struct.Struct('<4sI')
+_RECORD_HEADER = struct.Struct('<I')
+# offset, length, flags, epoch, latitude, longitude
+_INDEX_ENTRY = struct.Struct('<QIIddd')
+
+# record flags
+_COMPRESSED = 1
+
+# index flags: a record was appended with an earlier epoch than the previous one
+_UNORDERED = 1
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+class ArchiveWriter(object):
+    def __init__(self, path, compress=False, compression_level=6):
+        """
+        opens an archive for appending, creating it if needed
+
+        Args:
+            - compress: zlib-compress the records (records that don't shrink are stored as is)
+            - compression_level: zlib level, 1 (fast) to 9 (small)
+        """
+        self._compress = compress
+        self._compression_level = compression_level
+        self._file = open(path, 'ab')
+        if not self._file.tell():
+            self._file.write(_MAGIC)
+
+        # the index header is updated in place when the records stop being in time order
+        path = index_path(path)
+        self._index = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self._index.seek(0, os.SEEK_END)
+        self._last_epoch = None
+        if not self._index.tell():
+            self._index_flags = 0
+            self._index.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self._index_flags))
+        else:
+            self._index.seek(0)
+            _, self._index_flags = _INDEX_HEADER.unpack(self._index.read(_INDEX_HEADER.size))
+            self._index.seek(0, os.SEEK_END)
+            if self._index.tell() > _INDEX_HEADER.size:
+                self._index.seek(-_INDEX_ENTRY.size, os.SEEK_END)
+                self._last_epoch = _INDEX_ENTRY.unpack(self._index.read(_INDEX_ENTRY.size))[3]
+                self._index.seek(0, os.SEEK_END)
+
+    def append(self, app_state, epoch=None, location=None):
+        """
+        Args:
+            - app_state: an AppState, its raw data or its json payload
+            - epoch: (optional) time of the ping in seconds, defaults to time.time()
+            - location: (optional) the location that was pinged (anything with latitude & longitude attributes)
+        """
+        if isinstance(app_state, AppState):
+            app_state = app_state.raw
+
+        if isinstance(app_state, dict):
+            payload = json.dumps(app_state, separators=(',', ':'))
+        elif isinstance(app_state, unicode):
+            payload = app_state.encode('utf-8')
+        else:
+            payload = app_state
+
+        flags = 0
+        if self._compress:
+            compressed = zlib.compress(payload, self._compression_level)
+            if len(compressed) < len(payload):
+                payload = compressed
+                flags |= _COMPRESSED
+
+        self._file.write(_RECORD_HEADER.pack(len(payload)))
+        offset = self._file.tell()
+        self._file.write(payload)
+
+        epoch = time.time() if epoch is None else epoch
+        if self._last_epoch is not None and epoch < self._last_epoch and not self._index_flags & _UNORDERED:
+            # before the entry, so that readers never see an unordered index flagged as ordered
+            self._index_flags |= _UNORDERED
+            self._index.seek(0)
+            self._index.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self._index_flags))
+            self._index.seek(0, os.SEEK_END)
+
+        self._last_epoch = epoch
+        self._index.write(_INDEX_ENTRY.pack(
+            offset, len(payload), flags, epoch,
+            NAN if location is None else location.latitude,
+            NAN if location is None else location.longitude))
+
+    def flush(self):
+        # the data before the index, so that indexed records are always complete
+        self._file.flush()
+        self._index.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ArchivedAppState(AppState):
+    """
+    An AppState whose record is only read from the archive on first access to a field
+    """
+    def __init__(self, reader, index):
+        self._reader = reader
+        self._index = index
+        self._decoded = None
+
+    @property
+    def _data(self):
+        if self._decoded is None:
+            self._decoded = self._reader.data(self._index)
+
+        return self._decoded
+
+    @property
+    def archive_entry(self):
+        return self._reader.entry(self._index)
+
+
+class ArchiveReader(object):
+    def __init__(self, path, interner=None):
+        """
+        Args:
+            - interner: (optional) an interning.Interner the records are decoded with
+        """
+        self._object_pairs_hook = interner.object_pairs_hook if interner is not None else None
+        self._map = _map_file(path, _MAGIC)
+        self._index = _map_file(index_path(path), _INDEX_MAGIC)
+        self._count = (len(self._index) - _INDEX_HEADER.size) // _INDEX_ENTRY.size
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self.app_state(index)
+
+    def __iter__(self):
+        for index in xrange(self._count):
+            yield self.app_state(index)
+
+    def close(self):
+        self._map.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def entry(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+
+        offset, length, flags, epoch, latitude, longitude = \
+            _INDEX_ENTRY.unpack_from(self._index, _INDEX_HEADER.size + index * _INDEX_ENTRY.size)
+
+        return ArchiveEntry(offset, length, bool(flags & _COMPRESSED), epoch,
+                            None if latitude != latitude else latitude,
+                            None if longitude != longitude else longitude)
+
+    def payload(self, index):
+        """
+        returns the json payload of a record. Uncompressed records are returned as a buffer over the mapped file,
+        without copying
+        """
+        entry = self.entry(index)
+        view = buffer(self._map, entry.offset, entry.length)
+        return zlib.decompress(view) if entry.compressed else view
+
+    def data(self, index):
+        """
+        returns the parsed payload of a record
+        """
+        payload = self.payload(index)
+        if not isinstance(payload, str):
+            payload = str(payload)
+
+        return json.loads(payload, object_pairs_hook=self._object_pairs_hook)
+
+    def app_state(self, index):
+        """
+        returns a lazy AppState view of a record
+        """
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+
+        return ArchivedAppState(self, index)
+
+    def select(self, start=None, end=None, bounds=None):
+        """
+        returns the indexes of the records in a time window and/or bounding box, reading only the index. The time
+        window is binary-searched if the records were appended in time order, otherwise the whole index is scanned
+
+        Args:
+            - start, end: (optional) time window, inclusive
+            - bounds: (optional) (south, west, north, east) in degrees. Records without location are excluded
+        """
+        first, last = 0, self._count
+        if self.ordered:
+            if start is not None:
+                first = self._bisect(0, last, lambda epoch: epoch < start)
+            if end is not None:
+                last = self._bisect(first, last, lambda epoch: epoch <= end)
+
+        result = []
+        position = _INDEX_HEADER.size + first * _INDEX_ENTRY.size
+        for index in xrange(first, last):
+            _, _, _, epoch, latitude, longitude = _INDEX_ENTRY.unpack_from(self._index, position)
+            position += _INDEX_ENTRY.size
+
+            if (start is not None and epoch < start) or (end is not None and epoch > end):
+                continue
+
+            if bounds is not None:
+                south, west, north, east = bounds
+                if not (south <= latitude <= north and west <= longitude <= east):
+                    continue
+
+            result.append(index)
+
+        return result
+
+    @property
+    def ordered(self):
+        """
+        whether the epochs of the records are in order (read from the index header, which writers keep up to date)
+        """
+        _, flags = _INDEX_HEADER.unpack_from(self._index)
+        return not flags & _UNORDERED
+
+    def _bisect(self, low, high, before):
+        """
+        returns the first index in [low, high) for which before(epoch) is false, or high
+        """
+        while low < high:
+            middle = (low + high) // 2
+            if before(_INDEX_ENTRY.unpack_from(self._index, _INDEX_HEADER.size + middle * _INDEX_ENTRY.size)[3]):
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+
+def _map_file(path, magic):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < len(magic):
+            raise ValueError('not an archive file: ' + path)
+
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapped[:len(magic)] != magic:
+        mapped.close()
+        raise ValueError('not an archive file: ' + path)
+
+    return mapped
@@ -0,0 +1,138 @@
+"""
+Parallel processing of large batches of responses.
+
+Decoding json and building models is CPU bound, and threads don't help with that. map_payloads and map_archive spread
+the work over a pool of processes: every worker decodes its share of the payloads, wraps them in models and applies the
+mapper, then reduces its results locally. Only the mapper's (or the reducer's) results are sent back to the parent,
+so they should be compact: counts, tuples, arrays...
+
+    def vehicle_count(app_state):
+        return sum(len(x.vehicle_paths or {}) for x in app_state.nearby_vehicles.itervalues())
+
+    total = map_archive('pings.arc', vehicle_count, reducer=operator.add, initial=0)
+
+mappers and reducers are pickled to be sent to the workers: they have to be module-level functions.
+"""
+
+import json
+from copy import deepcopy
+from itertools import islice
+from multiprocessing import Pool
+from .archive import ArchiveReader
+from .models import AppState
+
+
+def map_payloads(payloads, mapper, reducer=None, initial=None, combine=None, model_type=AppState, processes=None,
+                 chunk_size=64, empty=None):
+    """
+    Args:
+        - payloads: iterable of json payloads
+        - mapper: called with the model built from every payload
+        - reducer: (optional) reducer(accumulated, mapped) folds the mapped values. Without combine, every chunk folds
+          its values from the first one, and the results of the chunks are folded with reducer, starting from initial
+        - combine: (optional) combine(accumulated, accumulated) merges the results of the chunks, starting from
+          initial. For reducers whose accumulated values aren't mapped values (e.g. counts by key)
+        - model_type: the model to build from the payloads
+        - processes: number of worker processes, defaults to the number of cpus. 1 runs everything in this process
+        - chunk_size: payloads sent to a worker at a time
+        - empty: with combine, the accumulated value of no payloads, that every chunk starts from (e.g. {})
+
+    Returns:
+        - without reducer, the list of the mapped values, in order. Otherwise the combined result. initial is only
+          accounted once, whatever the chunks
+    """
+    seed = _chunk_seed(combine, empty)
+    chunks = ((_decode_chunk, chunk, mapper, reducer, seed, model_type) for chunk in _chunks(payloads, chunk_size))
+    return _run(chunks, reducer, initial, combine, processes)
+
+
+def map_archive(path, mapper, reducer=None, initial=None, combine=None, indexes=None, processes=None, chunk_size=256,
+                empty=None):
+    """
+    same as map_payloads, over the records of an archive.ArchiveReader. Every worker maps the archive itself, only the
+    record numbers are sent to the workers
+
+    Args:
+        - indexes: (optional) the records to process, e.g. the result of ArchiveReader.select. Defaults to all of them
+    """
+    if indexes is None:
+        with ArchiveReader(path) as reader:
+            indexes = xrange(len(reader))
+
+    seed = _chunk_seed(combine, empty)
+    chunks = ((_archive_chunk, chunk, path, mapper, reducer, seed) for chunk in _chunks(indexes, chunk_size))
+    return _run(chunks, reducer, initial, combine, processes)
+
+
+# chunks without combine fold from their first mapped value
+_FIRST_VALUE = '__first_value__'
+
+
+def _chunk_seed(combine, empty):
+    return _FIRST_VALUE if combine is None else empty
+
+
+def _run(chunks, reducer, initial, combine, processes):
+    if processes == 1:
+        results = map(_process_chunk, chunks)
+    else:
+        pool = Pool(processes)
+        try:
+            results = list(pool.imap(_process_chunk, chunks))
+        finally:
+            pool.close()
+            pool.join()
+
+    if reducer is None:
+        return [value for chunk in results for value in chunk]
+
+    combine = combine or reducer
+    accumulated = deepcopy(initial)
+    for result in results:
+        accumulated = combine(accumulated, result)
+
+    return accumulated
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def _process_chunk(args):
+    return args[0](*args[1:])
+
+
+def _fold(values, mapper, reducer, seed):
+    """
+    folds a (non empty) chunk, from seed, or from its first mapped value
+    """
+    if reducer is None:
+        return [mapper(x) for x in values]
+
+    values = iter(values)
+    if seed == _FIRST_VALUE:
+        accumulated = mapper(next(values))
+    else:
+        # every chunk starts from its own copy, reducers can update the accumulated value in place
+        accumulated = deepcopy(seed)
+
+    for value in values:
+        accumulated = reducer(accumulated, mapper(value))
+
+    return accumulated
+
+
+def _decode_chunk(payloads, mapper, reducer, seed, model_type):
+    return _fold((model_type(json.loads(x)) for x in payloads), mapper, reducer, seed)
+
+
+def _archive_chunk(indexes, path, mapper, reducer, seed):
+    # mapping the archive is cheap next to decoding a chunk
+    with ArchiveReader(path) as reader:
+        return _fold((reader.app_state(x) for x in indexes), mapper, reducer, seed)
@@ -0,0 +1,190 @@
+"""
+Circuit breaker for the requests sent to Uber and to the geocoder.
+
+When an endpoint degrades, callers otherwise keep waiting for full timeouts. A CircuitBreaker tracks the failure rate of
+every endpoint over a sliding window; when it gets too high the circuit opens, and calls fail immediately with
+CircuitOpen. After reset_timeout, a few probe calls are let through (half-open): if they succeed the circuit closes,
+otherwise it opens again.
+
+    breaker = CircuitBreaker(metrics=my_metrics)
+    client = UberClient(email, token, circuit_breaker=breaker)
+    geolocate(address, circuit_breaker=breaker)
+
+The state of every endpoint is reported as the 'circuit.state' gauge (0: closed, 1: half open, 2: open).
+"""
+
+import threading
+import time
+from collections import deque
+from .client import UberException
+from .geolocation import GeolocationExcetion, CLIENT_ERROR_STATUSES
+from .metrics import NULL_METRICS
+
+# 4xx codes of an overloaded endpoint rather than of a wrong request: request timeout, too many requests
+_OVERLOAD_CODES = frozenset([408, 429])
+
+
+class CircuitState(object):
+    CLOSED = 'closed'
+    HALF_OPEN = 'half_open'
+    OPEN = 'open'
+
+
+_STATE_GAUGE = {
+    CircuitState.CLOSED: 0,
+    CircuitState.HALF_OPEN: 1,
+    CircuitState.OPEN: 2,
+}
+
+
+class CircuitOpen(UberException):
+    def __init__(self, endpoint):
+        super(CircuitOpen, self).__init__(u'circuit open for ' + endpoint, endpoint=endpoint)
+
+
+def is_failure(exception):
+    """
+    The default failure predicate: everything but client errors (UberException with a 4xx code, or geocoding of an
+    invalid address) counts as a failure of the endpoint. Throttling (429) and timeouts (408) are failures too: the
+    endpoint is overloaded, and should be given a break
+    """
+    if isinstance(exception, UberException):
+        code = exception.error_code
+        return not (isinstance(code, int) and 400 <= code < 500) or code in _OVERLOAD_CODES
+
+    if isinstance(exception, GeolocationExcetion):
+        return exception.status not in CLIENT_ERROR_STATUSES
+
+    return True
+
+
+class _Circuit(object):
+    __slots__ = ('state', 'outcomes', 'failures', 'opened_at', 'probes')
+
+    def __init__(self):
+        self.state = CircuitState.CLOSED
+        self.outcomes = deque()
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+
+
+class CircuitBreaker(object):
+    def __init__(self, failure_rate=0.5, window=30.0, min_requests=10, reset_timeout=30.0, half_open_probes=1,
+                 failure_predicate=is_failure, metrics=None, clock=time.time):
+        """
+        Args:
+            - failure_rate: the circuit opens when this ratio of the calls in the window failed
+            - window: the sliding window, in seconds
+            - min_requests: the circuit doesn't open before this many calls were made in the window
+            - reset_timeout: seconds an open circuit waits before probing the endpoint again
+            - half_open_probes: concurrent probe calls allowed while half open
+            - failure_predicate: tells whether an exception counts as a failure of the endpoint
+            - metrics: (optional) a metrics.Metrics implementation
+        """
+        self._failure_rate = failure_rate
+        self._window = window
+        self._min_requests = min_requests
+        self._reset_timeout = reset_timeout
+        self._half_open_probes = half_open_probes
+        self._failure_predicate = failure_predicate
+        self._metrics = metrics or NULL_METRICS
+        self._clock = clock
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def state(self, endpoint):
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None:
+                return CircuitState.CLOSED
+
+            self._update_state(endpoint, circuit, self._clock())
+            return circuit.state
+
+    def call(self, endpoint, func, *args, **kwargs):
+        """
+        calls func(*args, **kwargs) through the circuit of endpoint
+
+        Raises:
+            - CircuitOpen if the circuit is open
+        """
+        probe = self.before_call(endpoint)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.after_call(endpoint, probe, not self._failure_predicate(e))
+            raise
+
+        self.after_call(endpoint, probe, True)
+        return result
+
+    def before_call(self, endpoint):
+        """
+        Returns:
+            - True if the call is a half-open probe
+
+        Raises:
+            - CircuitOpen if the call isn't allowed
+        """
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None:
+                circuit = self._circuits[endpoint] = _Circuit()
+
+            self._update_state(endpoint, circuit, self._clock())
+            if circuit.state == CircuitState.CLOSED:
+                return False
+
+            if circuit.state == CircuitState.HALF_OPEN and circuit.probes < self._half_open_probes:
+                circuit.probes += 1
+                return True
+
+        self._metrics.increment('circuit.rejected', tags={'endpoint': endpoint})
+        raise CircuitOpen(endpoint)
+
+    def after_call(self, endpoint, probe, success):
+        with self._lock:
+            circuit = self._circuits[endpoint]
+            now = self._clock()
+
+            if probe:
+                circuit.probes -= 1
+                if success:
+                    circuit.outcomes.clear()
+                    circuit.failures = 0
+                    self._set_state(endpoint, circuit, CircuitState.CLOSED)
+                else:
+                    circuit.opened_at = now
+                    self._set_state(endpoint, circuit, CircuitState.OPEN)
+
+                return
+
+            circuit.outcomes.append((now, success))
+            if not success:
+                circuit.failures += 1
+            self._expire(circuit, now)
+
+            if (circuit.state == CircuitState.CLOSED and len(circuit.outcomes) >= self._min_requests and
+                    circuit.failures >= self._failure_rate * len(circuit.outcomes)):
+                circuit.opened_at = now
+                self._set_state(endpoint, circuit, CircuitState.OPEN)
+
+        if not success:
+            self._metrics.increment('circuit.failures', tags={'endpoint': endpoint})
+
+    def _expire(self, circuit, now):
+        outcomes = circuit.outcomes
+        deadline = now - self._window
+        while outcomes and outcomes[0][0] < deadline:
+            _, success = outcomes.popleft()
+            if not success:
+                circuit.failures -= 1
+
+    def _update_state(self, endpoint, circuit, now):
+        if circuit.state == CircuitState.OPEN and now - circuit.opened_at >= self._reset_timeout:
+            self._set_state(endpoint, circuit, CircuitState.HALF_OPEN)
+
+    def _set_state(self, endpoint, circuit, state):
+        circuit.state = state
+        self._metrics.gauge('circuit.state', _STATE_GAUGE[state], tags={'endpoint': endpoint})
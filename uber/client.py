@@ -4,26 +4,97 @@ Client for Uber.
 
 import json
 from time import time
-import requests
 import random
+import threading
+import zlib
 from uber import settings
 from uber import geolocation
+from uber.coalescing import SingleFlight
+from uber.metrics import Counter
 from uber.models import AppState, PaymentProfile, VehicleView, Place, SimpleLocation, UberVehicleType
+from uber.projection import get_projection
+from uber.streaming import StreamingDecoder
 
 
 class UberClient(object):
+    """
+    A client can be shared by many threads: its state is immutable after construction, every thread gets its own
+    requests session, and all the sessions share a single connection pool.
+    """
     ENDPOINT = 'https://cn{}.uber.com'.format(random.randint(1, 10))
+    EVENTS_ENDPOINT = 'http://events.uber.com/mobile/event/'
+
+    # bytes read at a time when streaming a response
+    STREAM_CHUNK_SIZE = 16 * 1024
 
-    def __init__(self, username, token):
+    def __init__(self, username, token, circuit_breaker=None, pool_size=10, coalesce=True, geocoder=None,
+                 compress_requests=False, compression_min_size=1024, interner=None):
+        """
+        Args:
+            - circuit_breaker: (optional) a circuit.CircuitBreaker that guards the requests to Uber
+            - pool_size: max connections kept open per host, shared by all the threads using the client
+            - coalesce: concurrent identical idempotent messages (see COALESCED_MESSAGES) share a single request. Every
+              caller decodes its own copy of the response (interned responses are immutable, and shared decoded)
+            - geocoder: (optional) resolves string pickup addresses instead of geolocation.geolocate, e.g. a
+              gazetteer.Gazetteer. Anything with a geolocate(address) method returning results in the same format
+            - compress_requests: gzip the request bodies. Responses are always requested compressed
+            - compression_min_size: smaller request bodies are sent as is
+            - interner: (optional) an interning.Interner the responses are decoded with, so that their repeated
+              strings and sub-objects are shared (and immutable)
+        """
         self._email = username
         self._token = token
+        self._circuit_breaker = circuit_breaker
+        self._geocoder = geocoder
+        self._compress_requests = compress_requests
+        self._object_pairs_hook = interner.object_pairs_hook if interner is not None else None
+        self._compression_min_size = compression_min_size
         self._headers = {
             'Content-Type': 'application/json',
             'User-Agent': settings.USER_AGENT,
             'Accept-Language': 'en-US',
+            'Accept-Encoding': 'gzip, deflate',
         }
+        self._compressed_headers = dict(self._headers, **{'Content-Encoding': 'gzip'})
+
+        # the fields common to all messages. copied into every message, never modified
+        envelope = {
+            'version': settings.UBER_VERSION,
+            'language': 'en',
+            'app': 'client',
+            'email': self._email,
+            'deviceModel': settings.DEVICE_MODEL,
+            'deviceOS': settings.DEVICE_OS,
+            'device': settings.DEVICE_NAME
+        }
+        if self._token:
+            envelope['token'] = self._token
+
+        self._envelope = tuple(envelope.items())
+
+        # requests is imported here rather than at module level, so importing uber stays cheap
+        import requests
+        self._adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._local = threading.local()
+
+        self._single_flight = SingleFlight() if coalesce else None
 
-        self._session = requests.session()
+        self.requests_sent = Counter()
+        self.requests_failed = Counter()
+
+    @property
+    def _session(self):
+        """
+        the requests session of the current thread
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+
+        return session
 
     @classmethod
     def login(cls, email, password):
@@ -99,10 +170,25 @@ class UberClient(object):
         response = self._send_message(MessageTypes.LOCATION_SEARCH, params=params, location=location)
         return [Place(x) for x in response['places']]
 
-    def ping(self, location):
+    def ping(self, location, skip=None, fields=None):
         """
         'pings' uber and returns the state of the world. (nearby cars, pricing etc)
+
+        Args:
+            - skip: (optional) dotted json paths of parts of the response to leave out, e.g. ['city.vehicleViews'].
+              The response is then streamed, and the skipped parts are never decoded. See streaming.StreamingDecoder
+            - fields: (optional) AppState attribute paths, e.g. ['client.status', 'nearby_vehicles.*.min_eta'].
+              Only these values are decoded, and returned as a dict of path -> value instead of an AppState.
+              See projection.Projection
         """
+        if fields:
+            projection = get_projection(AppState, fields)
+            skip = list(projection.skip) + list(skip or ())
+            return projection.extract(self._send_message(MessageTypes.PING_CLIENT, location=location, skip=skip))
+
+        if skip:
+            return AppState(self._send_message(MessageTypes.PING_CLIENT, location=location, skip=skip))
+
         return AppState(self._send_message(MessageTypes.PING_CLIENT, location=location))
 
     def request_pickup(self, pickup_address, vehicle_type=UberVehicleType.UBERX, gps_location=None, payment_profile=None, use_credits=True):
@@ -127,7 +213,12 @@ class UberClient(object):
             payment_profile = payment_profile.id
 
         if isinstance(pickup_address, basestring):
-            search_result = geolocation.geolocate(pickup_address)
+            if self._geocoder is not None:
+                search_result = self._geocoder.geolocate(pickup_address)
+            elif self._circuit_breaker is not None:
+                search_result = geolocation.geolocate(pickup_address, circuit_breaker=self._circuit_breaker)
+            else:
+                search_result = geolocation.geolocate(pickup_address)
             if not search_result:
                 raise UberLocationNotFound(u"Can't find location " + unicode(pickup_address))
 
@@ -151,57 +242,135 @@ class UberClient(object):
         """
         return AppState(self._send_message('PickupCanceledClient', location=location))
 
-    def _post(self, endpoint, data):
+    def _post(self, endpoint, data, stream=False):
         """
         posts a json to the given endpoint
+
+        Args:
+            - stream: don't read the response body, the caller reads it and closes the response
         """
-        response = self._session.post(endpoint, json.dumps(data), headers=self._headers)
-        self._validate_http_response(response)
+        if self._circuit_breaker is not None:
+            return self._circuit_breaker.call(endpoint, self._post_unguarded, endpoint, data, stream)
+
+        return self._post_unguarded(endpoint, data, stream)
+
+    def _post_unguarded(self, endpoint, data, stream=False):
+        body = json.dumps(data)
+        headers = self._headers
+        if self._compress_requests and len(body) >= self._compression_min_size:
+            body = gzip_compress(body)
+            headers = self._compressed_headers
+
+        kwargs = {'stream': True} if stream else {}
+
+        self.requests_sent.increment()
+        try:
+            response = self._session.post(endpoint, body, headers=headers, **kwargs)
+            self._validate_http_response(response)
+        except Exception:
+            self.requests_failed.increment()
+            raise
 
         return response
 
-    def _send_message(self, message_type, params=None, location=None):
+    def _send_message(self, message_type, params=None, location=None, skip=None):
         """
         sends a message to uber.
 
         Args:
             - message_type: string of the message
             - location: (optional) GPSLocation or any object that has longitude & latitude attributes
+            - skip: (optional) dotted json paths of the parts of the response to skip while streaming it
+        """
+        if self._single_flight is not None and message_type in COALESCED_MESSAGES:
+            location_data = {}
+            self._copy_location_for_message(location, location_data)
+            key = (message_type,
+                   json.dumps(params, sort_keys=True),
+                   tuple(sorted(location_data.items())))
+
+            # interned responses are immutable, so they are shared decoded. Otherwise the callers share the response,
+            # and each one decodes it: that's cheaper than copying the decoded data
+            if self._object_pairs_hook is not None:
+                return self._single_flight.do(key + (tuple(skip or ()),), self._send_message_now, message_type,
+                                              params, location, skip)
+
+            response = self._single_flight.do(key, self._fetch_message, message_type, params, location)
+            return self._decode_message(response, skip)
+
+        return self._send_message_now(message_type, params, location, skip)
+
+    def _send_message_now(self, message_type, params=None, location=None, skip=None):
+        if skip:
+            response = self._post(self.ENDPOINT, self._build_message(message_type, params, location), stream=True)
+            try:
+                decoder = StreamingDecoder(skip, self._object_pairs_hook)
+                data = decoder.decode(response.iter_content(self.STREAM_CHUNK_SIZE))
+            finally:
+                response.close()
+
+            self._validate_message_response(data)
+            return data
+
+        return self._decode_message(self._fetch_message(message_type, params, location))
+
+    def _fetch_message(self, message_type, params=None, location=None):
         """
+        sends a message to uber and returns the response, read but not decoded
+        """
+        return self._post(self.ENDPOINT, self._build_message(message_type, params, location))
 
-        data = {
-            'messageType': message_type,
-            'epoch': get_epoch(),
-            'version': settings.UBER_VERSION,
-            'language': 'en',
-            'app': 'client',
-            'email': self._email,
-            'deviceModel': settings.DEVICE_MODEL,
-            'deviceOS': settings.DEVICE_OS,
-            'device': settings.DEVICE_NAME
-        }
+    def _decode_message(self, response, skip=None):
+        """
+        decodes and checks the response to a message, leaving out the skipped parts
+        """
+        if skip:
+            data = StreamingDecoder(skip, self._object_pairs_hook).decode([response.content])
+        else:
+            data = decode_json_response(response, self._object_pairs_hook)
 
-        if self._token:
-            data['token'] = self._token
+        self._validate_message_response(data)
+
+        return data
+
+    def _build_message(self, message_type, params=None, location=None):
+        data = dict(self._envelope)
+        data['messageType'] = message_type
+        data['epoch'] = get_epoch()
 
         self._copy_location_for_message(location, data)
 
         if params:
             data.update(params)
 
-        response = self._post(self.ENDPOINT, data)
-
-        data = response.json()
-        self._validate_message_response(data)
-
         return data
 
     def _send_event(self, event_name, location, params):
         """
         Feeds Uber's event system and keeps Uber happy.
         Currently unused :P
+        See uber.telemetry.EventEmitter for sending events off the request path, in batches
         """
-        data = {
+        self._post(self.EVENTS_ENDPOINT, data=self._build_event(event_name, location, params))
+
+    def _send_events(self, events):
+        """
+        posts a batch of events built by _build_event. The events endpoint takes one event per request
+
+        Returns:
+            - the number of events that couldn't be sent
+        """
+        failed = 0
+        for event in events:
+            try:
+                self._post(self.EVENTS_ENDPOINT, data=event)
+            except Exception:
+                failed += 1
+
+        return failed
+
+    def _build_event(self, event_name, location, params):
+        return {
             'epoch': get_epoch(),
             'version': settings.UBER_VERSION,
             'language': 'en',
@@ -214,8 +383,6 @@ class UberClient(object):
             'eventName': event_name,
         }
 
-        self._post('http://events.uber.com/mobile/event/', data=data)
-
     def _validate_message_response(self, data):
         """
         checks the message response for errors and raise exceptions accordingly
@@ -331,6 +498,13 @@ class MessageTypes(object):
     API_COMMAND = 'ApiCommand'
 
 
+# idempotent messages. Identical ones sent at the same time share a single request
+COALESCED_MESSAGES = frozenset([
+    MessageTypes.PING_CLIENT,
+    MessageTypes.LOCATION_SEARCH,
+])
+
+
 class ApiMethods(object):
     DELETE = 'DELETE'
     POST = 'POST'
@@ -344,6 +518,28 @@ class UberException(Exception):
         self.__dict__.update(kwargs)
 
 
+def gzip_compress(data, level=6):
+    """
+    returns data compressed in the gzip format
+    """
+    # wbits 16 + 15 writes the gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decode_json_response(response, object_pairs_hook=None):
+    """
+    decodes the json body of a response. requests decompresses gzip/deflate bodies chunk by chunk while reading them,
+    and json.loads then parses the utf-8 bytes as they are: response.json() would first decode the whole body into a
+    unicode copy
+    """
+    encoding = response.encoding
+    if encoding is None or encoding.lower() in ('utf-8', 'utf8'):
+        return json.loads(response.content, object_pairs_hook=object_pairs_hook)
+
+    return response.json(object_pairs_hook=object_pairs_hook)
+
+
 def get_epoch():
     return int(time() * 1000)
 
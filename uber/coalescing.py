@@ -0,0 +1,73 @@
+"""
+Request coalescing.
+
+When several threads make the same idempotent call at the same time, SingleFlight lets only the first one (the leader)
+actually make it; the others wait for the leader and share its result, or its exception. The result is shared as is, so
+it should be immutable: e.g. UberClient shares the undecoded response, and every caller decodes its own copy of it.
+"""
+
+import threading
+from .metrics import Counter
+
+
+class _Call(object):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    def __init__(self, share=None):
+        """
+        Args:
+            - share: (optional) returns what the waiting threads get from the result of the leader, e.g. copy.deepcopy
+              for mutable results. By default they get the result itself
+        """
+        self._share = share
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        # calls that were served by another call in flight
+        self.coalesced = Counter()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        calls func(*args, **kwargs), unless a call with the same key is already in flight, in which case its outcome
+        is shared
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            self.coalesced.increment()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+
+            return call.result if self._share is None else self._share(call.result)
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
+
+    def in_flight(self):
+        """
+        the number of calls currently in flight
+        """
+        return len(self._calls)
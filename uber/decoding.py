@@ -0,0 +1,151 @@
+"""
+Compiled model decoders.
+
+Accessing a Model attribute goes through Field.__get__ -> to_python on every access, which is nice when only a few
+fields are read, but wasteful for consumers that read the whole object (possibly many times).
+compile_decoder turns the field declarations of a Model class into a specialized python function that converts a raw
+dict into fully typed values in a single pass, recursing into nested models with their own compiled decoders.
+"""
+
+from collections import OrderedDict
+from .model_base import Model, Field, ModelField, ListField, DictField, ListOf
+
+_decoders = {}
+_field_decoders = {}
+_eager_types = {}
+
+
+def decode_eager(model_type, data):
+    """
+    decodes data into an instance of model_type, converting all the fields (and nested models) up front.
+
+    The returned object is an instance of (a generated subclass of) model_type, so properties and isinstance checks
+    keep working. Required fields that are missing from the data decode as None instead of raising on access.
+    """
+    return get_decoder(model_type)(data)
+
+
+def get_decoder(model_type):
+    """
+    returns the compiled decoder of model_type, compiling it on first use
+    """
+    decoder = _decoders.get(model_type)
+    if decoder is None:
+        decoder = _decoders[model_type] = compile_decoder(model_type)
+
+    return decoder
+
+
+def decode_reusing(model_type, data, values):
+    """
+    like decode_eager, but takes the fields found in values (attribute name -> already decoded value) as is, instead
+    of decoding them again from data. Used to share unchanged sub-models between consecutive responses.
+    """
+    eager_type = _get_eager_type(model_type)
+    obj = eager_type.__new__(eager_type)
+    obj._data = data = data or {}
+    for name, (key, decode) in get_field_decoders(model_type).iteritems():
+        setattr(obj, name, values[name] if name in values else decode(data.get(key)))
+
+    return obj
+
+
+def get_field_decoders(model_type):
+    """
+    returns the compiled decoders of the individual fields of model_type, as attribute name -> (json key, decoder)
+    """
+    field_decoders = _field_decoders.get(model_type)
+    if field_decoders is None:
+        field_decoders = OrderedDict()
+        for index, (name, field) in enumerate(model_type._fields.iteritems()):
+            namespace = {}
+            expression = _field_expression(field, index, namespace)
+            field_decoders[name] = field._name, eval('lambda v: ' + expression, namespace)
+
+        _field_decoders[model_type] = field_decoders
+
+    return field_decoders
+
+
+def compile_decoder(model_type):
+    """
+    generates the decode function of a Model class from its field declarations
+    """
+    eager_type = _get_eager_type(model_type)
+    namespace = {'cls': eager_type}
+    lines = [
+        'def decode(data):',
+        '    obj = cls.__new__(cls)',
+        '    obj._data = data = data or {}',
+        '    get = data.get',
+    ]
+
+    for index, (name, field) in enumerate(model_type._fields.iteritems()):
+        lines.append('    v = get({!r})'.format(field._name))
+        lines.append('    obj.{} = {}'.format(name, _field_expression(field, index, namespace)))
+
+    lines.append('    return obj')
+
+    source = '\n'.join(lines)
+    exec(compile(source, '<decoder {}>'.format(model_type.__name__), 'exec'), namespace)
+
+    decoder = namespace['decode']
+    decoder.source = source
+    return decoder
+
+
+def _field_expression(field, index, namespace):
+    """
+    returns the python expression that converts the raw value `v` of a field
+    """
+    field_type = type(field)
+    item = 'i{}'.format(index)
+    key = 'k{}'.format(index)
+
+    if field_type is Field:
+        return 'v'
+
+    if field_type is ModelField:
+        namespace[item] = _item_converter(field._model_type)
+        return 'None if v is None else {}(v)'.format(item)
+
+    if field_type is ListField:
+        namespace[item] = _item_converter(field._item_type)
+        return '[] if v is None else [{}(x) for x in v]'.format(item)
+
+    if field_type is DictField:
+        namespace[item] = _item_converter(field._item_type)
+        namespace[key] = field._key_func
+        return '{{}} if v is None else {{{}(x): {}(y) for x, y in v.iteritems()}}'.format(key, item)
+
+    # DateTimeField, EpochField and any custom field type
+    namespace[item] = field.to_python
+    return 'None if v is None else {}(v)'.format(item)
+
+
+def _item_converter(item_type):
+    if isinstance(item_type, type) and issubclass(item_type, Model):
+        return get_decoder(item_type)
+
+    if isinstance(item_type, ListOf):
+        decoder = get_decoder(item_type.model_type)
+        return lambda value: [decoder(x) for x in value]
+
+    return item_type
+
+
+def _get_eager_type(model_type):
+    """
+    Eager models store their decoded values in slots. The slots shadow the Field descriptors of model_type, so
+    attribute access doesn't go through to_python anymore.
+    """
+    eager_type = _eager_types.get(model_type)
+    if eager_type is None:
+        attrs = {
+            '__slots__': tuple(model_type._fields),
+            '__module__': model_type.__module__,
+            '__reduce__': lambda self: (decode_eager, (model_type, self._data)),
+        }
+        eager_type = _eager_types[model_type] = type(model_type)(model_type.__name__, (model_type,), attrs)
+
+    return eager_type
@@ -0,0 +1,212 @@
+"""
+Changes between consecutive AppState responses.
+
+When ping() is polled, most of the response (especially the city) is identical from one response to the next.
+AppStateTracker compares the raw sub-trees of every response with the previous ones, decodes only the parts that
+changed (reusing the decoded sub-models of the previous response for the rest, down to the individual vehicle views and
+nearby vehicles), and reports what changed structurally:
+
+    tracker = AppStateTracker()
+    while True:
+        delta = tracker.update(client.ping(location))
+        for move in delta.vehicles_moved:
+            ...
+        if 'city' in delta.changed:
+            ...
+"""
+
+import json
+from collections import namedtuple
+from hashlib import md5
+from .decoding import decode_eager, decode_reusing, get_decoder, get_field_decoders
+from .model_base import Model, ModelField, DictField
+from .models import AppState, Trip
+
+# position: (latitude, longitude, epoch) of the latest point of the vehicle path
+VehicleMove = namedtuple('VehicleMove', ['vehicle_view_id', 'vehicle_id', 'previous', 'current'])
+
+
+def fingerprint(data):
+    """
+    a content hash of a raw (json) sub-tree
+    """
+    return md5(json.dumps(data, sort_keys=True, separators=(',', ':'))).digest()
+
+
+class AppStateDelta(object):
+    """
+    What changed between two AppStates.
+
+    Attributes:
+        - app_state: the new AppState. Fields that didn't change are the very same objects as in the previous one
+        - changed: names of the AppState fields whose data changed ('city', 'client', 'trip', 'nearby_vehicles'...)
+        - vehicles_appeared: (vehicle view id, vehicle id) pairs of vehicles that weren't there before
+        - vehicles_disappeared: (vehicle view id, vehicle id) pairs of vehicles that are gone
+        - vehicles_moved: VehicleMove instances for vehicles whose latest position changed
+        - surge_changes: vehicle view id -> (previous multiplier, current multiplier). None means no surge
+        - client_status: (previous, current) client status, if it changed
+        - trip_state: (previous, current) TripState, if it changed. None means no trip
+    """
+    def __init__(self, app_state, changed):
+        self.app_state = app_state
+        self.changed = changed
+        self.vehicles_appeared = []
+        self.vehicles_disappeared = []
+        self.vehicles_moved = []
+        self.surge_changes = {}
+        self.client_status = None
+        self.trip_state = None
+
+    @property
+    def has_changes(self):
+        return bool(self.changed)
+
+    def __repr__(self):
+        return 'AppStateDelta(changed={}, appeared={}, disappeared={}, moved={})'.format(
+            sorted(self.changed), len(self.vehicles_appeared), len(self.vehicles_disappeared), len(self.vehicles_moved))
+
+
+class AppStateTracker(object):
+    """
+    Keeps the previous AppState, and computes the delta of every new one
+    """
+    def __init__(self):
+        self._data = None
+        self._positions = {}
+        self._surges = {}
+        self._client_status = None
+        self._trip_state = None
+        self.app_state = None
+
+    def update(self, app_state):
+        """
+        Args:
+            - app_state: an AppState, or the raw response data
+
+        Returns:
+            - an AppStateDelta against the previous update
+        """
+        data = app_state.raw if isinstance(app_state, AppState) else app_state
+
+        if self._data is None:
+            self.app_state = decode_eager(AppState, data)
+            changed = set(AppState._fields)
+        else:
+            self.app_state, changed = _decode_reusing(AppState, data, self._data, self.app_state)
+
+        self._data = data
+
+        delta = AppStateDelta(self.app_state, changed)
+        if 'nearby_vehicles' in changed:
+            self._diff_vehicles(data, delta)
+
+        if 'city' in changed:
+            self._diff_surges(data, delta)
+
+        if 'client' in changed:
+            status = (data.get('client') or {}).get('status')
+            if status != self._client_status:
+                delta.client_status = (self._client_status, status)
+                self._client_status = status
+
+        if 'trip' in changed:
+            trip = data.get('trip')
+            trip_state = None if trip is None else Trip(trip).state
+            if trip_state != self._trip_state:
+                delta.trip_state = (self._trip_state, trip_state)
+                self._trip_state = trip_state
+
+        return delta
+
+    def _diff_vehicles(self, data, delta):
+        positions = {}
+        for vehicle_view_id, nearby in (data.get('nearbyVehicles') or {}).iteritems():
+            vehicle_view_id = int(vehicle_view_id)
+            for vehicle_id, path in (nearby.get('vehiclePaths') or {}).iteritems():
+                if path:
+                    latest = max(path, key=lambda x: x['epoch'])
+                    positions[vehicle_view_id, vehicle_id] = (latest['latitude'], latest['longitude'], latest['epoch'])
+
+        previous_positions = self._positions
+        for key, position in positions.iteritems():
+            previous = previous_positions.get(key)
+            if previous is None:
+                delta.vehicles_appeared.append(key)
+            elif previous[:2] != position[:2]:
+                delta.vehicles_moved.append(VehicleMove(key[0], key[1], previous, position))
+
+        delta.vehicles_disappeared.extend(key for key in previous_positions if key not in positions)
+        self._positions = positions
+
+    def _diff_surges(self, data, delta):
+        surges = {}
+        vehicle_views = ((data.get('city') or {}).get('vehicleViews') or {})
+        for vehicle_view_id, vehicle_view in vehicle_views.iteritems():
+            surge = vehicle_view.get('surge')
+            surges[int(vehicle_view_id)] = None if surge is None else surge.get('multiplier')
+
+        for vehicle_view_id in set(surges) | set(self._surges):
+            previous = self._surges.get(vehicle_view_id)
+            current = surges.get(vehicle_view_id)
+            if previous != current:
+                delta.surge_changes[vehicle_view_id] = (previous, current)
+
+        self._surges = surges
+
+
+def _decode_reusing(model_type, data, previous_data, previous):
+    """
+    decodes data into model_type, reusing the parts of previous (decoded from previous_data) whose raw data is equal.
+    Comparing the raw values directly stops at the first difference, and doesn't need a serialization of the data.
+
+    Returns:
+        - the decoded model, and the names of the fields that changed
+    """
+    data = data or {}
+    previous_data = previous_data or {}
+    values = {}
+    changed = set()
+    for name, (key, _) in get_field_decoders(model_type).iteritems():
+        value = data.get(key)
+        previous_value = previous_data.get(key)
+        if value == previous_value:
+            values[name] = getattr(previous, name)
+            continue
+
+        changed.add(name)
+        if not (isinstance(value, dict) and isinstance(previous_value, dict)):
+            continue
+
+        field = model_type._fields[name]
+        if type(field) is ModelField:
+            values[name] = _decode_reusing(field._model_type, value, previous_value, getattr(previous, name))[0]
+        elif type(field) is DictField and isinstance(field._item_type, type) and issubclass(field._item_type, Model):
+            values[name] = _decode_items_reusing(field, value, previous_value, getattr(previous, name))
+
+    return decode_reusing(model_type, data, values), changed
+
+
+def _decode_items_reusing(field, data, previous_data, previous):
+    """
+    decodes the items of a dict of models, reusing the previous items whose raw data is equal
+    """
+    key_func = field._key_func
+    decode = get_decoder(field._item_type)
+    items = {}
+    for key, value in data.iteritems():
+        item_key = key_func(key)
+        if item_key in previous and previous_data.get(key) == value:
+            items[item_key] = previous[item_key]
+        else:
+            items[item_key] = decode(value)
+
+    return items
+
+
+def diff_app_states(previous, current):
+    """
+    returns the AppStateDelta between two AppStates (or raw responses)
+    """
+    tracker = AppStateTracker()
+    tracker.update(previous)
+    return tracker.update(current)
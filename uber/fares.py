@@ -0,0 +1,143 @@
+"""
+Offline fare estimates.
+
+VehicleView.fare (and VehicleView.surge, while surging) hold the pricing parameters of a vehicle type, so estimates
+can be computed locally instead of asking Uber:
+
+    estimator = FareEstimator.from_vehicle_view(app_state.city.vehicle_views[UberVehicleType.UBERX])
+    estimator.estimate(distance=3.2, duration=900)
+
+    # millions of candidate routes at once (requires numpy)
+    estimator.estimate_many(distances, durations)
+
+Fares are 'TimeOrDistance': the per-minute rate applies while the vehicle is slower than speed_threshold_mps, and the
+per-distance rate otherwise. Only the totals of a trip are known here, so the estimate charges the whole distance, plus
+the per-minute rate for the time the trip takes beyond driving that distance at the threshold speed.
+"""
+
+import re
+from .models import VehicleView
+
+# meters per distance unit
+DISTANCE_UNITS = {
+    'mile': 1609.344,
+    'km': 1000.0,
+}
+
+_amount = re.compile(r'\d[\d.,]*')
+
+
+def parse_amount(value):
+    """
+    parses an amount as found in Fare fields ('$7', '$1.05', '3,50 EUR'...) to a float.
+    Numbers are returned as floats, None stays None.
+    """
+    if value is None or isinstance(value, (int, long, float)):
+        return None if value is None else float(value)
+
+    match = _amount.search(value)
+    if match is None:
+        raise ValueError('not an amount: ' + repr(value))
+
+    amount = match.group()
+    comma = amount.rfind(',')
+    dot = amount.rfind('.')
+    # a comma is decimal after the last dot ('1.250,50'), or followed by 1 or 2 digits ('3,50'), but not in '$1,250'
+    if comma > dot and (dot != -1 or 1 <= len(amount) - comma - 1 <= 2):
+        amount = amount.replace('.', '').replace(',', '.')
+    else:
+        amount = amount.replace(',', '')
+
+    return float(amount)
+
+
+class FareEstimator(object):
+    def __init__(self, base, per_minute, per_distance_unit, minimum=0, speed_threshold_mps=0, distance_unit='mile',
+                 multiplier=1.0):
+        """
+        Args:
+            - base, per_minute, per_distance_unit, minimum: fare amounts (numbers or strings like '$7')
+            - speed_threshold_mps: below this speed, time is charged instead of distance
+            - distance_unit: 'mile' or 'km', the unit of per_distance_unit and of the estimated distances
+            - multiplier: surge multiplier
+        """
+        if distance_unit not in DISTANCE_UNITS:
+            raise ValueError('unknown distance unit: ' + repr(distance_unit))
+
+        self.base = parse_amount(base)
+        self.per_minute = parse_amount(per_minute)
+        self.per_distance_unit = parse_amount(per_distance_unit)
+        self.minimum = parse_amount(minimum) or 0.0
+        self.speed_threshold_mps = float(speed_threshold_mps or 0)
+        self.distance_unit = distance_unit
+        self.multiplier = float(multiplier or 1.0)
+
+        # seconds it takes to drive one distance unit at the threshold speed
+        if self.speed_threshold_mps:
+            self._threshold_seconds_per_unit = DISTANCE_UNITS[distance_unit] / self.speed_threshold_mps
+        else:
+            self._threshold_seconds_per_unit = 0.0
+
+    @classmethod
+    def from_vehicle_view(cls, vehicle_view, surge=True):
+        """
+        Args:
+            - vehicle_view: a VehicleView
+            - surge: apply the surge pricing of the vehicle view, if any
+        """
+        if not isinstance(vehicle_view, VehicleView):
+            vehicle_view = VehicleView(vehicle_view)
+
+        fare = vehicle_view.fare
+        current_surge = vehicle_view.surge if surge else None
+        if current_surge is None:
+            return cls(fare.base, fare.per_minute, fare.per_distance_unit, fare.minimum, fare.speed_threshold_mps,
+                       fare.distance_unit)
+
+        data = current_surge.raw
+        return cls(data.get('base', fare.base),
+                   data.get('perMinute', fare.per_minute),
+                   data.get('perDistanceUnit', fare.per_distance_unit),
+                   data.get('minimum', fare.minimum),
+                   data.get('speedThresholdMps', fare.speed_threshold_mps),
+                   data.get('distanceUnit', fare.distance_unit),
+                   current_surge.multiplier)
+
+    def estimate(self, distance, duration):
+        """
+        Args:
+            - distance: trip distance, in distance units
+            - duration: trip duration, in seconds
+
+        Returns:
+            - the estimated fare
+        """
+        slow_seconds = max(duration - distance * self._threshold_seconds_per_unit, 0.0)
+        fare = self.base + distance * self.per_distance_unit + slow_seconds / 60.0 * self.per_minute
+        return max(fare, self.minimum) * self.multiplier
+
+    def estimate_many(self, distances, durations):
+        """
+        vectorized estimate() over arrays of distances and durations (requires numpy)
+
+        Returns:
+            - a numpy array of estimated fares
+        """
+        import numpy
+
+        distances = numpy.asarray(distances, dtype=numpy.float64)
+        durations = numpy.asarray(durations, dtype=numpy.float64)
+
+        slow_minutes = numpy.maximum(durations - distances * self._threshold_seconds_per_unit, 0.0)
+        slow_minutes /= 60.0
+
+        fares = distances * self.per_distance_unit
+        fares += self.base
+        fares += slow_minutes * self.per_minute
+        numpy.maximum(fares, self.minimum, out=fares)
+        fares *= self.multiplier
+        return fares
+
+    def __repr__(self):
+        return 'FareEstimator(base={}, per_minute={}, per_distance_unit={}, minimum={}, multiplier={})'.format(
+            self.base, self.per_minute, self.per_distance_unit, self.minimum, self.multiplier)
@@ -0,0 +1,227 @@
+"""
+Offline geocoding from a local gazetteer.
+
+Gazetteer.build turns a CSV extract (address, latitude, longitude columns, e.g. from OpenStreetMap) into a binary
+index, that is then memory-mapped: lookups don't load the file in memory, and the pages are shared between processes.
+
+    Gazetteer.build('toronto.csv', 'toronto.gaz')
+    gazetteer = Gazetteer('toronto.gaz')
+    gazetteer.geolocate('353 King Street West')
+    gazetteer.reverse_geocode(43.6455, -79.3925)
+
+    client = UberClient(email, token, geocoder=gazetteer)
+    client.request_pickup('353 king st w')  # no geocoding request
+
+Results have the same shape as the ones of geolocation.geolocate.
+
+Index layout (little endian):
+    - header: magic, entry count
+    - entries sorted by normalized address: key offset, key length, address offset, address length, lat, lon
+    - entry numbers sorted by latitude, for the reverse lookups
+    - utf-8 strings
+"""
+
+import csv
+import math
+import mmap
+import os
+import re
+import struct
+import unicodedata
+
+
+class GazetteerException(Exception):
+    pass
+
+
+_HEADER = struct.Struct('<4sI')
+_ENTRY = struct.Struct('<IIIIdd')
+_INDEX = struct.Struct('<I')
+_MAGIC = 'UGAZ'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+ABBREVIATIONS = {
+    'avenue': 'ave',
+    'boulevard': 'blvd',
+    'court': 'ct',
+    'drive': 'dr',
+    'east': 'e',
+    'highway': 'hwy',
+    'lane': 'ln',
+    'north': 'n',
+    'place': 'pl',
+    'road': 'rd',
+    'south': 's',
+    'square': 'sq',
+    'street': 'st',
+    'west': 'w',
+}
+
+
+def normalize_address(address):
+    """
+    lowercases, strips accents and punctuation, and abbreviates the common street words:
+    u'353 King Street West, Toronto' -> u'353 king st w toronto'
+    """
+    if isinstance(address, str):
+        address = address.decode('utf-8')
+
+    address = unicodedata.normalize('NFKD', address.lower())
+    address = u''.join(x for x in address if not unicodedata.combining(x))
+    return u' '.join(ABBREVIATIONS.get(x, x) for x in _WORD_RE.findall(address))
+
+
+def _geocode_result(address, latitude, longitude):
+    return {
+        'formatted_address': address,
+        'geometry': {'location': {'lat': latitude, 'lng': longitude}},
+        'latitude': latitude,
+        'longitude': longitude,
+    }
+
+
+class Gazetteer(object):
+    def __init__(self, path):
+        """
+        Args:
+            - path: an index created by Gazetteer.build
+        """
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            self._map.close()
+            raise GazetteerException('not a gazetteer index: ' + path)
+
+        self._entries_offset = _HEADER.size
+        self._latitudes_offset = self._entries_offset + self._count * _ENTRY.size
+
+    @staticmethod
+    def build(csv_path, path, address_column='address', latitude_column='latitude', longitude_column='longitude'):
+        """
+        creates the index at path from a utf-8 CSV file with a header row
+        """
+        entries = []
+        with open(csv_path, 'rb') as f:
+            for row in csv.DictReader(f):
+                address = row[address_column].decode('utf-8').strip()
+                if not address:
+                    continue
+
+                key = normalize_address(address).encode('utf-8')
+                entries.append((key, address.encode('utf-8'),
+                                float(row[latitude_column]), float(row[longitude_column])))
+
+        entries.sort()
+        by_latitude = sorted(xrange(len(entries)), key=lambda x: entries[x][2])
+
+        strings = []
+        strings_offset = _HEADER.size + len(entries) * (_ENTRY.size + _INDEX.size)
+        position = strings_offset
+
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(entries)))
+            for key, address, latitude, longitude in entries:
+                f.write(_ENTRY.pack(position, len(key), position + len(key), len(address), latitude, longitude))
+                strings.append(key)
+                strings.append(address)
+                position += len(key) + len(address)
+
+            for index in by_latitude:
+                f.write(_INDEX.pack(index))
+
+            for string in strings:
+                f.write(string)
+
+        os.rename(temporary_path, path)
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def geolocate(self, address, **kwargs):
+        """
+        returns the entries matching the normalized address, in the format of geolocation.geolocate.
+        Accepts (and ignores) the other arguments of geolocation.geolocate
+        """
+        key = normalize_address(address).encode('utf-8')
+
+        # the first entry with a key >= key
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        results = []
+        while low < self._count and self._key(low) == key:
+            results.append(self._entry_result(low))
+            low += 1
+
+        return results
+
+    def reverse_geocode(self, latitude, longitude):
+        """
+        returns the entry closest to the coordinates, None if the gazetteer is empty
+        """
+        if not self._count:
+            return None
+
+        # the first entry at or north of latitude, by latitude
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._latitude_entry(middle)[4] < latitude:
+                low = middle + 1
+            else:
+                high = middle
+
+        # equirectangular distances are good enough to compare neighbours
+        scale = math.cos(math.radians(latitude))
+        best, best_distance = None, float('inf')
+
+        # walk away from latitude in both directions, until the latitude difference alone exceeds the best distance
+        for positions in (xrange(low, self._count), xrange(low - 1, -1, -1)):
+            for position in positions:
+                entry = self._latitude_entry(position)
+                latitude_distance = (entry[4] - latitude) ** 2
+                if latitude_distance >= best_distance:
+                    break
+
+                distance = latitude_distance + ((entry[5] - longitude) * scale) ** 2
+                if distance < best_distance:
+                    best, best_distance = entry, distance
+
+        return self._result(best)
+
+    def _entry(self, index):
+        return _ENTRY.unpack_from(self._map, self._entries_offset + index * _ENTRY.size)
+
+    def _key(self, index):
+        key_offset, key_length = self._entry(index)[:2]
+        return self._map[key_offset:key_offset + key_length]
+
+    def _latitude_entry(self, position):
+        index, = _INDEX.unpack_from(self._map, self._latitudes_offset + position * _INDEX.size)
+        return self._entry(index)
+
+    def _entry_result(self, index):
+        return self._result(self._entry(index))
+
+    def _result(self, entry):
+        _, _, address_offset, address_length, latitude, longitude = entry
+        address = self._map[address_offset:address_offset + address_length].decode('utf-8')
+        return _geocode_result(address, latitude, longitude)
@@ -1,15 +1,31 @@
-import requests
+import math
 
 
 class GeolocationExcetion(Exception):
-    pass
+    def __init__(self, message, status=None):
+        """
+        Args:
+            - status: the status of the geocoder response, e.g. 'INVALID_REQUEST'
+        """
+        super(GeolocationExcetion, self).__init__(message)
+        self.status = status
 
 
-def geolocate(address, bounds=None, country=None, administrative_area=None, sensor=False):
+# statuses of the requests that are wrong, rather than of a failing geocoder
+CLIENT_ERROR_STATUSES = frozenset(['INVALID_REQUEST'])
+
+
+GEOCODE_URL = 'http://maps.googleapis.com/maps/api/geocode/json'
+
+
+def geolocate(address, bounds=None, country=None, administrative_area=None, sensor=False, circuit_breaker=None):
     """
     Resolves address using Google Maps API, and performs some massaging to the output result.
     Provided for convenience, as Uber relies on this heavily, and the desire to give a simple 'batteries included' experience.
 
+    Args:
+        - circuit_breaker: (optional) a circuit.CircuitBreaker that guards the requests to the geocoder
+
     See https://developers.google.com/maps/documentation/geocoding/ for more details
     """
     params = {
@@ -30,14 +46,10 @@ def geolocate(address, bounds=None, country=None, administrative_area=None, sens
     if components:
         params['components'] = '|'.join(components)
 
-    response = requests.get('http://maps.googleapis.com/maps/api/geocode/json', params=params)
-    if not response.ok:
-        raise GeolocationExcetion(response.text)
-
-    data = response.json()
-
-    if data['status'] not in ['OK', 'ZERO_RESULTS']:
-        raise GeolocationExcetion(data)
+    if circuit_breaker is not None:
+        data = circuit_breaker.call(GEOCODE_URL, _geocode, params)
+    else:
+        data = _geocode(params)
 
     all_results = data.get('results', [])
     for result in all_results:
@@ -47,3 +59,26 @@ def geolocate(address, bounds=None, country=None, administrative_area=None, sens
             result['longitude'] = coords['lng']
 
     return all_results
+
+
+def _geocode(params):
+    import requests
+
+    response = requests.get(GEOCODE_URL, params=params)
+    if not response.ok:
+        raise GeolocationExcetion(response.text)
+
+    data = response.json()
+
+    if data['status'] not in ['OK', 'ZERO_RESULTS']:
+        raise GeolocationExcetion(data, data['status'])
+
+    return data
+
+
+def location_cell(latitude, longitude, cell_size):
+    """
+    returns the (row, column) of the grid cell that contains the given coordinates.
+    cell_size is in degrees, cells are aligned to (0, 0)
+    """
+    return int(math.floor(latitude / cell_size)), int(math.floor(longitude / cell_size))
@@ -0,0 +1,136 @@
+"""
+Sharing of the repeated parts of decoded responses.
+
+Every AppState repeats the same strings (vehicle view UI strings, image urls...) and the same sub-objects (fares,
+images...). An Interner decodes json so that equal strings are the same object, and equal objects are the same
+FrozenDict, across all the responses it decodes:
+
+    interner = Interner()
+    client = UberClient(email, token, interner=interner)
+
+    data = interner.loads(payload)
+
+Interned objects are shared, so they are immutable: FrozenDict raises TypeError on modification, and the arrays of
+interned objects are tuples (which don't compare equal to the lists json.loads returns).
+"""
+
+import json
+
+
+class FrozenDict(dict):
+    """
+    An immutable dict
+    """
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('FrozenDict is immutable')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self):
+        return hash(frozenset(self.iteritems()))
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class Interner(object):
+    def __init__(self, max_entries=100000):
+        """
+        Args:
+            - max_entries: the tables are cleared when they grow past this many entries. Objects interned before
+              stay valid, they just aren't shared with the ones interned after
+        """
+        self._max_entries = max_entries
+        self._strings = {}
+        self._objects = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._strings) + len(self._objects)
+
+    def clear(self):
+        self._strings.clear()
+        self._objects.clear()
+
+    def string(self, value):
+        """
+        returns the shared instance of a string
+        """
+        return self._strings.setdefault(value, value)
+
+    def object_pairs_hook(self, pairs):
+        """
+        the object_pairs_hook to pass to json.loads. Objects are decoded bottom-up, so the values of pairs are already
+        interned
+        """
+        strings = self._strings
+        items = []
+        key = []
+        for name, value in pairs:
+            name = strings.setdefault(name, name)
+            if isinstance(value, basestring):
+                value = strings.setdefault(value, value)
+            elif isinstance(value, list):
+                value = self._array(value)
+
+            key.append((name, _identity(value)))
+            items.append((name, value))
+
+        return self._shared(tuple(key), FrozenDict, items)
+
+    def _array(self, values):
+        """
+        returns the shared tuple of the items of an array. Objects are already interned, nested arrays aren't
+        """
+        strings = self._strings
+        items = []
+        for value in values:
+            if isinstance(value, basestring):
+                value = strings.setdefault(value, value)
+            elif isinstance(value, list):
+                value = self._array(value)
+
+            items.append(value)
+
+        return self._shared((tuple, tuple(_identity(x) for x in items)), tuple, items)
+
+    def _shared(self, key, factory, items):
+        shared = self._objects.get(key)
+        if shared is not None:
+            self.hits += 1
+            return shared
+
+        self.misses += 1
+        if len(self) >= self._max_entries:
+            self.clear()
+
+        shared = self._objects[key] = factory(items)
+        return shared
+
+    def loads(self, text):
+        """
+        json.loads, with the strings and objects interned
+        """
+        return json.loads(text, object_pairs_hook=self.object_pairs_hook)
+
+
+def _identity(value):
+    """
+    the part of an interning key that stands for a value. Interned objects are equal if and only if they are the same
+    object, and the object tables keep them alive, so their id stands for their content
+    """
+    if isinstance(value, (dict, tuple)):
+        return type(value), id(value)
+
+    # bools and numbers: 1 == 1.0 == True, but they are different json values
+    return type(value), value
@@ -0,0 +1,76 @@
+"""
+Metrics reporting.
+
+Components that have something to report (circuit breakers, caches...) take a `metrics` argument implementing the
+Metrics interface. The default implementation discards everything; InMemoryMetrics keeps the values around, and
+adapters for statsd/prometheus/etc only need to implement increment and gauge.
+"""
+
+import threading
+from copy import copy
+from itertools import count
+
+
+class Metrics(object):
+    """
+    The metrics interface. Does nothing.
+    """
+    def increment(self, name, value=1, tags=None):
+        pass
+
+    def gauge(self, name, value, tags=None):
+        pass
+
+
+class InMemoryMetrics(Metrics):
+    """
+    Keeps counters and gauges in memory, keyed by (name, tags)
+    """
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, tags=None):
+        key = _key(name, tags)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, tags=None):
+        self.gauges[_key(name, tags)] = value
+
+    def counter(self, name, **tags):
+        return self.counters.get(_key(name, tags), 0)
+
+    def gauge_value(self, name, **tags):
+        return self.gauges.get(_key(name, tags))
+
+
+class Counter(object):
+    """
+    A lock-free counter that can be incremented from many threads.
+    Relies on next() of itertools.count being atomic (it runs entirely under the GIL)
+    """
+    __slots__ = ('_count',)
+
+    def __init__(self):
+        self._count = count(1)
+
+    def increment(self):
+        """
+        Returns:
+            - the value after the increment
+        """
+        return next(self._count)
+
+    @property
+    def value(self):
+        # a copy of the iterator starts at the next value, without consuming it
+        return next(copy(self._count)) - 1
+
+
+def _key(name, tags):
+    return name, tuple(sorted(tags.items())) if tags else ()
+
+
+NULL_METRICS = Metrics()
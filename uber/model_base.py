@@ -1,32 +1,16 @@
-from StringIO import StringIO
-from datetime import datetime
-import os
+from collections import OrderedDict
+from datetime import datetime, timedelta, tzinfo
+from itertools import count
 from pprint import pformat
-from dateutil.parser import DEFAULTPARSER as dateparser
-
-
-class Model(object):
-    def __init__(self, data=None):
-        self._data = data or {}
-
-    def __repr__(self):
-        return "{}({})".format(self.__class__.__name__, pformat(self._data))
-
-    def __str__(self):
-        return ModelPrinter().pprint(self)
-
-    def __eq__(self, other):
-        return self._data == other._data
-
-    @property
-    def raw(self):
-        return self._data
+import re
 
 
 class Field(object):
     """
     Basic json field. Returns as is.
     """
+    _creation_counter = count()
+
     def __init__(self, name, optional=False, writeable=False):
         """
         Args:
@@ -37,6 +21,7 @@ class Field(object):
         self._name = name
         self._optional = optional
         self._writeable = writeable
+        self._creation_index = next(Field._creation_counter)
 
     def __get__(self, instance, owner):
         value = instance._data.get(self._name)
@@ -57,6 +42,13 @@ class Field(object):
     def from_python(self, python_value):
         return python_value
 
+    def nested_models(self, value):
+        """
+        yields (key, model_type, raw_data) for every model nested in the raw value of this field
+        key is None for a single model, or the list index / dict key of the item
+        """
+        return ()
+
 
 class ModelField(Field):
     """
@@ -72,6 +64,10 @@ class ModelField(Field):
 
         return self._model_type(value)
 
+    def nested_models(self, value):
+        if _is_model_type(self._model_type):
+            yield None, self._model_type, value
+
 
 class ListField(Field):
     """
@@ -88,6 +84,17 @@ class ListField(Field):
 
         return [self._item_type(x) for x in value]
 
+    def iter_python(self, value):
+        """
+        lazily converts the items of a raw list
+        """
+        return (self._item_type(x) for x in value or ())
+
+    def nested_models(self, value):
+        if _is_model_type(self._item_type):
+            for index, item in enumerate(value):
+                yield index, self._item_type, item
+
 
 class DictField(Field):
     """
@@ -111,18 +118,146 @@ class DictField(Field):
 
         return {self._key_func(k): self._item_type(v) for k, v in value.items()}
 
+    def iter_python(self, value):
+        """
+        lazily converts the (key, value) pairs of a raw dict
+        """
+        return ((self._key_func(k), self._item_type(v)) for k, v in (value or {}).iteritems())
+
+    def nested_models(self, value):
+        if _is_model_type(self._item_type):
+            for key, item in value.iteritems():
+                yield key, self._item_type, item
+        elif isinstance(self._item_type, ListOf):
+            for key, items in value.iteritems():
+                for index, item in enumerate(items):
+                    yield '{}.{}'.format(key, index), self._item_type.model_type, item
+
 
 class DateTimeField(Field):
     """
-    Parses a datetime string to a string
+    Parses a datetime string to a datetime.
+    ISO-8601 strings (which is what Uber sends) are parsed directly, anything else goes through dateutil
     """
     def to_python(self, value):
-        return dateparser.parse(value)
+        return parse_datetime(value)
 
 
 class EpochField(Field):
+    """
+    Translates an epoch in milliseconds to a (naive, UTC) datetime
+    """
+    def __init__(self, name, as_millis=False, **kwargs):
+        """
+        Args:
+            - as_millis: keep the value as an integer epoch in milliseconds instead of converting it to a datetime
+        """
+        super(EpochField, self).__init__(name, **kwargs)
+        self._as_millis = as_millis
+
     def to_python(self, value):
-        return datetime.utcfromtimestamp(value/1000.0)
+        if self._as_millis:
+            return value
+
+        return _utcfromtimestamp(value / 1000.0)
+
+
+_utcfromtimestamp = datetime.utcfromtimestamp
+
+_iso_datetime = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)'
+    r'(?:[T ](\d\d):(\d\d)(?::(\d\d)(?:\.(\d{1,6})\d*)?)?)?'
+    r'(?:(Z)|([+-])(\d\d):?(\d\d))?$'
+)
+
+
+class FixedOffset(tzinfo):
+    """
+    A fixed UTC offset, in minutes
+    """
+    def __init__(self, minutes):
+        self._offset = timedelta(minutes=minutes)
+        self._minutes = minutes
+
+    def utcoffset(self, dt):
+        return self._offset
+
+    def dst(self, dt):
+        return timedelta(0)
+
+    def tzname(self, dt):
+        if not self._minutes:
+            return 'UTC'
+
+        sign = '-' if self._minutes < 0 else '+'
+        return '{}{:02d}:{:02d}'.format(sign, *divmod(abs(self._minutes), 60))
+
+    def __getinitargs__(self):
+        return self._minutes,
+
+    def __repr__(self):
+        return 'FixedOffset({})'.format(self._minutes)
+
+
+_offsets = {}
+
+
+def _fixed_offset(minutes):
+    offset = _offsets.get(minutes)
+    if offset is None:
+        offset = _offsets[minutes] = FixedOffset(minutes)
+
+    return offset
+
+
+def parse_datetime(value):
+    """
+    parses an ISO-8601 datetime string, falling back to dateutil for any other format
+    """
+    match = _iso_datetime.match(value)
+    if match is None:
+        from dateutil.parser import DEFAULTPARSER
+        return DEFAULTPARSER.parse(value)
+
+    year, month, day, hour, minute, second, fraction, utc, sign, offset_hours, offset_minutes = match.groups()
+
+    if utc:
+        tz = _fixed_offset(0)
+    elif sign:
+        minutes = int(offset_hours) * 60 + int(offset_minutes)
+        tz = _fixed_offset(-minutes if sign == '-' else minutes)
+    else:
+        tz = None
+
+    return datetime(int(year), int(month), int(day),
+                    int(hour or 0), int(minute or 0), int(second or 0),
+                    int(fraction.ljust(6, '0')) if fraction else 0,
+                    tz)
+
+
+def epochs_to_datetimes(epochs, as_numpy=False):
+    """
+    converts a batch of epochs in milliseconds (e.g. the epochs of a vehicle path) at once.
+
+    Returns:
+        - a list of naive UTC datetimes, or a numpy datetime64[ms] array if as_numpy is set (requires numpy)
+    """
+    if as_numpy:
+        import numpy
+        return numpy.asarray(epochs, dtype='int64').astype('datetime64[ms]')
+
+    return [_utcfromtimestamp(epoch / 1000.0) for epoch in epochs]
+
+
+class ListOf(object):
+    """
+    An item type for ListField/DictField values that are themselves lists of models, e.g. DictField('x', ListOf(Model))
+    """
+    def __init__(self, model_type):
+        self.model_type = model_type
+
+    def __call__(self, value):
+        return [self.model_type(x) for x in value]
 
 
 # provided for readability purposes
@@ -132,71 +267,237 @@ NumberField = Field
 StringField = Field
 
 
+class ValidationError(ValueError):
+    """
+    raised by Model.validate. errors is a list of the offending json paths
+    """
+    def __init__(self, errors):
+        super(ValidationError, self).__init__('invalid fields: ' + ', '.join(errors))
+        self.errors = errors
+
+
+class ModelMeta(type):
+    """
+    Builds the field registry of every Model class once, at class creation:
+        - _fields: attribute name -> Field, including inherited fields, in declaration order
+        - _json_fields: json key -> attribute name
+    """
+    def __new__(mcs, name, bases, attrs):
+        cls = super(ModelMeta, mcs).__new__(mcs, name, bases, attrs)
+
+        fields = {}
+        for klass in reversed(cls.__mro__):
+            for attr_name, field in klass.__dict__.items():
+                if isinstance(field, Field):
+                    fields[attr_name] = field
+
+        cls._fields = OrderedDict(sorted(fields.items(), key=lambda item: item[1]._creation_index))
+        cls._json_fields = OrderedDict((field._name, attr_name) for attr_name, field in cls._fields.items())
+        return cls
+
+
+class Model(object):
+    __metaclass__ = ModelMeta
+
+    def __init__(self, data=None):
+        self._data = data or {}
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, pformat(self._data))
+
+    def __str__(self):
+        return ModelPrinter().pprint(self)
+
+    def dump(self, stream, max_depth=None, max_items=None):
+        """
+        pretty-prints the model into a file-like object without building the whole string in memory
+        """
+        ModelPrinter(max_depth=max_depth, max_items=max_items).dump(self, stream)
+
+    def __eq__(self, other):
+        if not isinstance(other, Model):
+            return NotImplemented
+
+        # models without declared fields have nothing to compare but their data
+        if not self._json_fields:
+            return self._data == other._data
+
+        data = self._data
+        other_data = other._data
+        for key in self._json_fields:
+            if data.get(key) != other_data.get(key):
+                return False
+
+        return True
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    def to_dict(self):
+        """
+        converts the model to a dict of attribute name -> python value. Nested models are converted as well.
+        Fields that are missing from the data are set to None
+        """
+        data = self._data
+        result = {}
+        for name, field in self._fields.iteritems():
+            value = data.get(field._name)
+            result[name] = None if value is None else _plain(field.to_python(value))
+
+        return result
+
+    def validate(self):
+        """
+        checks that all the required fields (including the ones of nested models) are present.
+
+        Raises:
+            - ValidationError listing the json paths of the missing fields
+        """
+        errors = self._validation_errors('')
+        if errors:
+            raise ValidationError(errors)
+
+    def _validation_errors(self, prefix):
+        errors = []
+        data = self._data
+        for field in self._fields.itervalues():
+            value = data.get(field._name)
+            path = prefix + field._name
+            if value is None:
+                if not field._optional:
+                    errors.append(path)
+                continue
+
+            for key, model_type, item in field.nested_models(value):
+                item_prefix = path + '.' if key is None else '{}.{}.'.format(path, key)
+                errors.extend(model_type(item)._validation_errors(item_prefix))
+
+        return errors
+
+    @property
+    def raw(self):
+        return self._data
+
+
 class ModelPrinter(object):
     """
     a pretty-printer. Inspired by pprint.py
     getting good results out of pprint was way too hacky, mainly due to the different naming convention of the fields in
     __repr__ vs __str__
+
+    The printer is streaming: output is produced as a sequence of chunks, so large models (e.g. an AppState with many
+    vehicle paths) can be written straight to a file-like object without building the whole string in memory.
     """
-    def __init__(self):
-        self._stream = StringIO()
+    def __init__(self, max_depth=None, max_items=None):
+        """
+        Args:
+            - max_depth: (optional) models nested deeper than this are printed as a placeholder
+            - max_items: (optional) lists and dicts are truncated after this many items
+        """
         self._padding = '    '
+        self._max_depth = max_depth
+        self._max_items = max_items
 
     def pprint(self, obj):
-        self._pprint_model(obj, 0)
-        self._stream.seek(0)
-        return self._stream.getvalue()
+        return ''.join(self.iter_chunks(obj))
 
-    def _write(self, data):
-        self._stream.write(data)
+    def dump(self, obj, stream):
+        """
+        writes obj into the given file-like object, chunk by chunk
+        """
+        write = stream.write
+        for chunk in self.iter_chunks(obj):
+            write(chunk)
+
+    def iter_chunks(self, obj):
+        """
+        yields the printed representation of obj as string chunks
+        """
+        return self._pprint_obj(obj, 0)
 
-    def _write_padding(self, data='', depth=0):
-        data = self._padding * depth + data
-        self._stream.write(data)
+    def _padded(self, data='', depth=0):
+        return self._padding * depth + data
 
     def _pprint_obj(self, obj, depth):
         if isinstance(obj, Model):
-            self._pprint_model(obj, depth)
-        elif isinstance(obj, list):
-            self._write('[\n')
-            self._pprint_array(obj, depth + 1)
-            self._write_padding(']', depth)
+            return self._pprint_model(obj, depth)
+        elif isinstance(obj, (list, tuple)):
+            return self._pprint_array(obj, depth)
         elif isinstance(obj, dict):
-            self._write('{\n')
-            self._pprint_dict(obj, depth + 1)
-            self._write_padding('}', depth)
+            return self._pprint_dict(obj.iteritems(), depth)
         elif isinstance(obj, datetime):
-            self._write(str(obj))
+            return iter([str(obj)])
         else:
-            self._write(pformat(obj, indent=1, depth=depth))
+            return iter([pformat(obj, indent=1, depth=depth)])
 
     def _pprint_model(self, obj, depth):
-        self._write(type(obj))
-        self._write('\n')
+        yield str(type(obj))
+        if self._max_depth is not None and depth >= self._max_depth:
+            yield ' {...}'
+            return
+
         depth += 1
-        for name, field in obj.__class__.__dict__.items():
-            if not isinstance(field, Field):
+        for name, field in obj._fields.iteritems():
+            raw_value = obj._data.get(field._name)
+            if raw_value is None:
                 continue
 
-            value = getattr(obj, name)
-            if value is None:
-                continue
+            # containers are converted item by item, so truncated output doesn't pay for the items it skips
+            if isinstance(field, ListField):
+                chunks = self._pprint_array(field.iter_python(raw_value), depth)
+            elif isinstance(field, DictField):
+                chunks = self._pprint_dict(field.iter_python(raw_value), depth)
+            else:
+                chunks = self._pprint_obj(field.to_python(raw_value), depth)
+
+            yield '\n' + self._padded(name + ': ', depth)
+            for chunk in chunks:
+                yield chunk
+
+    def _pprint_dict(self, items, depth):
+        yield '{\n'
+        for index, (k, v) in enumerate(items):
+            if self._max_items is not None and index >= self._max_items:
+                yield self._padded('...\n', depth + 1)
+                break
+
+            yield self._padded('{}:\t'.format(k), depth + 1)
+            for chunk in self._pprint_obj(v, depth + 1):
+                yield chunk
+            yield '\n'
+        yield self._padded('}', depth)
+
+    def _pprint_array(self, array, depth):
+        yield '[\n'
+        for index, item in enumerate(array):
+            if self._max_items is not None and index >= self._max_items:
+                yield self._padded('...\n', depth + 1)
+                break
 
-            self._write_padding(name + ': ', depth)
-            self._pprint_obj(value, depth)
+            yield self._padded(depth=depth + 1)
+            for chunk in self._pprint_obj(item, depth + 1):
+                yield chunk
+            yield ',\n'
+        yield self._padded(']', depth)
 
-            self._write('\n')
 
-        self._stream.seek(-1, os.SEEK_CUR)
+def _is_model_type(value):
+    return isinstance(value, type) and issubclass(value, Model)
 
-    def _pprint_dict(self, dict_field, depth):
-        for k, v in dict_field.items():
-            self._write_padding(depth=depth, data='{}:\t'.format(k))
-            self._pprint_obj(depth=depth, obj=v)
-            self._write('\n')
 
-    def _pprint_array(self, array, depth):
-        for item in array:
-            self._write_padding(depth=depth)
-            self._pprint_obj(depth=depth, obj=item)
-            self._write(',\n')
+def _plain(value):
+    """
+    converts models (and containers of models) to plain python values
+    """
+    if isinstance(value, Model):
+        return value.to_dict()
+    elif isinstance(value, list):
+        return [_plain(x) for x in value]
+    elif isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.iteritems()}
+
+    return value
@@ -1,5 +1,5 @@
 from .model_base import ModelField, Model, DictField, Field, BooleanField, NumberField, ListField, FloatField,\
-    DateTimeField, StringField, EpochField
+    DateTimeField, StringField, EpochField, ListOf
 
 
 class GPSLocation(object):
@@ -166,7 +166,7 @@ class NearbyVehicles(Model):
     eta_string_short = Field('etaStringShort', optional=True)
     min_eta = NumberField('minEta', optional=True)
     sorry_message = Field('sorryMsg', optional=True)
-    vehicle_paths = DictField('vehiclePaths', lambda x: [VehicleLocation(location) for location in x], optional=True)
+    vehicle_paths = DictField('vehiclePaths', ListOf(VehicleLocation), optional=True)
 
     @property
     def is_available(self):
@@ -0,0 +1,207 @@
+"""
+Local typeahead over nearby_places results.
+
+An autocomplete UI calls nearby_places on every keystroke, although most of the places it finds were already returned
+by a previous, shorter query. PlaceIndex keeps the places returned by previous searches, partitioned by the grid cell
+of the location they were searched from, and indexes every word prefix of their nickname and formatted address.
+CachedPlaceSearch serves queries from the index and only goes to the network when the index has no match:
+
+    search = CachedPlaceSearch(client, metrics=my_metrics)
+    search.nearby_places('gym k', location)
+    search.nearby_places('gym ki', location)  # served locally
+
+Every cell keeps at most max_places places, the least recently used ones are evicted first.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from .geolocation import location_cell
+from .metrics import Counter, NULL_METRICS
+
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """
+    returns the lowercase words of text
+    """
+    if not text:
+        return []
+
+    if isinstance(text, str):
+        text = text.decode('utf-8', 'replace')
+
+    return _WORD_RE.findall(text.lower())
+
+
+def place_key(place):
+    # search results can be partial: the fields are read from the raw data, so that missing ones are None
+    raw = place.raw
+    if raw.get('id') is not None:
+        return raw['id']
+
+    return raw.get('nickname'), raw.get('formatted_address')
+
+
+def _place_words(place):
+    raw = place.raw
+    return tokenize(raw.get('nickname')) + tokenize(raw.get('formatted_address'))
+
+
+class _Cell(object):
+    __slots__ = ('places', 'prefixes')
+
+    def __init__(self):
+        # key -> Place, least recently used first
+        self.places = OrderedDict()
+        # word prefix -> set of keys
+        self.prefixes = {}
+
+
+class PlaceIndex(object):
+    def __init__(self, cell_size=0.05, max_places=500, max_prefix_length=16):
+        """
+        Args:
+            - cell_size: size of the location cells, in degrees
+            - max_places: max places kept per cell
+            - max_prefix_length: longer words are only indexed up to this length
+        """
+        self._cell_size = cell_size
+        self._max_places = max_places
+        self._max_prefix_length = max_prefix_length
+        self._cells = {}
+        self._lock = threading.Lock()
+
+    def cell(self, location):
+        return location_cell(location.latitude, location.longitude, self._cell_size)
+
+    def add(self, places, location):
+        """
+        indexes the places returned by a search from location
+        """
+        cell_key = self.cell(location)
+        with self._lock:
+            cell = self._cells.get(cell_key)
+            if cell is None:
+                cell = self._cells[cell_key] = _Cell()
+
+            for place in places:
+                key = place_key(place)
+                if key in cell.places:
+                    self._remove(cell, key)
+
+                cell.places[key] = place
+                for prefix in self._prefixes(place):
+                    cell.prefixes.setdefault(prefix, set()).add(key)
+
+            while len(cell.places) > self._max_places:
+                self._remove(cell, next(iter(cell.places)))
+
+    def search(self, query, location, limit=None):
+        """
+        returns the known places of the cell of location that have a word starting with every word of query,
+        closest to location first
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+
+        with self._lock:
+            cell = self._cells.get(self.cell(location))
+            if cell is None:
+                return []
+
+            keys = None
+            for word in words:
+                matches = cell.prefixes.get(word[:self._max_prefix_length])
+                if not matches:
+                    return []
+
+                keys = set(matches) if keys is None else keys & matches
+                if not keys:
+                    return []
+
+            places = []
+            for key in keys:
+                place = cell.places.pop(key)
+                cell.places[key] = place
+                places.append(place)
+
+        places = [x for x in places if self._matches(x, words)]
+        places.sort(key=lambda x: _distance(x, location))
+        return places[:limit] if limit is not None else places
+
+    def __len__(self):
+        return sum(len(x.places) for x in self._cells.itervalues())
+
+    def _prefixes(self, place):
+        prefixes = set()
+        for word in _place_words(place):
+            for i in xrange(1, min(len(word), self._max_prefix_length) + 1):
+                prefixes.add(word[:i])
+
+        return prefixes
+
+    def _matches(self, place, words):
+        # words longer than max_prefix_length were only matched on their prefix
+        place_words = _place_words(place)
+        return all(any(x.startswith(word) for x in place_words) for word in words)
+
+    def _remove(self, cell, key):
+        place = cell.places.pop(key)
+        for prefix in self._prefixes(place):
+            keys = cell.prefixes[prefix]
+            keys.discard(key)
+            if not keys:
+                del cell.prefixes[prefix]
+
+
+def _distance(place, location):
+    latitude, longitude = place.raw.get('latitude'), place.raw.get('longitude')
+    if latitude is None or longitude is None:
+        return float('inf')
+
+    return (float(latitude) - location.latitude) ** 2 + (float(longitude) - location.longitude) ** 2
+
+
+class CachedPlaceSearch(object):
+    def __init__(self, client, index=None, min_results=1, metrics=None):
+        """
+        Args:
+            - client: the UberClient to search with on a miss
+            - index: (optional) the PlaceIndex to use
+            - min_results: a search with fewer local results is a miss
+            - metrics: (optional) a metrics.Metrics implementation, reports the 'places.hit' and 'places.miss' counters
+        """
+        self._client = client
+        self.index = index or PlaceIndex()
+        self._min_results = min_results
+        self._metrics = metrics or NULL_METRICS
+
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def nearby_places(self, query, location, limit=None):
+        """
+        same as UberClient.nearby_places, served from the index when possible
+        """
+        places = self.index.search(query, location, limit)
+        if len(places) >= self._min_results:
+            self.hits.increment()
+            self._metrics.increment('places.hit')
+            return places
+
+        self.misses.increment()
+        self._metrics.increment('places.miss')
+
+        places = self._client.nearby_places(query, location)
+        self.index.add(places, location)
+        return places[:limit] if limit is not None else places
+
+    @property
+    def hit_rate(self):
+        hits = self.hits.value
+        total = hits + self.misses.value
+        return float(hits) / total if total else 0.0
@@ -0,0 +1,116 @@
+"""
+Adaptive ping loops.
+
+AdaptivePoller pings a location as a scheduler.Scheduler job, and adapts its interval to what it observes: it speeds up
+while vehicles move, the trip or client status changes, or a dispatch progresses, and slows down while nothing
+changes. It never sleeps past the expiration of a surge or the eta of the trip.
+
+    scheduler = Scheduler(rate_limiter=RateLimiter(5))
+    poller = AdaptivePoller(client, location, on_delta, scheduler)
+    poller.start()
+
+on_delta is called with the deltas.AppStateDelta of every ping. The global request budget is enforced by the
+scheduler's rate limiter.
+"""
+
+import time
+from .deltas import AppStateTracker
+
+
+class AdaptivePoller(object):
+    def __init__(self, client, location, callback, scheduler, min_interval=1.0, max_interval=30.0,
+                 initial_interval=5.0, speedup=0.5, slowdown=1.5, clock=time.time):
+        """
+        Args:
+            - client: the UberClient to ping with
+            - location: the location to ping
+            - callback: called with the AppStateDelta of every ping. Its exceptions are counted in errors, like the
+              ping errors
+            - scheduler: the scheduler.Scheduler that runs the poller
+            - min_interval, max_interval: bounds of the interval, in seconds
+            - speedup: the interval is multiplied by this after a ping that saw changes
+            - slowdown: the interval is multiplied by this after a ping that saw nothing change (and after errors)
+        """
+        self._client = client
+        self._location = location
+        self._callback = callback
+        self._scheduler = scheduler
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._speedup = speedup
+        self._slowdown = slowdown
+        self._clock = clock
+
+        self._tracker = AppStateTracker()
+        self._task = None
+
+        self.interval = initial_interval
+        self.errors = 0
+        self.last_error = None
+
+    def start(self, delay=0):
+        self._task = self._scheduler.schedule(self.poll, delay, name='poller')
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def poll(self):
+        """
+        pings once
+
+        Returns:
+            - seconds until the next ping
+        """
+        try:
+            app_state = self._client.ping(self._location)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            self.interval = self._bound(self.interval * self._slowdown)
+            return self.interval
+
+        delta = self._tracker.update(app_state)
+        try:
+            self._callback(delta)
+        except Exception as e:
+            # the ping itself went fine: counted as an error, but the interval still follows the delta
+            self.errors += 1
+            self.last_error = e
+
+        self.interval = self.next_interval(delta, self._clock())
+        return self.interval
+
+    def next_interval(self, delta, now):
+        """
+        the interval that follows the ping that produced delta
+        """
+        changed = (delta.vehicles_moved or delta.vehicles_appeared or delta.vehicles_disappeared or
+                   delta.surge_changes or delta.client_status or delta.trip_state)
+        interval = self.interval * (self._speedup if changed else self._slowdown)
+
+        app_state = delta.app_state
+        trip = app_state.trip
+        if trip is not None:
+            if trip.dispatch_percent is not None and trip.dispatch_percent < 1:
+                # dispatching is short, and its outcome matters
+                interval = self._min_interval
+            elif trip.eta is not None:
+                # at least 4 pings before the eta (in minutes)
+                interval = min(interval, trip.eta * 60 / 4.0)
+
+        city = app_state.city
+        if city is not None:
+            for vehicle_view in (city.vehicle_views or {}).itervalues():
+                surge = vehicle_view.surge
+                if surge is not None and surge.expiration_time:
+                    # right after the surge expires
+                    remaining = surge.expiration_time / 1000.0 - now
+                    if remaining > 0:
+                        interval = min(interval, remaining + self._min_interval)
+
+        return self._bound(interval)
+
+    def _bound(self, interval):
+        return max(self._min_interval, min(self._max_interval, interval))
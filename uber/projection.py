@@ -0,0 +1,175 @@
+"""
+Field projections of message responses.
+
+A projection extracts a few values from a raw response into a flat record, without building the models of the rest:
+
+    projection = get_projection(AppState, ['client.status', 'trip.eta', 'nearby_vehicles.*.min_eta'])
+    projection.extract(data)
+    # {'client.status': 'Looking', 'trip.eta': None, 'nearby_vehicles.*.min_eta': {8: 3, 1: 5}}
+
+or directly client.ping(location, fields=[...]). Paths are dotted attribute names, compiled against the model field
+registry: a path that doesn't exist in the schema raises ValueError at compile time. Items of dict and list fields are
+selected with their key (or index), or '*' for all of them. Values are converted by their field (the value of a path
+ending on a model field is the model), missing values are None.
+
+Projections also know the json paths of all the declared fields they don't need (Projection.skip), so that streamed
+responses don't even decode them (see streaming.StreamingDecoder).
+"""
+
+from .model_base import Model, ModelField, ListField, DictField, ListOf
+
+_projections = {}
+
+
+def get_projection(model_type, fields):
+    """
+    returns the (cached) Projection of fields over model_type
+    """
+    key = model_type, tuple(fields)
+    projection = _projections.get(key)
+    if projection is None:
+        projection = _projections[key] = Projection(model_type, fields)
+
+    return projection
+
+
+class Projection(object):
+    """
+    Attributes:
+        - fields: the projected paths, which are the keys of the records
+        - skip: json paths of the declared fields that none of the projected paths needs
+    """
+    def __init__(self, model_type, fields):
+        self.fields = tuple(fields)
+
+        # json path tree of the values the projection reads. None marks a value that is read whole
+        tree = {}
+        self._getters = []
+        for path in self.fields:
+            json_path = []
+            self._getters.append((path, _value_getter(model_type, path.split('.'), path, json_path)))
+
+            node = tree
+            for segment in json_path[:-1]:
+                node = node.setdefault(segment, {})
+                if node is None:
+                    break
+            else:
+                if json_path:
+                    node[json_path[-1]] = None
+
+        self.skip = sorted(_skip_paths(model_type, tree, ()))
+
+    def extract(self, data):
+        """
+        Args:
+            - data: the raw response, or a model
+
+        Returns:
+            - a dict of path -> value
+        """
+        if isinstance(data, Model):
+            data = data.raw
+
+        return {path: getter(data) for path, getter in self._getters}
+
+
+def _value_getter(value_type, segments, path, json_path):
+    """
+    returns a function extracting the value at segments from a raw value of value_type (a model type, a ListOf or
+    any item function), and appends the json keys of the segments to json_path
+    """
+    if not segments:
+        return value_type
+
+    if isinstance(value_type, type) and issubclass(value_type, Model):
+        return _model_getter(value_type, segments, path, json_path)
+
+    if isinstance(value_type, ListOf):
+        return _list_getter(value_type.model_type, segments, path, json_path)
+
+    raise ValueError('invalid path {!r}: {!r} has no fields'.format(path, segments[0]))
+
+
+def _model_getter(model_type, segments, path, json_path):
+    field = model_type._fields.get(segments[0])
+    if field is None:
+        raise ValueError('invalid path {!r}: {} has no field {!r}'.format(path, model_type.__name__, segments[0]))
+
+    key = field._name
+    json_path.append(key)
+    rest = segments[1:]
+
+    if not rest:
+        inner = field.to_python
+    elif isinstance(field, ModelField):
+        inner = _value_getter(field._model_type, rest, path, json_path)
+    elif isinstance(field, DictField):
+        inner = _dict_getter(field, rest, path, json_path)
+    elif isinstance(field, ListField):
+        inner = _list_getter(field._item_type, rest, path, json_path)
+    else:
+        raise ValueError('invalid path {!r}: {}.{} has no fields'.format(path, model_type.__name__, segments[0]))
+
+    def get(data):
+        value = data.get(key)
+        return None if value is None else inner(value)
+
+    return get
+
+
+def _dict_getter(field, segments, path, json_path):
+    selector = segments[0]
+    # the decoder can only skip under '*': all the keys of a dict need the same fields
+    json_path.append('*')
+    item = _value_getter(field._item_type, segments[1:], path, json_path)
+
+    if selector == '*':
+        key_func = field._key_func
+        return lambda value: {key_func(k): item(v) for k, v in value.iteritems()}
+
+    def get(value):
+        item_value = value.get(selector)
+        return None if item_value is None else item(item_value)
+
+    return get
+
+
+def _list_getter(item_type, segments, path, json_path):
+    selector = segments[0]
+    # lists are never descended into by the decoder
+    json_path.append(None)
+    item = _value_getter(item_type, segments[1:], path, json_path)
+
+    if selector == '*':
+        return lambda value: [item(x) for x in value]
+
+    try:
+        index = int(selector)
+    except ValueError:
+        raise ValueError('invalid path {!r}: {!r} is not a list index'.format(path, selector))
+
+    return lambda value: item(value[index]) if -len(value) <= index < len(value) else None
+
+
+def _skip_paths(value_type, node, prefix):
+    """
+    yields the json paths of the declared fields under prefix that the tree node doesn't need
+    """
+    # values read whole, and lists, are decoded entirely
+    if node is None or not (isinstance(value_type, type) and issubclass(value_type, Model)):
+        return
+
+    for field in value_type._fields.itervalues():
+        key = field._name
+        if key not in node:
+            yield '.'.join(prefix + (key,))
+            continue
+
+        child = node[key]
+        if isinstance(field, ModelField):
+            for path in _skip_paths(field._model_type, child, prefix + (key,)):
+                yield path
+        elif isinstance(field, DictField) and child is not None:
+            for path in _skip_paths(field._item_type, child['*'], prefix + (key, '*')):
+                yield path
@@ -0,0 +1,200 @@
+"""
+Multiplexes many periodic jobs (pollers, trip watchers...) over a few threads.
+
+A job is a function that returns the number of seconds until it should run again, or None when it is done. The
+scheduler keeps the jobs in a heap ordered by due time; a dispatcher thread hands the due jobs to a small pool of
+worker threads, so thousands of jobs don't need thousands of sleeping threads:
+
+    scheduler = Scheduler(workers=4, rate_limiter=RateLimiter(10))
+    task = scheduler.schedule(job)
+    ...
+    task.cancel()
+    scheduler.close()
+
+When the scheduler has a rate limiter, every run takes a token from it. Jobs that are due while the budget is
+exhausted are deferred until a token is available, instead of blocking the workers.
+
+With workers=0 no thread is started, and the caller drives the scheduler with run_pending().
+"""
+
+import heapq
+import threading
+import time
+from itertools import count
+from Queue import Queue
+from .metrics import Counter
+
+
+class ScheduledTask(object):
+    """
+    Attributes:
+        - name: (optional) the name given to schedule()
+        - runs: the number of completed runs
+        - error: the exception that ended the job, if any
+        - done: an Event set when the job is finished, failed or cancelled
+    """
+    def __init__(self, func, name=None):
+        self._func = func
+        self.name = name
+        self.runs = 0
+        self.error = None
+        self.cancelled = False
+        self.done = threading.Event()
+
+    def cancel(self):
+        """
+        the job won't run anymore. A run that already started completes
+        """
+        self.cancelled = True
+        self.done.set()
+
+    def __repr__(self):
+        return 'ScheduledTask({!r}, runs={})'.format(self.name or self._func, self.runs)
+
+
+class Scheduler(object):
+    def __init__(self, workers=4, rate_limiter=None, clock=time.time):
+        """
+        Args:
+            - workers: number of threads running the jobs. 0 to drive the scheduler with run_pending()
+            - rate_limiter: (optional) a throttling.RateLimiter every run takes a token from
+        """
+        self.rate_limiter = rate_limiter
+        self._clock = clock
+
+        self._heap = []
+        self._sequence = count()
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # runs deferred because the request budget was exhausted
+        self.deferred = Counter()
+
+        self._queue = Queue()
+        self._threads = []
+        if workers:
+            self._threads.append(threading.Thread(target=self._dispatch, name='uber-scheduler'))
+            for i in xrange(workers):
+                self._threads.append(threading.Thread(target=self._work, name='uber-scheduler-{}'.format(i)))
+
+            for thread in self._threads:
+                thread.daemon = True
+                thread.start()
+
+    def schedule(self, func, delay=0, name=None):
+        """
+        Args:
+            - func: called without arguments, returns the delay until its next run in seconds, or None when done
+            - delay: seconds until the first run
+
+        Returns:
+            - a ScheduledTask
+        """
+        task = ScheduledTask(func, name)
+        self._push(task, self._clock() + delay)
+        return task
+
+    def __len__(self):
+        """
+        the number of jobs waiting for their next run
+        """
+        return len(self._heap)
+
+    def run_pending(self):
+        """
+        runs the due jobs in the calling thread
+
+        Returns:
+            - seconds until the next job is due, None if there is no job left
+        """
+        for task in self._pop_due(self._clock()):
+            self._run(task)
+
+        with self._condition:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                return None
+
+            return max(0.0, self._heap[0][0] - self._clock())
+
+    def close(self):
+        """
+        stops the threads. Runs in progress complete, the jobs that weren't started are dropped
+        """
+        with self._condition:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._condition.notify_all()
+
+        for _ in self._threads[1:]:
+            self._queue.put(None)
+
+        for thread in self._threads:
+            thread.join()
+
+    def _push(self, task, due):
+        with self._condition:
+            heapq.heappush(self._heap, (due, next(self._sequence), task))
+            if self._heap[0][2] is task:
+                self._condition.notify()
+
+    def _pop_due(self, now):
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                task = heapq.heappop(self._heap)[2]
+                if not task.cancelled:
+                    due.append(task)
+
+        return due
+
+    def _run(self, task):
+        if task.cancelled:
+            return
+
+        if self.rate_limiter is not None and not self.rate_limiter.try_acquire():
+            self.deferred.increment()
+            wait = max(0.0, 1 - self.rate_limiter.available()) / self.rate_limiter.rate
+            self._push(task, self._clock() + wait)
+            return
+
+        try:
+            delay = task._func()
+        except Exception as e:
+            task.error = e
+            task.done.set()
+            return
+
+        task.runs += 1
+        if delay is None or task.cancelled:
+            task.done.set()
+        else:
+            self._push(task, self._clock() + delay)
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    wait = self._heap[0][0] - self._clock() if self._heap else None
+                    if wait is not None and wait <= 0:
+                        break
+
+                    self._condition.wait(wait)
+
+                if self._closed:
+                    return
+
+            for task in self._pop_due(self._clock()):
+                self._queue.put(task)
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+
+            self._run(task)
@@ -0,0 +1,217 @@
+"""
+Typed, immutable snapshots of Uber responses.
+
+Models wrap the raw response dict, and converting them to plain python goes through the field descriptors one
+attribute at a time. Snapshots mirror the uber.models classes as namedtuples generated from the model field
+registries: they are built in one pass from the raw data, hold the raw (json) values of the fields, use a fraction of
+the memory of the response dicts and serialize compactly with msgpack (the field names are not stored).
+
+Snapshots are immutable all the way down: dicts (of dict fields, or in raw values) are interning.FrozenDict copies, and
+lists are tuples, so nothing is shared with the source data.
+
+    state = from_json(AppState, response_bytes)
+    state.city.vehicle_views[8].surge.multiplier
+
+    packed = pack(state)
+    state = unpack(AppState, packed)
+
+msgpack is an optional dependency, only needed by pack/unpack.
+"""
+
+import json
+from collections import namedtuple
+from .interning import FrozenDict
+from .model_base import Model, Field, ModelField, ListField, DictField, ListOf
+
+_snapshot_types = {}
+_declared_types = {}
+_converters = {}
+_rebuilders = {}
+
+
+def snapshot_type(model_type):
+    """
+    returns the namedtuple type that mirrors model_type. e.g. snapshot_type(City) -> CitySnapshot
+    """
+    result = _snapshot_types.get(model_type)
+    if result is None:
+        name = model_type.__name__ + 'Snapshot'
+        base = namedtuple(name, model_type._fields.keys())
+
+        # generated types can't be pickled by reference, so snapshots pickle as (model type, values) instead
+        attrs = {
+            '__slots__': (),
+            '__reduce__': lambda self: (_restore, (model_type, tuple(self))),
+        }
+        result = _snapshot_types[model_type] = type(name, (base,), attrs)
+
+    return result
+
+
+def snapshot(model):
+    """
+    takes a snapshot of a model instance
+    """
+    return _get_converter(_declared_type(type(model)))(model.raw)
+
+
+def from_data(model_type, data):
+    """
+    builds the snapshot of model_type from its raw (decoded json) data
+    """
+    return _get_converter(model_type)(data)
+
+
+def from_json(model_type, payload):
+    """
+    builds the snapshot of model_type straight from a json response body
+    """
+    return _get_converter(model_type)(json.loads(payload))
+
+
+def pack(value):
+    """
+    serializes a snapshot with msgpack
+    """
+    import msgpack
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def unpack(model_type, packed):
+    """
+    deserializes a snapshot of model_type that was serialized by pack()
+    """
+    import msgpack
+    try:
+        data = msgpack.unpackb(packed, raw=False, strict_map_key=False)
+    except TypeError:
+        # msgpack < 1.0 doesn't know strict_map_key, and allows any key type anyway
+        data = msgpack.unpackb(packed, raw=False)
+
+    return _get_rebuilder(model_type)(data)
+
+
+def _restore(model_type, values):
+    return snapshot_type(model_type)(*values)
+
+
+def _model_item_type(item_type):
+    """
+    returns (model_type, is_list) when item_type describes models (Model subclass or ListOf), otherwise (None, False)
+    """
+    if isinstance(item_type, type) and issubclass(item_type, Model):
+        return item_type, False
+
+    if isinstance(item_type, ListOf):
+        return item_type.model_type, True
+
+    return None, False
+
+
+def _field_handler(field, get_handler):
+    """
+    returns a function that converts the value of field, or None if the value is kept as is.
+    get_handler(model_type) returns the function that handles a nested model.
+    """
+    if isinstance(field, ModelField):
+        model_type, _ = _model_item_type(field._model_type)
+        if model_type is not None:
+            return _handle_model(get_handler(model_type))
+
+    elif isinstance(field, ListField):
+        model_type, _ = _model_item_type(field._item_type)
+        if model_type is not None:
+            return _handle_list(get_handler(model_type))
+
+    elif isinstance(field, DictField):
+        model_type, is_list = _model_item_type(field._item_type)
+        if model_type is not None:
+            handle = get_handler(model_type)
+            if is_list:
+                handle = _handle_list(handle)
+
+            return _handle_dict(handle, field._key_func)
+
+    return None
+
+
+def _handle_model(handle):
+    return lambda value: None if value is None else handle(value)
+
+
+def _handle_list(handle):
+    return lambda value: () if value is None else tuple(handle(x) for x in value)
+
+
+def _handle_dict(handle, key_func):
+    return lambda value: _EMPTY if value is None else FrozenDict((key_func(k), handle(v)) for k, v in value.iteritems())
+
+
+_EMPTY = FrozenDict()
+
+
+def _freeze(value):
+    """
+    returns an immutable copy of a raw value
+    """
+    if isinstance(value, dict):
+        return FrozenDict((k, _freeze(v)) for k, v in value.iteritems())
+
+    if isinstance(value, list):
+        return tuple(_freeze(x) for x in value)
+
+    return value
+
+
+def _declared_type(model_type):
+    """
+    returns the first class in the MRO of model_type that declares fields. Subclasses that only change how the data is
+    accessed (decoding.decode_eager results, archive.ArchivedAppState...) share the snapshot type of their model
+    """
+    result = _declared_types.get(model_type)
+    if result is None:
+        result = next((klass for klass in model_type.__mro__
+                       if any(isinstance(x, Field) for x in vars(klass).itervalues())), model_type)
+        _declared_types[model_type] = result
+
+    return result
+
+
+def _get_converter(model_type):
+    """
+    returns the function that converts the raw data of model_type to its snapshot
+    """
+    converter = _converters.get(model_type)
+    if converter is None:
+        result_type = snapshot_type(model_type)
+
+        # registered before resolving the fields, so self-referencing models don't recurse forever
+        fields = []
+        converter = _converters[model_type] = lambda data: _convert(result_type, fields, data)
+        fields.extend((field._name, _field_handler(field, _get_converter)) for field in model_type._fields.itervalues())
+
+    return converter
+
+
+def _convert(result_type, fields, data):
+    get = data.get
+    return result_type(*[_freeze(get(key)) if handle is None else handle(get(key)) for key, handle in fields])
+
+
+def _get_rebuilder(model_type):
+    """
+    returns the function that rebuilds the snapshot of model_type from its unpacked (msgpack) array
+    """
+    rebuilder = _rebuilders.get(model_type)
+    if rebuilder is None:
+        result_type = snapshot_type(model_type)
+        handlers = []
+        rebuilder = _rebuilders[model_type] = lambda values: _rebuild(result_type, handlers, values)
+        handlers.extend(_field_handler(field, _get_rebuilder) for field in model_type._fields.itervalues())
+
+    return rebuilder
+
+
+def _rebuild(result_type, handlers, values):
+    return result_type(*[_freeze(value) if handle is None else handle(value)
+                         for handle, value in zip(handlers, values)])
@@ -0,0 +1,269 @@
+"""
+Streaming json decoding, that can skip sub-trees.
+
+response.json() needs the whole body in memory, then builds the whole dict tree, even for the parts that the caller
+doesn't use (e.g. city.vehicleViews when only the nearby vehicles matter). StreamingDecoder reads the body chunk by
+chunk, and skips the sub-trees it is told to skip without decoding them:
+
+    decoder = StreamingDecoder(skip=['city.vehicleViews', 'nearbyVehicles.*.vehiclePaths'])
+    data = decoder.decode(response.iter_content(8192))
+
+Skip paths are dotted json keys, '*' matching any key. The objects on the way to a skipped path are parsed member by
+member; the end of every other value is found by a regex scan, and the value decoded in one go by the json module, so
+the cost of the python-level parsing is limited to the few objects that contain skipped sub-trees. Skipped sub-trees
+are scanned chunk by chunk, without being held in memory.
+"""
+
+import json
+import re
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# from after an opening quote, up to the closing one (or a trailing backslash, or the end of the buffer)
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+# up to the next bracket outside of strings (or the start of a string that doesn't end in the buffer)
+_CONTAINER_BODY = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*')
+_SCALAR_END = re.compile(r'[,}\] \t\n\r]')
+
+
+class StreamingDecoder(object):
+    def __init__(self, skip=(), object_pairs_hook=None):
+        """
+        Args:
+            - skip: dotted json paths of the sub-trees to leave out of the result, e.g. 'city.vehicleViews'
+            - object_pairs_hook: (optional) same as for json.loads, e.g. interning.Interner.object_pairs_hook
+        """
+        self._skip = [tuple(x.split('.')) for x in skip]
+        self._decoder = json.JSONDecoder(object_pairs_hook=object_pairs_hook)
+        self._object_pairs_hook = object_pairs_hook
+
+    def decode(self, chunks):
+        """
+        Args:
+            - chunks: iterable of str, e.g. response.iter_content()
+
+        Returns:
+            - the decoded document, without the skipped sub-trees
+        """
+        if not self._skip:
+            return self._decoder.decode(''.join(chunks))
+
+        reader = _Reader(chunks)
+        value = self._value(reader, ())
+        reader.skip_whitespace()
+        if not reader.at_end():
+            raise ValueError('extra data after the json document')
+
+        return value
+
+    def _action(self, path):
+        """
+        Returns:
+            - 'skip' if path is skipped, 'descend' if a skipped path is under it, None otherwise
+        """
+        action = None
+        for skip in self._skip:
+            if len(skip) < len(path):
+                continue
+
+            if all(x == '*' or x == y for x, y in zip(skip, path)):
+                if len(skip) == len(path):
+                    return 'skip'
+
+                action = 'descend'
+
+        return action
+
+    def _value(self, reader, path):
+        reader.skip_whitespace()
+        if self._action(path) == 'descend' and reader.peek() == '{':
+            return self._object(reader, path)
+
+        return reader.decode_value(self._decoder)
+
+    def _object(self, reader, path):
+        reader.expect('{')
+        pairs = []
+
+        reader.skip_whitespace()
+        if reader.peek() == '}':
+            reader.expect('}')
+            return self._build_object(pairs)
+
+        while True:
+            # keys are decoded as the json module would: unicode, unless ascii
+            reader.skip_whitespace()
+            key = reader.decode_value(self._decoder)
+
+            reader.skip_whitespace()
+            reader.expect(':')
+
+            member_path = path + (key,)
+            if self._action(member_path) == 'skip':
+                reader.skip_whitespace()
+                reader.skip_value()
+            else:
+                pairs.append((key, self._value(reader, member_path)))
+
+            reader.skip_whitespace()
+            if reader.peek() == ',':
+                reader.expect(',')
+            else:
+                reader.expect('}')
+                return self._build_object(pairs)
+
+    def _build_object(self, pairs):
+        if self._object_pairs_hook is not None:
+            return self._object_pairs_hook(pairs)
+
+        return dict(pairs)
+
+
+class _Reader(object):
+    """
+    the current chunk, replaced by the next one once consumed
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = ''
+        self.position = 0
+        self._exhausted = False
+
+        # the pieces of the value being read, when it is kept
+        self._parts = None
+        self._start = 0
+
+    def _next_chunk(self):
+        for chunk in self._chunks:
+            if chunk:
+                return chunk
+
+        self._exhausted = True
+        return None
+
+    def _refill(self, position):
+        """
+        moves to the next chunk, the current buffer from position on being carried over to it. The part of the value
+        being read before position is collected, if it is kept
+
+        Returns:
+            - False if there is no more data
+        """
+        if self._parts is not None:
+            self._parts.append(self._buffer[self._start:position])
+            self._start = 0
+
+        chunk = self._next_chunk()
+        self._buffer = self._buffer[position:] + (chunk or '')
+        self.position = 0
+        return chunk is not None
+
+    def at_end(self):
+        return self.position >= len(self._buffer) and not self._refill(self.position)
+
+    def peek(self):
+        while self.position >= len(self._buffer):
+            if not self._refill(self.position):
+                raise ValueError('unexpected end of json document')
+
+        return self._buffer[self.position]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('expected {!r} at {!r}'.format(char, self._buffer[self.position:self.position + 20]))
+
+        self.position += 1
+
+    def skip_whitespace(self):
+        while True:
+            self.position = _WHITESPACE.match(self._buffer, self.position).end()
+            if self.position < len(self._buffer) or not self._refill(self.position):
+                return
+
+    def decode_value(self, decoder):
+        """
+        decodes the value at the current position with a json.JSONDecoder, and moves past it. The chunks of a value
+        that doesn't fit in the buffer are only joined once its end was found
+        """
+        self.peek()
+        try:
+            value, end = decoder.raw_decode(self._buffer, self.position)
+            # a number at the end of the buffer may go on in the next chunk
+            if end < len(self._buffer):
+                self.position = end
+                return value
+        except ValueError:
+            pass
+
+        self._parts = []
+        self._start = self.position
+        try:
+            self.skip_value()
+            self._parts.append(self._buffer[self._start:self.position])
+            text = ''.join(self._parts)
+        finally:
+            self._parts = None
+
+        value, end = decoder.raw_decode(text)
+        if end != len(text):
+            raise ValueError('invalid json value: {!r}'.format(text[:20]))
+
+        return value
+
+    def skip_value(self):
+        """
+        moves past the value at the current position, scanning it chunk by chunk
+        """
+        first = self.peek()
+        if first == '"':
+            self.position = self._string_end(self.position + 1)
+        elif first in '{[':
+            self.position = self._container_end(self.position)
+        else:
+            self.position = self._scalar_end(self.position)
+
+    def _string_end(self, position):
+        while True:
+            position = _STRING_BODY.match(self._buffer, position).end()
+            if position < len(self._buffer) and self._buffer[position] == '"':
+                return position + 1
+
+            # the end of the buffer, possibly before a backslash: go on from there in the next chunk
+            if not self._refill(position):
+                raise ValueError('unterminated string')
+
+            position = 0
+
+    def _container_end(self, position):
+        depth = 0
+        while True:
+            position = _CONTAINER_BODY.match(self._buffer, position).end()
+            if position >= len(self._buffer):
+                if not self._refill(position):
+                    raise ValueError('unexpected end of json document')
+
+                position = 0
+                continue
+
+            char = self._buffer[position]
+            if char == '"':
+                position = self._string_end(position + 1)
+                continue
+
+            position += 1
+            if char in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if not depth:
+                    return position
+
+    def _scalar_end(self, position):
+        while True:
+            match = _SCALAR_END.search(self._buffer, position)
+            if match is not None:
+                return match.start()
+
+            if not self._refill(len(self._buffer)):
+                return len(self._buffer)
+
+            position = 0
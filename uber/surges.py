@@ -0,0 +1,341 @@
+"""
+Surge multiplier time series.
+
+SurgeCollector extracts only the surge/fare fields of the vehicle views of every AppState it is given, and appends
+them to an in-memory columnar store (one array per column), indexed by (location cell, vehicle view id):
+
+    collector = SurgeCollector(cell_size=0.01)
+    collector.collect(client.ping(location), location)
+    ...
+    collector.query(location=location, vehicle_view_id=8, start=time() - 3600)
+
+Rows can be flushed to a compact binary file in append-only blocks. Flushed rows are dropped from memory, so that a
+long-running collector only holds the rows since its last flush, but they stay queryable: every block starts with its
+time range and a table of its (cell, vehicle view) series, whose rows are stored together in time order, so a query
+only reads the rows of the matching series of the blocks that overlap its time window. SurgeCollector.load reads the
+block tables of a file, and the rows on demand. Vehicle views without a surge are recorded with a multiplier of 1.0.
+"""
+
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from time import time
+from .geolocation import location_cell
+from .models import AppState
+
+SurgeRecord = namedtuple('SurgeRecord', ['timestamp', 'cell', 'vehicle_view_id', 'multiplier', 'expiration_time',
+                                         'fare_id'])
+
+NAN = float('nan')
+
+# (name, array typecode). int columns are 'i' (4 bytes on all the supported platforms), and the columns are stored
+# little-endian like the block headers, so the file format is the same on all platforms
+_COLUMNS = [
+    ('timestamp', 'd'),
+    ('cell_row', 'i'),
+    ('cell_column', 'i'),
+    ('vehicle_view_id', 'i'),
+    ('multiplier', 'd'),
+    ('expiration_time', 'd'),
+    ('fare_id', 'i'),
+]
+
+_MAGIC = 'USRG'
+# magic, cell size, row count, first & last timestamp, series count
+_BLOCK_HEADER = struct.Struct('<4sdIddI')
+# cell row, cell column, vehicle view id, first row, row count, first & last timestamp
+_SERIES_ENTRY = struct.Struct('<iiiIIdd')
+
+_ITEM_SIZES = [array(typecode).itemsize for _, typecode in _COLUMNS]
+
+_SWAP_BYTES = sys.byteorder != 'little'
+
+
+class _Series(object):
+    """
+    the rows of one (cell, vehicle view) pair, and their timestamps for range queries
+    """
+    __slots__ = ('rows', 'timestamps', 'ordered')
+
+    def __init__(self):
+        self.rows = array('i')
+        self.timestamps = array('d')
+        self.ordered = True
+
+
+class _Block(object):
+    """
+    a flushed block: where its columns are in its file, and the (first row, row count, first & last timestamp) of its
+    series, by (cell, vehicle view id)
+    """
+    __slots__ = ('path', 'offsets', 'count', 'start', 'end', 'series')
+
+    def __init__(self, path, offset, count, start, end, series):
+        self.path = path
+        self.offsets = []
+        for item_size in _ITEM_SIZES:
+            self.offsets.append(offset)
+            offset += item_size * count
+
+        self.count = count
+        self.start = start
+        self.end = end
+        self.series = series
+
+    @property
+    def size(self):
+        """
+        bytes from the start of the columns to the end of the block
+        """
+        return sum(_ITEM_SIZES) * self.count
+
+
+class SurgeCollector(object):
+    def __init__(self, cell_size=0.01):
+        """
+        Args:
+            - cell_size: size of the location cells, in degrees
+        """
+        self._cell_size = cell_size
+        self._blocks = []
+        self._clear()
+
+    def _clear(self):
+        self._columns = [array(typecode) for _, typecode in _COLUMNS]
+        self._series = {}
+
+    def __len__(self):
+        """
+        the number of rows, flushed or not
+        """
+        return sum(block.count for block in self._blocks) + len(self._columns[0])
+
+    def collect(self, app_state, location, timestamp=None):
+        """
+        appends the surge of every vehicle view of app_state.
+
+        Args:
+            - app_state: an AppState or the raw response data
+            - location: the location that was pinged (anything with latitude & longitude attributes, or a dict)
+            - timestamp: (optional) the time of the ping, defaults to time.time()
+
+        Returns:
+            - the number of rows added
+        """
+        data = app_state.raw if isinstance(app_state, AppState) else app_state
+        timestamp = time() if timestamp is None else timestamp
+        cell = self.cell(location)
+
+        vehicle_views = (data.get('city') or {}).get('vehicleViews') or {}
+        for vehicle_view_id, vehicle_view in vehicle_views.iteritems():
+            surge = vehicle_view.get('surge')
+            if surge:
+                fare_id = surge.get('fareId')
+                self._append(timestamp, cell, int(vehicle_view_id), surge.get('multiplier', 1.0),
+                             surge.get('expirationTime'), fare_id)
+            else:
+                fare_id = (vehicle_view.get('fare') or {}).get('id')
+                self._append(timestamp, cell, int(vehicle_view_id), 1.0, None, fare_id)
+
+        return len(vehicle_views)
+
+    def _append(self, timestamp, cell, vehicle_view_id, multiplier, expiration_time, fare_id):
+        row = len(self._columns[0])
+        values = (timestamp, cell[0], cell[1], vehicle_view_id, multiplier,
+                  NAN if expiration_time is None else expiration_time,
+                  -1 if fare_id is None else fare_id)
+        for column, value in zip(self._columns, values):
+            column.append(value)
+
+        series = self._series.get((cell, vehicle_view_id))
+        if series is None:
+            series = self._series[cell, vehicle_view_id] = _Series()
+
+        if series.timestamps and timestamp < series.timestamps[-1]:
+            series.ordered = False
+
+        series.rows.append(row)
+        series.timestamps.append(timestamp)
+
+    def cell(self, location):
+        """
+        returns the cell of a location (an object with latitude & longitude attributes, or a dict)
+        """
+        if isinstance(location, dict):
+            return location_cell(location['latitude'], location['longitude'], self._cell_size)
+
+        return location_cell(location.latitude, location.longitude, self._cell_size)
+
+    def query(self, cell=None, location=None, vehicle_view_id=None, start=None, end=None):
+        """
+        Args:
+            - cell / location: (optional) restricts the results to a cell, given directly or as a location in it
+            - vehicle_view_id: (optional) restricts the results to a vehicle view
+            - start, end: (optional) time window, inclusive
+
+        Returns:
+            - a list of SurgeRecord, the flushed rows first. Within each (cell, vehicle view) series, the flushed rows
+              are in time order, and the rows in memory in the order they were collected
+        """
+        if location is not None:
+            cell = self.cell(location)
+
+        def selected(key):
+            return (cell is None or key[0] == cell) and (vehicle_view_id is None or key[1] == vehicle_view_id)
+
+        def overlaps(first_timestamp, last_timestamp):
+            return (start is None or last_timestamp >= start) and (end is None or first_timestamp <= end)
+
+        result = []
+        files = {}
+        try:
+            for block in self._blocks:
+                if not overlaps(block.start, block.end):
+                    continue
+
+                for key, (first, count, series_start, series_end) in block.series.iteritems():
+                    if selected(key) and overlaps(series_start, series_end):
+                        f = files.get(block.path)
+                        if f is None:
+                            f = files[block.path] = open(block.path, 'rb')
+
+                        result.extend(_read_series(f, block, first, count, start, end))
+        finally:
+            for f in files.itervalues():
+                f.close()
+
+        for key, series in self._series.iteritems():
+            if selected(key):
+                result.extend(self._record(row) for row in self._rows_in_window(series, start, end))
+
+        return result
+
+    def _rows_in_window(self, series, start, end):
+        if series.ordered:
+            first = 0 if start is None else bisect_left(series.timestamps, start)
+            last = len(series.rows) if end is None else bisect_right(series.timestamps, end)
+            return series.rows[first:last]
+
+        return [row for row, timestamp in zip(series.rows, series.timestamps)
+                if (start is None or timestamp >= start) and (end is None or timestamp <= end)]
+
+    def _record(self, row):
+        return _to_record([column[row] for column in self._columns])
+
+    def flush(self, path):
+        """
+        appends the rows in memory to a file, as one block, and drops them from memory. They are still queried, from
+        the file
+
+        Returns:
+            - the number of rows written
+        """
+        count = len(self._columns[0])
+        if not count:
+            return 0
+
+        timestamps = self._columns[0]
+        order = array('i')
+        series_entries = {}
+        for key in sorted(self._series):
+            series = self._series[key]
+            rows = series.rows if series.ordered else sorted(series.rows, key=timestamps.__getitem__)
+            series_entries[key] = (len(order), len(rows), timestamps[rows[0]], timestamps[rows[-1]])
+            order.extend(rows)
+
+        with open(path, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            block = _Block(path, f.tell() + _BLOCK_HEADER.size + _SERIES_ENTRY.size * len(series_entries), count,
+                           min(timestamps), max(timestamps), series_entries)
+
+            f.write(_BLOCK_HEADER.pack(_MAGIC, self._cell_size, count, block.start, block.end, len(series_entries)))
+            for (cell, vehicle_view_id), (first, rows, start, end) in sorted(series_entries.iteritems()):
+                f.write(_SERIES_ENTRY.pack(cell[0], cell[1], vehicle_view_id, first, rows, start, end))
+
+            for column in self._columns:
+                column = array(column.typecode, (column[row] for row in order))
+                if _SWAP_BYTES:
+                    column.byteswap()
+                column.tofile(f)
+
+        self._blocks.append(block)
+        self._clear()
+        return count
+
+    @classmethod
+    def load(cls, path):
+        """
+        opens a file written by flush(). Only the block headers and series tables are read: the rows are read by the
+        queries that need them
+
+        Raises:
+            - ValueError if the file isn't a surge file, or if its blocks have different cell sizes
+        """
+        collector = None
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            while f.tell() < size:
+                header = f.read(_BLOCK_HEADER.size)
+                if len(header) < _BLOCK_HEADER.size:
+                    raise ValueError('truncated surge file: ' + path)
+
+                magic, cell_size, count, start, end, series_count = _BLOCK_HEADER.unpack(header)
+                if magic != _MAGIC:
+                    raise ValueError('not a surge file: ' + path)
+
+                if collector is None:
+                    collector = cls(cell_size)
+                elif cell_size != collector._cell_size:
+                    raise ValueError('blocks of different cell sizes in {}: {} and {}'.format(
+                        path, collector._cell_size, cell_size))
+
+                table = f.read(_SERIES_ENTRY.size * series_count)
+                series = {}
+                for i in xrange(series_count):
+                    cell_row, cell_column, vehicle_view_id, first, rows, series_start, series_end = \
+                        _SERIES_ENTRY.unpack_from(table, i * _SERIES_ENTRY.size)
+                    series[(cell_row, cell_column), vehicle_view_id] = (first, rows, series_start, series_end)
+
+                block = _Block(path, f.tell(), count, start, end, series)
+                if block.offsets[0] + block.size > size:
+                    raise ValueError('truncated surge file: ' + path)
+
+                collector._blocks.append(block)
+                f.seek(block.size, os.SEEK_CUR)
+
+        return collector or cls()
+
+
+def _read_series(f, block, first, count, start, end):
+    """
+    reads the records of a flushed series in a time window. Only the timestamps are read for the whole series
+    """
+    timestamps = _read_column(f, block, 0, first, count)
+    low = 0 if start is None else bisect_left(timestamps, start)
+    high = count if end is None else bisect_right(timestamps, end)
+    if low >= high:
+        return []
+
+    columns = [timestamps[low:high]]
+    columns.extend(_read_column(f, block, i, first + low, high - low) for i in xrange(1, len(_COLUMNS)))
+    return [_to_record(values) for values in zip(*columns)]
+
+
+def _read_column(f, block, index, first, count):
+    column = array(_COLUMNS[index][1])
+    f.seek(block.offsets[index] + first * column.itemsize)
+    column.fromfile(f, count)
+    if _SWAP_BYTES:
+        column.byteswap()
+
+    return column
+
+
+def _to_record(values):
+    timestamp, cell_row, cell_column, vehicle_view_id, multiplier, expiration_time, fare_id = values
+    return SurgeRecord(timestamp, (cell_row, cell_column), vehicle_view_id, multiplier,
+                       None if expiration_time != expiration_time else expiration_time,
+                       None if fare_id == -1 else fare_id)
@@ -0,0 +1,212 @@
+"""
+City-wide supply sweeps.
+
+GridSweep pings the center of every cell of a lat/lon grid over a bounding box, using a pool of worker threads that
+share a global rate limit, and aggregates the results into numpy grids:
+
+    sweep = GridSweep(client, south=37.70, west=-122.52, north=37.82, east=-122.36, cell_size=0.01,
+                      rate_limiter=RateLimiter(5))
+    result = sweep.sweep()
+    result.counts    # vehicles per cell
+    result.min_eta   # minimal eta per cell (NaN when no vehicles are available)
+
+Vehicles seen from several (overlapping) cells are counted once, in the cell of their latest known position.
+resweep() re-pings the cells that changed the most first, and merges the results with the latest observations of the
+other cells. Requires numpy.
+"""
+
+import threading
+import time
+from Queue import Queue, Empty
+from .geolocation import location_cell
+from .models import GPSLocation
+
+
+class SweepResult(object):
+    """
+    Attributes:
+        - counts: numpy int array (rows x columns) of unique vehicles per cell
+        - min_eta: numpy float array (rows x columns) of the minimal eta reported when pinging each cell
+        - vehicles: vehicle id -> (vehicle view id, latitude, longitude, epoch) of every unique vehicle
+        - errors: cell -> the exception raised when pinging it (or reading its response). The previous observations
+          of these cells are dropped
+        - pinged: the cells that were pinged to produce this result
+    """
+    def __init__(self, counts, min_eta, vehicles, errors, pinged):
+        self.counts = counts
+        self.min_eta = min_eta
+        self.vehicles = vehicles
+        self.errors = errors
+        self.pinged = pinged
+
+
+class _CellState(object):
+    __slots__ = ('nearby_vehicles', 'vehicles', 'min_eta', 'change_score', 'swept_at')
+
+    def __init__(self):
+        self.nearby_vehicles = None
+        self.vehicles = {}
+        self.min_eta = None
+        self.change_score = 1.0
+        self.swept_at = None
+
+
+class GridSweep(object):
+    def __init__(self, client, south, west, north, east, cell_size, workers=8, rate_limiter=None,
+                 vehicle_view_id=None, change_decay=0.5):
+        """
+        Args:
+            - client: an UberClient
+            - south, west, north, east: the bounding box, in degrees
+            - cell_size: grid cell size, in degrees
+            - workers: number of concurrent pings
+            - rate_limiter: (optional) a RateLimiter shared by all the workers (and possibly other components)
+            - vehicle_view_id: (optional) only count vehicles of this vehicle view
+            - change_decay: weight of the history in the change score of a cell, between 0 and 1
+        """
+        self._client = client
+        self._cell_size = cell_size
+        self._workers = workers
+        self._rate_limiter = rate_limiter
+        self._vehicle_view_id = vehicle_view_id
+        self._change_decay = change_decay
+
+        self._origin = location_cell(south, west, cell_size)
+        last = location_cell(north, east, cell_size)
+        self.shape = (last[0] - self._origin[0] + 1, last[1] - self._origin[1] + 1)
+        self._cells = {}
+
+    def grid_points(self):
+        """
+        returns a list of ((row, column), GPSLocation) of the cell centers, row 0 being the southern-most
+        """
+        points = []
+        for row in xrange(self.shape[0]):
+            for column in xrange(self.shape[1]):
+                latitude = (self._origin[0] + row + 0.5) * self._cell_size
+                longitude = (self._origin[1] + column + 0.5) * self._cell_size
+                points.append(((row, column), GPSLocation(latitude, longitude)))
+
+        return points
+
+    def sweep(self):
+        """
+        pings all the cells
+        """
+        return self._run(self.grid_points())
+
+    def resweep(self, max_cells=None):
+        """
+        pings the cells that changed the most recently first (never swept cells first of all).
+
+        Args:
+            - max_cells: (optional) only ping this many cells, the other cells keep their latest observations
+        """
+        points = self.grid_points()
+        states = self._cells
+
+        def priority(point):
+            state = states.get(point[0])
+            if state is None or state.swept_at is None:
+                return 0, 0, 0
+
+            return 1, -state.change_score, state.swept_at
+
+        points.sort(key=priority)
+        if max_cells is not None:
+            points = points[:max_cells]
+
+        return self._run(points)
+
+    def _run(self, points):
+        queue = Queue()
+        for point in points:
+            queue.put(point)
+
+        errors = {}
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                try:
+                    cell, location = queue.get_nowait()
+                except Empty:
+                    return
+
+                try:
+                    if self._rate_limiter is not None:
+                        self._rate_limiter.acquire()
+
+                    data = self._client.ping(location).raw
+                    with lock:
+                        self._observe(cell, data)
+                except Exception as e:
+                    with lock:
+                        errors[cell] = e
+                        # a stale observation would pass for a current one, and the cell is swept again first
+                        self._cells.pop(cell, None)
+
+        threads = [threading.Thread(target=worker) for _ in xrange(min(self._workers, len(points)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return self._aggregate(errors, [cell for cell, _ in points])
+
+    def _observe(self, cell, data):
+        nearby_vehicles = data.get('nearbyVehicles') or {}
+        if self._vehicle_view_id is not None:
+            nearby_vehicles = {k: v for k, v in nearby_vehicles.iteritems() if int(k) == self._vehicle_view_id}
+
+        state = self._cells.get(cell)
+        if state is None:
+            state = self._cells[cell] = _CellState()
+
+        changed = 1.0 if nearby_vehicles != state.nearby_vehicles else 0.0
+        state.change_score = self._change_decay * state.change_score + (1 - self._change_decay) * changed
+        state.nearby_vehicles = nearby_vehicles
+        state.swept_at = time.time()
+
+        vehicles = {}
+        etas = []
+        for vehicle_view_id, nearby in nearby_vehicles.iteritems():
+            if nearby.get('minEta') is not None:
+                etas.append(nearby['minEta'])
+
+            for vehicle_id, path in (nearby.get('vehiclePaths') or {}).iteritems():
+                if path:
+                    latest = max(path, key=lambda x: x['epoch'])
+                    vehicles[vehicle_id] = (int(vehicle_view_id), latest['latitude'], latest['longitude'],
+                                            latest['epoch'])
+
+        state.vehicles = vehicles
+        state.min_eta = min(etas) if etas else None
+
+    def _aggregate(self, errors, pinged):
+        import numpy
+
+        counts = numpy.zeros(self.shape, dtype=numpy.int32)
+        min_eta = numpy.full(self.shape, numpy.nan)
+
+        # the same vehicle can be reported when pinging neighbouring cells, keep its latest position
+        vehicles = {}
+        for cell, state in self._cells.iteritems():
+            if state.min_eta is not None:
+                min_eta[cell] = state.min_eta
+
+            for vehicle_id, vehicle in state.vehicles.iteritems():
+                known = vehicles.get(vehicle_id)
+                if known is None or known[3] < vehicle[3]:
+                    vehicles[vehicle_id] = vehicle
+
+        for vehicle_view_id, latitude, longitude, epoch in vehicles.itervalues():
+            row, column = location_cell(latitude, longitude, self._cell_size)
+            row -= self._origin[0]
+            column -= self._origin[1]
+            if 0 <= row < self.shape[0] and 0 <= column < self.shape[1]:
+                counts[row, column] += 1
+
+        return SweepResult(counts, min_eta, vehicles, errors, pinged)
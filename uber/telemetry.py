@@ -0,0 +1,164 @@
+"""
+Buffered submission of analytics events (see client.Events).
+
+UberClient._send_event blocks on one HTTP request per event. EventEmitter queues events in a bounded buffer instead,
+and a background thread sends them in batches, when enough events are queued or when the flush interval elapses:
+
+    emitter = EventEmitter(client)
+    emitter.emit(Events.NEAREST_CAB_REQUEST, location, {'vehicleViewId': 8, 'reason': 'ping'})
+    ...
+    emitter.close()  # also happens at interpreter exit
+
+Telemetry never raises into the caller: events that don't fit in the buffer are dropped, and events that fail to be
+sent are counted and discarded. Emitters that are not closed can be garbage collected, their queued events are lost.
+"""
+
+import atexit
+import threading
+import weakref
+from collections import deque
+
+# the emitters to close at exit, without keeping them alive
+_emitters = weakref.WeakSet()
+
+
+@atexit.register
+def _close_emitters():
+    for emitter in list(_emitters):
+        emitter.close()
+
+
+class DropPolicy(object):
+    OLDEST = 'oldest'  # make room by dropping the oldest queued event
+    NEWEST = 'newest'  # drop the event being emitted
+
+
+class EventEmitter(object):
+    def __init__(self, client, batch_size=20, flush_interval=5.0, max_queued=1000, drop_policy=DropPolicy.OLDEST):
+        """
+        Args:
+            - client: the UberClient to send the events with
+            - batch_size: send as soon as this many events are queued
+            - flush_interval: max seconds an event waits in the queue
+            - max_queued: max events kept in memory
+            - drop_policy: a DropPolicy value, what to drop when the queue is full
+        """
+        self._client = client
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_queued = max_queued
+        self._drop_policy = drop_policy
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+        # the thread only references the emitter weakly, so that it can be collected
+        self._thread = threading.Thread(target=_run, args=(weakref.ref(self),), name='uber-events')
+        self._thread.daemon = True
+        self._thread.start()
+        _emitters.add(self)
+
+    def emit(self, event_name, location=None, params=None):
+        """
+        queues an event. The event is stamped now, not when it is sent
+
+        Returns:
+            - False if the event was dropped
+        """
+        event = self._client._build_event(event_name, location, params)
+        with self._condition:
+            if self._closed:
+                self.dropped += 1
+                return False
+
+            if len(self._queue) >= self._max_queued:
+                self.dropped += 1
+                if self._drop_policy == DropPolicy.NEWEST:
+                    return False
+
+                self._queue.popleft()
+
+            self._queue.append(event)
+            if len(self._queue) >= self._batch_size:
+                self._condition.notify()
+
+        return True
+
+    def __len__(self):
+        return len(self._queue)
+
+    def flush(self):
+        """
+        sends all the queued events now, from the calling thread
+        """
+        while self._send_batch():
+            pass
+
+    def close(self):
+        """
+        stops the background thread and sends the remaining events
+        """
+        with self._condition:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._condition.notify()
+
+        _emitters.discard(self)
+        self._thread.join()
+        self.flush()
+
+    def _take_batch(self):
+        with self._condition:
+            count = min(self._batch_size, len(self._queue))
+            return [self._queue.popleft() for _ in xrange(count)]
+
+    def _send_batch(self):
+        """
+        Returns:
+            - False if there was nothing to send
+        """
+        with self._send_lock:
+            batch = self._take_batch()
+            if not batch:
+                return False
+
+            try:
+                failed = self._client._send_events(batch) or 0
+            except Exception:
+                failed = len(batch)
+
+            self.sent += len(batch) - failed
+            self.failed += failed
+            return True
+
+
+def _run(emitter_ref):
+    while True:
+        emitter = emitter_ref()
+        if emitter is None:
+            return
+
+        condition = emitter._condition
+        with condition:
+            if not emitter._closed and len(emitter._queue) < emitter._batch_size:
+                flush_interval = emitter._flush_interval
+                del emitter
+                condition.wait(flush_interval)
+
+                emitter = emitter_ref()
+                if emitter is None:
+                    return
+
+            if emitter._closed:
+                return
+
+        emitter.flush()
+        del emitter
@@ -0,0 +1,88 @@
+"""
+Request rate limiting, shared by the components that send many requests (sweeps, pollers, watchers...)
+"""
+
+import threading
+import time
+
+
+class RateLimiter(object):
+    """
+    A thread-safe token bucket: allows `rate` requests per second on average, and bursts of up to `burst` requests.
+    """
+    def __init__(self, rate, burst=None, clock=time.time, sleep=time.sleep):
+        """
+        Args:
+            - rate: tokens added per second
+            - burst: (optional) bucket size, defaults to max(1, rate)
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        takes tokens if they are available right now
+
+        Returns:
+            - True if the tokens were taken
+        """
+        self._check(tokens)
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        takes tokens, waiting for them if needed
+
+        Args:
+            - timeout: (optional) max seconds to wait
+
+        Returns:
+            - True if the tokens were taken, False on timeout
+
+        Raises:
+            - ValueError if tokens is more than the bucket can ever hold
+        """
+        self._check(tokens)
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+
+            self._sleep(wait)
+
+    def _check(self, tokens):
+        if tokens > self.burst:
+            raise ValueError('{} tokens requested, the burst is {}'.format(tokens, self.burst))
+
+    def available(self):
+        """
+        the number of tokens currently available
+        """
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
@@ -0,0 +1,172 @@
+"""
+Vehicle trajectories across pings.
+
+Every ping returns a short path per nearby vehicle (NearbyVehicles.vehicle_paths). TrajectoryStore merges the paths
+of consecutive pings per vehicle id into fixed-size ring buffers, so memory use stays bounded no matter how long a
+sweep runs:
+
+    store = TrajectoryStore(capacity=256, ttl=300)
+    while True:
+        store.add(client.ping(location))
+        for epoch, latitude, longitude, course in store['some vehicle id'].points():
+            ...
+"""
+
+from array import array
+from time import time
+from .models import AppState, NearbyVehicles, VehicleLocation
+
+NAN = float('nan')
+
+
+class Trajectory(object):
+    """
+    A ring buffer of (epoch, latitude, longitude, course) points, backed by arrays of doubles.
+    Epochs are in milliseconds, a missing course is NaN. When full, the oldest points are overwritten.
+    """
+    __slots__ = ('_epochs', '_latitudes', '_longitudes', '_courses', '_capacity', '_start', '_size', 'last_seen')
+
+    def __init__(self, capacity):
+        self._epochs = array('d', [0.0]) * capacity
+        self._latitudes = array('d', [0.0]) * capacity
+        self._longitudes = array('d', [0.0]) * capacity
+        self._courses = array('d', [0.0]) * capacity
+        self._capacity = capacity
+        self._start = 0
+        self._size = 0
+
+        # when the vehicle was last reported (time.time() based)
+        self.last_seen = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def last_epoch(self):
+        if not self._size:
+            return None
+
+        return self._epochs[(self._start + self._size - 1) % self._capacity]
+
+    def append(self, epoch, latitude, longitude, course=None):
+        if self._size < self._capacity:
+            index = (self._start + self._size) % self._capacity
+            self._size += 1
+        else:
+            index = self._start
+            self._start = (self._start + 1) % self._capacity
+
+        self._epochs[index] = epoch
+        self._latitudes[index] = latitude
+        self._longitudes[index] = longitude
+        self._courses[index] = NAN if course is None else course
+
+    def points(self):
+        """
+        returns the points, oldest first
+        """
+        capacity = self._capacity
+        return [(self._epochs[i % capacity], self._latitudes[i % capacity],
+                 self._longitudes[i % capacity], self._courses[i % capacity])
+                for i in xrange(self._start, self._start + self._size)]
+
+    def latest(self):
+        """
+        returns the most recent point, or None
+        """
+        if not self._size:
+            return None
+
+        i = (self._start + self._size - 1) % self._capacity
+        return self._epochs[i], self._latitudes[i], self._longitudes[i], self._courses[i]
+
+
+class TrajectoryStore(object):
+    """
+    Trajectories of the vehicles seen in pings, by vehicle id
+    """
+    def __init__(self, capacity=128, ttl=300):
+        """
+        Args:
+            - capacity: max number of points kept per vehicle
+            - ttl: seconds after which a vehicle that wasn't reported anymore is dropped
+        """
+        self._capacity = capacity
+        self._ttl = ttl
+        self._trajectories = {}
+
+    def __len__(self):
+        return len(self._trajectories)
+
+    def __contains__(self, vehicle_id):
+        return vehicle_id in self._trajectories
+
+    def __getitem__(self, vehicle_id):
+        return self._trajectories[vehicle_id]
+
+    def vehicle_ids(self):
+        return self._trajectories.keys()
+
+    def add(self, nearby_vehicles, now=None):
+        """
+        merges the vehicle paths of a ping, and drops the vehicles that went silent.
+
+        Args:
+            - nearby_vehicles: an AppState, its nearby_vehicles dict or a single NearbyVehicles
+            - now: (optional) the time of the ping, defaults to time.time()
+
+        Returns:
+            - the ids of the expired vehicles
+        """
+        now = time() if now is None else now
+
+        if isinstance(nearby_vehicles, AppState):
+            nearby_vehicles = (nearby_vehicles.raw.get('nearbyVehicles') or {}).values()
+        elif isinstance(nearby_vehicles, NearbyVehicles):
+            nearby_vehicles = [nearby_vehicles.raw]
+        else:
+            nearby_vehicles = [x.raw for x in nearby_vehicles.values()]
+
+        for data in nearby_vehicles:
+            for vehicle_id, path in (data.get('vehiclePaths') or {}).iteritems():
+                self.add_path(vehicle_id, path, now)
+
+        return self.expire(now)
+
+    def add_path(self, vehicle_id, path, now=None):
+        """
+        appends the points of path (raw dicts or VehicleLocations) that are newer than the ones already stored
+        """
+        trajectory = self._trajectories.get(vehicle_id)
+        if trajectory is None:
+            trajectory = self._trajectories[vehicle_id] = Trajectory(self._capacity)
+
+        trajectory.last_seen = time() if now is None else now
+
+        points = [x.raw if isinstance(x, VehicleLocation) else x for x in path]
+        points.sort(key=lambda x: x['epoch'])
+
+        last_epoch = trajectory.last_epoch
+        for point in points:
+            epoch = point['epoch']
+            if last_epoch is not None and epoch <= last_epoch:
+                continue
+
+            trajectory.append(epoch, point['latitude'], point['longitude'], point.get('course'))
+            last_epoch = epoch
+
+    def expire(self, now=None):
+        """
+        drops the vehicles that weren't reported for more than ttl seconds
+
+        Returns:
+            - the ids of the expired vehicles
+        """
+        deadline = (time() if now is None else now) - self._ttl
+        expired = [vehicle_id for vehicle_id, trajectory in self._trajectories.iteritems()
+                   if trajectory.last_seen < deadline]
+
+        for vehicle_id in expired:
+            del self._trajectories[vehicle_id]
+
+        return expired
@@ -0,0 +1,185 @@
+"""
+Watching many trips at once.
+
+Instead of a thread polling every trip (see examples/ubercli.py), TripWatchers runs every trip watcher as a job of a
+shared scheduler.Scheduler:
+
+    watchers = TripWatchers(Scheduler(workers=4, rate_limiter=RateLimiter(20)))
+    watcher = watchers.watch(client, on_delta, deadline=time.time() + 600)
+    ...
+    watcher.cancel()  # cancels the pickup
+
+on_delta is called with the watcher and the deltas.AppStateDelta of every ping. A watcher stops when the client goes
+back to looking (the trip ended, or the request expired or was cancelled), and cancels the pickup if it is still
+waiting for it at its deadline.
+
+When the watchers need more requests than the scheduler's rate limiter allows, all of them poll less often, instead of
+piling up deferred runs.
+"""
+
+import threading
+import time
+from .deltas import AppStateTracker
+from .models import ClientStatus
+
+
+class WatchOutcome(object):
+    ENDED = 'ended'  # the client is looking again
+    DEADLINE = 'deadline'  # the deadline passed
+    CANCELLED = 'cancelled'  # cancel() was called
+    FAILED = 'failed'  # too many consecutive errors
+
+
+# statuses in which the pickup can still be cancelled
+_PENDING_STATUSES = (ClientStatus.DISPATCHING, ClientStatus.WAITING_FOR_PICKUP)
+
+
+class TripWatcher(object):
+    """
+    Attributes:
+        - outcome: a WatchOutcome value once the watcher stopped
+        - error: the last error. Errors of the callback, or of the cancellation at the deadline, fail the watcher
+        - done: an Event set when the watcher stopped
+    """
+    def __init__(self, watchers, client, callback, deadline=None, location=None):
+        self._watchers = watchers
+        self._client = client
+        self._callback = callback
+        self._deadline = deadline
+        self._location = location
+
+        self._tracker = AppStateTracker()
+        self._status = None
+        self._errors = 0
+        self._lock = threading.Lock()
+        self._task = None
+
+        self.outcome = None
+        self.error = None
+        self.done = threading.Event()
+
+    def cancel(self):
+        """
+        stops watching and cancels the pickup. The cancellation is sent by the scheduler, without blocking the caller
+        """
+        with self._lock:
+            if self.outcome is not None:
+                return
+
+            self.outcome = WatchOutcome.CANCELLED
+
+        self._task.cancel()
+        self._watchers._scheduler.schedule(self._cancel_pickup, name='cancel')
+
+    def _start(self):
+        self._task = self._watchers._scheduler.schedule(self._poll, name='trip watcher')
+
+    def _poll(self):
+        try:
+            return self._poll_once()
+        except Exception as e:
+            # a failing callback or cancellation must not leave the watcher active forever
+            self.error = e
+            self._finish(WatchOutcome.FAILED)
+            return None
+
+    def _poll_once(self):
+        if self._deadline is not None and self._watchers._clock() >= self._deadline:
+            if self._status in _PENDING_STATUSES:
+                self._client.cancel_pickup(self._location)
+
+            self._finish(WatchOutcome.DEADLINE)
+            return None
+
+        try:
+            app_state = self._client.ping(self._location)
+        except Exception as e:
+            self.error = e
+            self._errors += 1
+            if self._errors > self._watchers._max_errors:
+                self._finish(WatchOutcome.FAILED)
+                return None
+
+            return self._watchers.interval() * 2 ** self._errors
+
+        self._errors = 0
+        delta = self._tracker.update(app_state)
+        self._callback(self, delta)
+
+        client = delta.app_state.client
+        self._status = None if client is None else client.status
+        if self._status == ClientStatus.LOOKING:
+            self._finish(WatchOutcome.ENDED)
+            return None
+
+        return self._watchers.interval()
+
+    def _cancel_pickup(self):
+        try:
+            self._client.cancel_pickup(self._location)
+        except Exception as e:
+            self.error = e
+
+        self._finish(WatchOutcome.CANCELLED)
+
+    def _finish(self, outcome):
+        with self._lock:
+            if self.outcome is None or outcome == WatchOutcome.CANCELLED:
+                self.outcome = outcome
+
+        self._watchers._remove(self)
+        self.done.set()
+
+
+class TripWatchers(object):
+    def __init__(self, scheduler, interval=1.0, max_errors=3, clock=time.time):
+        """
+        Args:
+            - scheduler: the scheduler.Scheduler that runs the watchers
+            - interval: seconds between the pings of a watcher, when the request budget allows it
+            - max_errors: a watcher fails after this many consecutive errors (retries back off exponentially)
+        """
+        self._scheduler = scheduler
+        self._interval = interval
+        self._max_errors = max_errors
+        self._clock = clock
+
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def watch(self, client, callback, deadline=None, location=None):
+        """
+        starts watching the trip of a client
+
+        Args:
+            - callback: called with the watcher and the AppStateDelta of every ping
+            - deadline: (optional) epoch in seconds. A pickup still pending then is cancelled
+            - location: (optional) the location sent with the pings
+
+        Returns:
+            - a started TripWatcher
+        """
+        watcher = TripWatcher(self, client, callback, deadline, location)
+        with self._lock:
+            self._active.add(watcher)
+
+        watcher._start()
+        return watcher
+
+    def __len__(self):
+        return len(self._active)
+
+    def interval(self):
+        """
+        the current interval between the pings of a watcher: stretched so that all the active watchers fit in the
+        request budget
+        """
+        rate_limiter = self._scheduler.rate_limiter
+        if rate_limiter is None:
+            return self._interval
+
+        return max(self._interval, len(self._active) / rate_limiter.rate)
+
+    def _remove(self, watcher):
+        with self._lock:
+            self._active.discard(watcher)